@@ -1,5 +1,5 @@
 from django.contrib import admin
-from .models import UserProfile
+from .models import EmailOutbox, RevokedToken, UserProfile
 
 
 @admin.register(UserProfile)
@@ -21,3 +21,19 @@ class UserProfileAdmin(admin.ModelAdmin):
             'classes': ('collapse',)
         }),
     )
+
+
+@admin.register(EmailOutbox)
+class EmailOutboxAdmin(admin.ModelAdmin):
+    list_display = ['to_email', 'subject', 'status', 'attempts', 'next_attempt_at', 'sent_at']
+    list_filter = ['status', 'created_at']
+    search_fields = ['to_email', 'subject']
+    readonly_fields = ['created_at', 'sent_at', 'last_error']
+
+
+@admin.register(RevokedToken)
+class RevokedTokenAdmin(admin.ModelAdmin):
+    list_display = ['jti', 'token_type', 'user', 'revoked_at', 'expires_at']
+    list_filter = ['token_type']
+    search_fields = ['jti', 'user__username']
+    readonly_fields = ['jti', 'token_type', 'user', 'revoked_at', 'expires_at']
@@ -11,6 +11,7 @@ class AccountsConfig(AppConfig):
 
     def ready(self):
         import accounts.models  # noqa: Import to register signals
+        import accounts.checks  # noqa: Import to register system checks
         
         # Log email configuration on startup
         from django.conf import settings
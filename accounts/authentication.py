@@ -0,0 +1,117 @@
+"""
+Claims-based JWT authentication.
+
+Read-only requests are authenticated from the identity claims of a verified
+access token, so they don't load the user or profile rows. Anything that
+writes, or any token that may carry stale claims, goes through the database.
+
+Staleness is detected from markers that ``mark_auth_changed`` leaves in the
+cache, so this needs a cache shared by every worker (CLAIMS_AUTH_ENABLED; see
+accounts.checks). The markers are set by model signals, which
+``QuerySet.update()`` skips: bulk updates of users' status, staff flags or
+roles must call ``mark_auth_changed`` for each user they touch.
+"""
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.db import DEFAULT_DB_ALIAS
+from rest_framework.permissions import SAFE_METHODS
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import InvalidToken
+from rest_framework_simplejwt.settings import api_settings
+
+from .models import UserProfile
+from .revocation import is_token_revoked
+from .services import auth_changed_since
+
+IDENTITY_CLAIMS = ('role', 'username', 'email', 'is_staff', 'is_superuser')
+
+
+def get_role(user) -> str:
+    """Get a user's role, falling back to staff/superuser flags without a profile"""
+    try:
+        return user.profile.role
+    except UserProfile.DoesNotExist:
+        return 'admin' if (user.is_superuser or user.is_staff) else 'student'
+
+
+def set_identity_claims(token, user) -> None:
+    """Stamp the claims ClaimsJWTAuthentication rebuilds the user from."""
+    token['role'] = get_role(user)
+    token['username'] = user.username
+    token['email'] = user.email
+    token['is_staff'] = user.is_staff
+    token['is_superuser'] = user.is_superuser
+
+
+class ClaimsJWTAuthentication(JWTAuthentication):
+    """
+    JWT authentication that trusts verified claims for safe methods.
+
+    With CLAIMS_AUTH_ENABLED, GET/HEAD/OPTIONS requests get an unsaved ``User`` (with its ``profile``
+    cached) built from the token. The database is used instead when:
+    - the request method is unsafe
+    - the view sets ``claims_authentication = False``
+    - the token predates the identity claims
+    - the user's role, status or credentials changed after the token was issued
+
+    Revoked tokens are rejected either way. Claims users are read-only;
+    saving one raises an error.
+    """
+
+    def authenticate(self, request):
+        header = self.get_header(request)
+        if header is None:
+            return None
+
+        raw_token = self.get_raw_token(header)
+        if raw_token is None:
+            return None
+
+        validated_token = self.get_validated_token(raw_token)
+
+        if self.can_trust_claims(request, validated_token):
+            return self.get_claims_user(validated_token), validated_token
+        return self.get_user(validated_token), validated_token
+
+    def get_validated_token(self, raw_token):
+        validated_token = super().get_validated_token(raw_token)
+        if is_token_revoked(validated_token):
+            raise InvalidToken('Token has been revoked')
+        return validated_token
+
+    def can_trust_claims(self, request, validated_token) -> bool:
+        if not settings.CLAIMS_AUTH_ENABLED:
+            return False
+        if request.method not in SAFE_METHODS:
+            return False
+
+        view = (getattr(request, 'parser_context', None) or {}).get('view')
+        if not getattr(view, 'claims_authentication', True):
+            return False
+
+        payload = validated_token.payload
+        if api_settings.USER_ID_CLAIM not in payload or 'iat' not in payload:
+            return False
+        if any(claim not in payload for claim in IDENTITY_CLAIMS):
+            return False
+
+        return not auth_changed_since(payload[api_settings.USER_ID_CLAIM], payload['iat'])
+
+    def get_claims_user(self, validated_token) -> User:
+        user = User(
+            id=User._meta.pk.to_python(validated_token[api_settings.USER_ID_CLAIM]),
+            username=validated_token['username'],
+            email=validated_token['email'],
+            is_staff=validated_token['is_staff'],
+            is_superuser=validated_token['is_superuser'],
+            is_active=True,
+        )
+        # Behave like a loaded row for lookups and comparisons
+        user._state.adding = False
+        user._state.db = DEFAULT_DB_ALIAS
+        user.from_token_claims = True
+
+        profile = UserProfile(role=validated_token['role'], is_email_verified=True)
+        profile.from_token_claims = True
+        user.profile = profile
+        return user
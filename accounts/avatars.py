@@ -0,0 +1,78 @@
+"""
+Default avatars for users without an uploaded profile picture.
+
+Avatars are SVGs of the username's first letter on a soft background,
+rendered on first request rather than when the account is created. The
+color is derived from the letter the same way the frontend's Avatar
+component does it, so each (letter, color) pair is one shared, immutable
+URL that browsers and CDNs can cache indefinitely.
+"""
+from functools import lru_cache
+from typing import Optional
+from xml.sax.saxutils import escape
+
+from django.urls import reverse
+
+from .pictures import variant_url
+
+AVATAR_COLORS = [
+    '#FF6B6B', '#4ECDC4', '#45B7D1', '#FFA07A', '#98D8C8',
+    '#F7DC6F', '#BB8FCE', '#85C1E2', '#F8B739', '#52A3A3'
+]
+AVATAR_SIZE = 200
+
+
+def avatar_key(username: str) -> tuple:
+    """
+    Get the (letter, color index) an avatar is rendered from.
+
+    Returns:
+        Tuple of (upper-cased first letter, index into AVATAR_COLORS)
+    """
+    letter = (username[:1] or '?').upper()[:1]
+    return letter, ord(username[:1] or '?') % len(AVATAR_COLORS)
+
+
+def default_avatar_url(username: str, request=None) -> str:
+    """URL of a user's default avatar, absolute when a request is given"""
+    letter, color = avatar_key(username)
+    url = reverse('avatar', kwargs={'color': color, 'letter': letter})
+    return request.build_absolute_uri(url) if request else url
+
+
+def profile_picture_url(user, request=None) -> Optional[str]:
+    """
+    URL of a user's uploaded picture, falling back to the default avatar.
+
+    Processed uploads are served as the variant sized for the request.
+
+    Args:
+        user: User object (its ``profile`` may be missing)
+        request: Optional request used to build absolute URLs
+
+    Returns:
+        Picture URL, or None for users without a username
+    """
+    profile = getattr(user, 'profile', None)
+    if profile is not None and profile.picture_hash:
+        return variant_url(profile, request)
+    if profile is not None and profile.profile_picture:
+        url = profile.profile_picture.url
+        return request.build_absolute_uri(url) if request else url
+    if not user.username:
+        return None
+    return default_avatar_url(user.username, request)
+
+
+@lru_cache(maxsize=1024)
+def render_avatar_svg(letter: str, color: int) -> bytes:
+    """Render an avatar SVG; a few hundred distinct images exist, so all stay cached"""
+    half = AVATAR_SIZE // 2
+    return (
+        f'<svg xmlns="http://www.w3.org/2000/svg" width="{AVATAR_SIZE}" height="{AVATAR_SIZE}" '
+        f'viewBox="0 0 {AVATAR_SIZE} {AVATAR_SIZE}">'
+        f'<rect width="{AVATAR_SIZE}" height="{AVATAR_SIZE}" fill="{AVATAR_COLORS[color]}"/>'
+        f'<text x="{half}" y="{half}" dy=".35em" text-anchor="middle" fill="#FFFFFF" '
+        f'font-family="DejaVu Sans, Arial, sans-serif" font-weight="bold" font-size="120">'
+        f'{escape(letter)}</text></svg>'
+    ).encode('utf-8')
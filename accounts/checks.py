@@ -0,0 +1,27 @@
+from django.conf import settings
+from django.core.checks import Error, Tags, register
+
+# Backends whose entries are private to one process
+PROCESS_LOCAL_CACHE_BACKENDS = (
+    'django.core.cache.backends.locmem.LocMemCache',
+    'django.core.cache.backends.dummy.DummyCache',
+)
+
+
+@register(Tags.caches)
+def check_claims_auth_cache(app_configs, **kwargs):
+    """Claims-based auth needs its change markers visible to every worker"""
+    backend = settings.CACHES.get('default', {}).get('BACKEND')
+    if settings.CLAIMS_AUTH_ENABLED and backend in PROCESS_LOCAL_CACHE_BACKENDS:
+        return [
+            Error(
+                "CLAIMS_AUTH_ENABLED requires a cache shared by all workers.",
+                hint=(
+                    f"{backend} is per process, so role changes and deactivations made "
+                    "in one worker would not reach the others. Set CACHE_BACKEND to "
+                    "Redis or Memcached, or turn CLAIMS_AUTH_ENABLED off."
+                ),
+                id='accounts.E001',
+            )
+        ]
+    return []
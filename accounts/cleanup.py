@@ -0,0 +1,138 @@
+"""
+Cleanup of expired verification codes and abandoned registrations.
+
+Registration creates an inactive user plus an ``EmailVerification`` row.
+Codes expire after OTP_EXPIRY_MINUTES, and users who never verify are kept
+for UNVERIFIED_ACCOUNT_RETENTION_DAYS so they can still request a new code.
+After that both are deleted. An unverified user's expired code is kept for
+the retention window too: its ``created_at`` is what records a resend, so
+deleting it early would expose the user to deletion. Rows are found through
+``created_at`` indexes and deleted in bounded chunks, each in its own short
+transaction, so a large backlog never holds long locks.
+"""
+import logging
+import time
+from datetime import timedelta
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.db import transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from .models import OTP_EXPIRY_MINUTES, EmailVerification
+
+logger = logging.getLogger(__name__)
+
+
+def _retention_cutoff(retention_days: int = None, now=None):
+    if retention_days is None:
+        retention_days = settings.UNVERIFIED_ACCOUNT_RETENTION_DAYS
+    return (now or timezone.now()) - timedelta(days=retention_days)
+
+
+def expired_verifications(retention_days: int = None, now=None):
+    """
+    Verification rows whose code can no longer be used and isn't needed.
+
+    Rows of users still waiting to verify are kept until the retention
+    window has passed, since stale_unverified_users() reads their
+    ``created_at`` to spare users who asked for a new code.
+    """
+    now = now or timezone.now()
+    return EmailVerification.objects.filter(
+        Q(created_at__lt=_retention_cutoff(retention_days, now))
+        | Q(user__is_active=True)
+        | Q(user__last_login__isnull=False)
+        | Q(user__profile__is_email_verified=True),
+        created_at__lt=now - timedelta(minutes=OTP_EXPIRY_MINUTES),
+    )
+
+
+def stale_unverified_users(retention_days: int = None, now=None):
+    """
+    Users who registered before the retention window and never verified.
+
+    Users who requested a new code within the window, have ever logged in,
+    or were activated (e.g. by an admin) are kept.
+    """
+    cutoff = _retention_cutoff(retention_days, now)
+    return User.objects.filter(
+        is_active=False,
+        last_login__isnull=True,
+        profile__is_email_verified=False,
+        profile__created_at__lt=cutoff,
+    ).exclude(email_verification__created_at__gte=cutoff)
+
+
+def delete_in_chunks(queryset, order_by: str, chunk_size: int) -> int:
+    """
+    Delete the rows of a queryset, oldest first, ``chunk_size`` at a time.
+
+    Each chunk re-applies the queryset's filters when deleting, so a row that
+    stopped matching after it was selected (say, a user who just verified)
+    is left alone.
+
+    Returns:
+        Number of rows of the queryset's model deleted
+    """
+    label = queryset.model._meta.label
+    deleted = 0
+    while True:
+        with transaction.atomic():
+            pks = list(queryset.order_by(order_by).values_list('pk', flat=True)[:chunk_size])
+            if not pks:
+                break
+            _, per_model = queryset.filter(pk__in=pks).delete()
+        deleted += per_model.get(label, 0)
+        if len(pks) < chunk_size:
+            break
+    return deleted
+
+
+def cleanup_unverified_accounts(chunk_size: int = None, retention_days: int = None,
+                                dry_run: bool = False) -> dict:
+    """
+    Delete stale unverified users, then expired verification codes.
+
+    Users go first so the codes that decide who is stale are still there;
+    their own codes go with them.
+
+    Args:
+        chunk_size: Rows deleted per transaction (default ACCOUNT_CLEANUP_CHUNK_SIZE)
+        retention_days: Days an unverified account is kept (default UNVERIFIED_ACCOUNT_RETENTION_DAYS)
+        dry_run: Only count what would be deleted
+
+    Returns:
+        Report with ``verifications`` and ``users`` deleted, elapsed time and throughput
+    """
+    chunk_size = chunk_size or settings.ACCOUNT_CLEANUP_CHUNK_SIZE
+    started = time.perf_counter()
+    now = timezone.now()
+    users = stale_unverified_users(retention_days, now)
+    verifications = expired_verifications(retention_days, now)
+
+    if dry_run:
+        counts = {
+            # Codes of deleted users go with them rather than in this step
+            'verifications': verifications.exclude(user__in=users).count(),
+            'users': users.count(),
+        }
+    else:
+        counts = {'users': delete_in_chunks(users, 'profile__created_at', chunk_size)}
+        counts['verifications'] = delete_in_chunks(verifications, 'created_at', chunk_size)
+
+    elapsed = time.perf_counter() - started
+    total = counts['verifications'] + counts['users']
+    report = {
+        **counts,
+        'dry_run': dry_run,
+        'elapsed_seconds': round(elapsed, 3),
+        'rows_per_second': round(total / elapsed, 1) if elapsed else None,
+    }
+    if total and not dry_run:
+        logger.info(
+            f"Deleted {counts['verifications']} expired verification codes and "
+            f"{counts['users']} unverified accounts in {elapsed:.2f}s"
+        )
+    return report
@@ -4,16 +4,22 @@ Email utilities for sending OTP and verification emails
 This module handles:
 - OTP generation and hashing
 - Email sending with proper error handling
+- Queueing email in the outbox and delivering it in batches
 - Email verification flow
 """
-import random
+import secrets
 import string
 import logging
-from django.core.mail import send_mail
+import threading
+from datetime import timedelta
+from django.core.mail import EmailMultiAlternatives, get_connection, send_mail
 from django.conf import settings
-from django.contrib.auth.hashers import make_password
 from django.contrib.auth.models import User
-from .models import EmailVerification
+from django.db import connection, transaction
+from django.utils import timezone
+from .models import OTP_EXPIRY_MINUTES, EmailOutbox, EmailVerification
+from .services import hash_otp
+from webinar_system.background import run_in_background
 
 logger = logging.getLogger(__name__)
 
@@ -28,27 +34,23 @@ def generate_otp(length: int = 6) -> str:
     Returns:
         String containing digits
     """
-    return ''.join(random.choices(string.digits, k=length))
+    return ''.join(secrets.choice(string.digits) for _ in range(length))
 
 
-def send_otp_email(user: User, otp: str) -> bool:
+def build_otp_email(user: User, otp: str) -> tuple:
     """
-    Send OTP to user's email address with proper error handling.
-    
+    Build the verification email for a one-time code.
+
     Args:
         user: User object
         otp: Plain text OTP code
-    
+
     Returns:
-        Boolean indicating success/failure
-        
-    Raises:
-        Exception: If SMTP sending fails (allows caller to handle)
+        Tuple of (subject, plain text body, HTML body)
     """
-    try:
-        subject = "Email Verification Code"
-        
-        html_message = f"""
+    subject = "Email Verification Code"
+
+    html_message = f"""
         <html>
             <head>
                 <style>
@@ -81,8 +83,8 @@ def send_otp_email(user: User, otp: str) -> bool:
             </body>
         </html>
         """
-        
-        plain_message = f"""
+
+    plain_message = f"""
         Hi {user.username},
         
         Thank you for signing up! To complete your registration, please use the verification code below:
@@ -98,13 +100,40 @@ def send_otp_email(user: User, otp: str) -> bool:
         Best regards,
         Webinar Management System Team
         """
+
+    return subject, plain_message, html_message
+
+
+def get_from_email() -> str:
+    """Sender address for outgoing mail"""
+    return settings.DEFAULT_FROM_EMAIL or getattr(settings, 'EMAIL_HOST_USER', '')
+
+
+def send_otp_email(user: User, otp: str) -> bool:
+    """
+    Send OTP to user's email address with proper error handling.
+
+    Sends synchronously; request handlers should use queue_otp_email().
+    
+    Args:
+        user: User object
+        otp: Plain text OTP code
+    
+    Returns:
+        Boolean indicating success/failure
+        
+    Raises:
+        Exception: If SMTP sending fails (allows caller to handle)
+    """
+    try:
+        subject, plain_message, html_message = build_otp_email(user, otp)
         
         logger.info(f"Attempting to send OTP email to {user.email} (user_id={user.id})")
         
         send_mail(
             subject=subject,
             message=plain_message,
-            from_email=settings.DEFAULT_FROM_EMAIL or settings.EMAIL_HOST_USER,
+            from_email=get_from_email(),
             recipient_list=[user.email],
             html_message=html_message,
             fail_silently=False,  # Let exceptions propagate
@@ -129,6 +158,246 @@ def send_otp_email(user: User, otp: str) -> bool:
         raise
 
 
+# Whether a drain of the outbox is queued on the background runner and not yet started
+_drain_queued = False
+_drain_lock = threading.Lock()
+# (timer, due time) of the wake-up armed for the next retry
+_retry_timer = None
+
+
+def _drain_outbox() -> None:
+    global _drain_queued
+    with _drain_lock:
+        _drain_queued = False
+    batch_size = settings.EMAIL_OUTBOX_BATCH_SIZE
+    # A full batch means more may be due
+    while sum(deliver_queued_emails(batch_size).values()) >= batch_size:
+        pass
+    _arm_retry_timer()
+
+
+def _schedule_drain() -> None:
+    global _drain_queued
+    with _drain_lock:
+        if _drain_queued:
+            return
+        _drain_queued = True
+    run_in_background(_drain_outbox)
+
+
+def _retry_due() -> None:
+    global _retry_timer
+    with _drain_lock:
+        _retry_timer = None
+    _schedule_drain()
+
+
+def _arm_retry_timer() -> None:
+    """
+    Drain again when the next pending row comes due.
+
+    Without a worker nothing else would send a row waiting for its retry
+    until unrelated mail is queued. The wake-up is per process and lost on
+    restart; the next queued email or worker run picks the row up then.
+    """
+    global _retry_timer
+    next_due = (
+        EmailOutbox.objects.filter(status=EmailOutbox.STATUS_PENDING)
+        .order_by('next_attempt_at')
+        .values_list('next_attempt_at', flat=True)
+        .first()
+    )
+    if next_due is None:
+        return
+    with _drain_lock:
+        if _retry_timer is not None:
+            if _retry_timer[1] <= next_due:
+                return
+            _retry_timer[0].cancel()
+        timer = threading.Timer(max(0.0, (next_due - timezone.now()).total_seconds()), _retry_due)
+        timer.daemon = True
+        _retry_timer = (timer, next_due)
+        timer.start()
+
+
+def send_queued_on_commit() -> None:
+    """
+    Drain the outbox once the current transaction commits, if the web process sends mail.
+
+    Call after writing EmailOutbox rows without queue_email(), e.g. with bulk_create.
+    """
+    if settings.EMAIL_OUTBOX_SEND_ON_COMMIT:
+        # Many rows queued in one transaction still start a single drain
+        transaction.on_commit(_schedule_drain)
+
+
+def queue_email(to_email: str, subject: str, body: str, html_body: str = '',
+                expires_at=None) -> EmailOutbox:
+    """
+    Queue an email in the outbox.
+
+    The row is written in the caller's transaction, so it is only sent if
+    the surrounding work commits. With EMAIL_OUTBOX_SEND_ON_COMMIT the web
+    process then drains the outbox on the background runner and wakes up
+    again for retries; the send_queued_email worker, where one runs, also
+    picks them up.
+
+    Args:
+        to_email: Recipient address
+        subject: Subject line
+        body: Plain text body
+        html_body: Optional HTML alternative
+        expires_at: Drop the message instead of sending it after this time
+
+    Returns:
+        The queued EmailOutbox row
+    """
+    queued = EmailOutbox.objects.create(
+        to_email=to_email,
+        from_email=get_from_email(),
+        subject=subject,
+        body=body,
+        html_body=html_body,
+        expires_at=expires_at,
+    )
+    send_queued_on_commit()
+    return queued
+
+
+def otp_email_expiry():
+    """When a verification email queued now stops being worth sending"""
+    return timezone.now() + timedelta(minutes=OTP_EXPIRY_MINUTES)
+
+
+def queue_otp_email(user: User, otp: str) -> EmailOutbox:
+    """Queue the verification email for a one-time code"""
+    subject, plain_message, html_message = build_otp_email(user, otp)
+    queued = queue_email(user.email, subject, plain_message, html_message, expires_at=otp_email_expiry())
+    logger.info(f"OTP email queued for {user.email} (user_id={user.id}, outbox_id={queued.id})")
+    return queued
+
+
+def retry_delay(attempts: int) -> timedelta:
+    """Backoff before the next delivery attempt: doubles per attempt, capped"""
+    seconds = settings.EMAIL_OUTBOX_RETRY_BASE_SECONDS * (2 ** (attempts - 1))
+    return timedelta(seconds=min(seconds, settings.EMAIL_OUTBOX_RETRY_MAX_SECONDS))
+
+
+def expire_queued_emails(now=None) -> int:
+    """Drop pending rows whose ``expires_at`` passed, bodies and all; returns rows expired"""
+    return EmailOutbox.objects.filter(
+        status=EmailOutbox.STATUS_PENDING,
+        expires_at__lt=now or timezone.now(),
+    ).update(status=EmailOutbox.STATUS_EXPIRED, body='', html_body='')
+
+
+def claim_due_emails(batch_size: int) -> list:
+    """
+    Lease up to ``batch_size`` due rows to the caller.
+
+    Due rows are locked with ``SKIP LOCKED`` where the database supports it
+    and have ``next_attempt_at`` pushed EMAIL_OUTBOX_CLAIM_SECONDS ahead
+    before the short transaction ends, so other drains leave them alone
+    while they are sent. A drain that dies mid-batch only delays its
+    unsent rows until the lease runs out.
+    """
+    now = timezone.now()
+    with transaction.atomic():
+        due = EmailOutbox.objects.filter(
+            status=EmailOutbox.STATUS_PENDING,
+            next_attempt_at__lte=now,
+        ).order_by('next_attempt_at', 'id')
+        if connection.features.has_select_for_update_skip_locked:
+            due = due.select_for_update(skip_locked=True)
+        batch = list(due[:batch_size])
+        if batch:
+            leased_until = now + timedelta(seconds=settings.EMAIL_OUTBOX_CLAIM_SECONDS)
+            EmailOutbox.objects.filter(pk__in=[item.pk for item in batch]).update(next_attempt_at=leased_until)
+    return batch
+
+
+def deliver_queued_emails(batch_size: int = None, mail_connection=None) -> dict:
+    """
+    Send one batch of due outbox rows over a single mail connection.
+
+    Rows are claimed in a short transaction (see claim_due_emails) and sent
+    outside it, each row's outcome being saved right after its send, so a
+    crash or a failed write never re-sends messages already delivered. A
+    failed message is retried with exponential backoff and marked dead
+    after EMAIL_OUTBOX_MAX_ATTEMPTS; the connection is reopened after a
+    failure. Bodies are cleared once a row is sent, dead or expired, so
+    codes don't linger.
+
+    Args:
+        batch_size: Rows to send (default EMAIL_OUTBOX_BATCH_SIZE)
+        mail_connection: Open backend to reuse across batches (default: a new one per batch)
+
+    Returns:
+        Dict with counts of ``sent``, ``retried`` and ``dead`` rows
+    """
+    batch_size = batch_size or settings.EMAIL_OUTBOX_BATCH_SIZE
+    counts = {'sent': 0, 'retried': 0, 'dead': 0}
+
+    expire_queued_emails()
+    batch = claim_due_emails(batch_size)
+    if not batch:
+        return counts
+
+    owns_connection = mail_connection is None
+    if owns_connection:
+        mail_connection = get_connection(fail_silently=False)
+
+    try:
+        for item in batch:
+            item.attempts += 1
+            try:
+                # open() is a no-op while the connection is already open
+                mail_connection.open()
+                message = EmailMultiAlternatives(
+                    subject=item.subject,
+                    body=item.body,
+                    from_email=item.from_email or get_from_email(),
+                    to=[item.to_email],
+                    connection=mail_connection,
+                )
+                if item.html_body:
+                    message.attach_alternative(item.html_body, 'text/html')
+                message.send()
+            except Exception as e:
+                item.last_error = f"{type(e).__name__}: {e}"
+                if item.attempts >= settings.EMAIL_OUTBOX_MAX_ATTEMPTS:
+                    item.status = EmailOutbox.STATUS_DEAD
+                    item.body = ''
+                    item.html_body = ''
+                    counts['dead'] += 1
+                    logger.error(f"Giving up on outbox email {item.id} to {item.to_email}: {item.last_error}")
+                else:
+                    item.next_attempt_at = timezone.now() + retry_delay(item.attempts)
+                    counts['retried'] += 1
+                    logger.warning(f"Outbox email {item.id} to {item.to_email} failed, retrying: {item.last_error}")
+                # Start the next message on a fresh connection
+                try:
+                    mail_connection.close()
+                except Exception:
+                    pass
+            else:
+                item.status = EmailOutbox.STATUS_SENT
+                item.sent_at = timezone.now()
+                item.body = ''
+                item.html_body = ''
+                item.last_error = ''
+                counts['sent'] += 1
+            item.save(update_fields=[
+                'status', 'attempts', 'next_attempt_at', 'last_error', 'sent_at', 'body', 'html_body',
+            ])
+    finally:
+        if owns_connection:
+            mail_connection.close()
+
+    logger.info(f"Outbox batch delivered: {counts}")
+    return counts
+
+
 def create_or_update_email_verification(user: User) -> tuple:
     """
     Create or update email verification record with new OTP.
@@ -142,8 +411,8 @@ def create_or_update_email_verification(user: User) -> tuple:
     # Generate new OTP
     otp = generate_otp()
     
-    # Hash OTP
-    otp_hash = make_password(otp)
+    # Hash OTP (keyed HMAC; see accounts.services.hash_otp)
+    otp_hash = hash_otp(otp, user.id)
     
     logger.info(f"Generated new OTP for user {user.email} (user_id={user.id})")
     
@@ -0,0 +1,77 @@
+import statistics
+import time
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.test.utils import CaptureQueriesContext, override_settings
+from rest_framework.test import APIRequestFactory
+
+from accounts.models import UserProfile
+from accounts.views import CustomTokenObtainPairView
+
+
+class Command(BaseCommand):
+    help = (
+        "Benchmark the login endpoint: queries and latency per login. "
+        "Runs against a throwaway account inside a transaction that is rolled back."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--iterations', type=int, default=50, help='Logins per identifier type')
+        parser.add_argument(
+            '--fast-hasher',
+            action='store_true',
+            help='Use a cheap password hasher so database work is not hidden by hashing cost',
+        )
+
+    def handle(self, *args, **options):
+        overrides = {'ALLOWED_HOSTS': [*settings.ALLOWED_HOSTS, 'testserver']}
+        if options['fast_hasher']:
+            overrides['PASSWORD_HASHERS'] = ['django.contrib.auth.hashers.MD5PasswordHasher']
+
+        with override_settings(**overrides), transaction.atomic():
+            user = User.objects.create_user(
+                username='bench_login_user',
+                email='Bench.Login@Example.com',
+                password='bench-password-123',
+            )
+            profile = UserProfile.objects.get(user=user)
+            profile.is_email_verified = True
+            profile.save()
+
+            try:
+                for label, identifier in (
+                    ('username', user.username),
+                    ('email', user.email.lower()),
+                ):
+                    self._bench(label, identifier, options['iterations'])
+            finally:
+                transaction.set_rollback(True)
+
+    def _bench(self, label, identifier, iterations):
+        factory = APIRequestFactory()
+        view = CustomTokenObtainPairView.as_view()
+        payload = {'username': identifier, 'password': 'bench-password-123'}
+
+        timings = []
+        query_counts = []
+        for _ in range(iterations):
+            request = factory.post('/api/accounts/auth/login/', payload, format='json')
+            with CaptureQueriesContext(connection) as queries:
+                started = time.perf_counter()
+                response = view(request)
+                timings.append((time.perf_counter() - started) * 1000)
+            if response.status_code != 200:
+                self.stderr.write(f"Login by {label} failed: {response.status_code} {response.data}")
+                return
+            query_counts.append(len(queries))
+
+        timings.sort()
+        p95 = timings[min(len(timings) - 1, int(len(timings) * 0.95))]
+        self.stdout.write(
+            f"login by {label:8}  queries/login={statistics.mean(query_counts):.1f}  "
+            f"mean={statistics.mean(timings):.2f}ms  median={statistics.median(timings):.2f}ms  "
+            f"p95={p95:.2f}ms"
+        )
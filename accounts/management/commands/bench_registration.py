@@ -0,0 +1,78 @@
+import re
+import statistics
+import time
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.test.utils import override_settings
+from rest_framework.test import APIRequestFactory
+
+from accounts.models import EmailOutbox, EmailVerification
+from accounts.views import RegisterView, VerifyEmailView
+
+
+class Command(BaseCommand):
+    help = (
+        "Benchmark registration and email verification throughput. "
+        "Accounts and their queued mail are created inside a transaction that is rolled back."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--count', type=int, default=20, help='Registrations to run')
+
+    def handle(self, *args, **options):
+        overrides = {
+            'ALLOWED_HOSTS': [*settings.ALLOWED_HOSTS, 'testserver'],
+            'EMAIL_BACKEND': 'django.core.mail.backends.locmem.EmailBackend',
+        }
+        with override_settings(**overrides), transaction.atomic():
+            try:
+                self._bench(options['count'])
+            finally:
+                transaction.set_rollback(True)
+
+    def _bench(self, count):
+        factory = APIRequestFactory()
+        register = RegisterView.as_view()
+        verify = VerifyEmailView.as_view()
+
+        register_times = []
+        verify_times = []
+        for i in range(count):
+            email = f'bench_reg_{i}@example.com'
+            request = factory.post('/api/accounts/auth/register/', {
+                'username': f'bench_reg_{i}',
+                'email': email,
+                'password': 'bench-password-123',
+                'password_confirm': 'bench-password-123',
+            }, format='json')
+            started = time.perf_counter()
+            response = register(request)
+            register_times.append(time.perf_counter() - started)
+            if response.status_code != 201:
+                self.stderr.write(f"Registration failed: {response.status_code} {response.data}")
+                return
+
+            # A wrong code first, then the right one, like a real user typo
+            otp = re.search(r'\b(\d{6})\b', EmailOutbox.objects.filter(to_email=email).latest('id').body).group(1)
+            wrong = '000000' if otp != '000000' else '111111'
+            started = time.perf_counter()
+            verify(factory.post('/api/accounts/auth/verify-email/', {'email': email, 'otp': wrong}, format='json'))
+            response = verify(factory.post('/api/accounts/auth/verify-email/', {'email': email, 'otp': otp}, format='json'))
+            verify_times.append(time.perf_counter() - started)
+            if response.status_code != 200:
+                self.stderr.write(f"Verification failed: {response.status_code} {response.data}")
+                return
+
+        total = sum(register_times) + sum(verify_times)
+        self.stdout.write(
+            f"register: mean={statistics.mean(register_times) * 1000:.1f}ms  "
+            f"verify (wrong+right): mean={statistics.mean(verify_times) * 1000:.1f}ms  "
+            f"throughput={count / total:.2f} signups/s"
+        )
+        self.stdout.write(
+            f"verified accounts: {User.objects.filter(username__startswith='bench_reg_', is_active=True).count()}/{count}, "
+            f"pending verifications: {EmailVerification.objects.filter(user__username__startswith='bench_reg_').count()}"
+        )
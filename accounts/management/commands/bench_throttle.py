@@ -0,0 +1,84 @@
+import statistics
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.management.base import BaseCommand
+from django.test.utils import override_settings
+from rest_framework.parsers import JSONParser
+from rest_framework.request import Request
+from rest_framework.test import APIRequestFactory
+
+from accounts.views import CustomTokenObtainPairView
+from webinar_system.throttling import AccountRateThrottle, IPRateThrottle
+
+
+class CountingCache:
+    """Proxy that counts calls made to the cache backend"""
+
+    def __init__(self, backend):
+        self.backend = backend
+        self.calls = 0
+
+    def __getattr__(self, name):
+        attr = getattr(self.backend, name)
+        if not callable(attr):
+            return attr
+
+        def counted(*args, **kwargs):
+            self.calls += 1
+            return attr(*args, **kwargs)
+        return counted
+
+
+class Command(BaseCommand):
+    help = (
+        "Measure the per-request cost of the login rate limiter against the configured cache. "
+        "Uses keys under a throwaway scope with a rate high enough never to reject."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--iterations', type=int, default=5000, help='Throttle checks to time')
+        parser.add_argument('--clients', type=int, default=100, help='Distinct client addresses and accounts')
+
+    def handle(self, *args, **options):
+        rates = {'bench_ip': '1000000/min', 'bench_account': '1000000/min'}
+        overrides = {'REST_FRAMEWORK': {**settings.REST_FRAMEWORK, 'DEFAULT_THROTTLE_RATES': rates}}
+        with override_settings(**overrides):
+            self._bench(options['iterations'], options['clients'])
+
+    def _bench(self, iterations, clients):
+        factory = APIRequestFactory()
+        view = CustomTokenObtainPairView()
+        view.throttle_scope = 'bench'
+        requests = [
+            Request(factory.post(
+                '/api/accounts/auth/login/',
+                {'username': f'bench_throttle_{i}', 'password': 'x'},
+                format='json',
+                REMOTE_ADDR=f'10.99.{i // 256}.{i % 256}',
+            ), parsers=[JSONParser()])
+            for i in range(clients)
+        ]
+        for request in requests:
+            request.data  # parse once so only the throttle is timed
+
+        counting = CountingCache(cache)
+        timings = []
+        for i in range(iterations):
+            request = requests[i % clients]
+            started = time.perf_counter()
+            for throttle_class in (IPRateThrottle, AccountRateThrottle):
+                throttle = throttle_class()
+                throttle.cache = counting
+                throttle.allow_request(request, view)
+            timings.append((time.perf_counter() - started) * 1_000_000)
+
+        timings.sort()
+        p95 = timings[min(len(timings) - 1, int(len(timings) * 0.95))]
+        self.stdout.write(
+            f"{settings.CACHES['default']['BACKEND'].rsplit('.', 1)[-1]}: "
+            f"IP+account check mean={statistics.mean(timings):.1f}us "
+            f"median={statistics.median(timings):.1f}us p95={p95:.1f}us "
+            f"cache calls/request={counting.calls / iterations:.2f}"
+        )
@@ -0,0 +1,58 @@
+import signal
+import threading
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+
+from accounts.cleanup import cleanup_unverified_accounts
+
+
+class Command(BaseCommand):
+    help = (
+        "Delete expired email verification codes and accounts that were never "
+        "verified, in chunks. Runs once, or every --interval seconds."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--chunk-size',
+            type=int,
+            default=settings.ACCOUNT_CLEANUP_CHUNK_SIZE,
+            help='Rows deleted per transaction',
+        )
+        parser.add_argument(
+            '--retention-days',
+            type=int,
+            default=settings.UNVERIFIED_ACCOUNT_RETENTION_DAYS,
+            help='Days an unverified account is kept',
+        )
+        parser.add_argument(
+            '--interval',
+            type=float,
+            help='Keep running, cleaning up every this many seconds',
+        )
+        parser.add_argument('--dry-run', action='store_true', help='Only count what would be deleted')
+
+    def handle(self, *args, **options):
+        stop = threading.Event()
+        if options['interval']:
+            for signum in (signal.SIGINT, signal.SIGTERM):
+                signal.signal(signum, lambda *_: stop.set())
+
+        while not stop.is_set():
+            close_old_connections()
+            report = cleanup_unverified_accounts(
+                chunk_size=options['chunk_size'],
+                retention_days=options['retention_days'],
+                dry_run=options['dry_run'],
+            )
+            verb = 'Would delete' if report['dry_run'] else 'Deleted'
+            self.stdout.write(self.style.SUCCESS(
+                f"{verb} {report['verifications']} expired verification codes and "
+                f"{report['users']} unverified accounts in {report['elapsed_seconds']}s "
+                f"({report['rows_per_second']} rows/s)"
+            ))
+            if not options['interval']:
+                break
+            stop.wait(options['interval'])
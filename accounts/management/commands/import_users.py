@@ -0,0 +1,52 @@
+import json
+
+from django.core.management.base import BaseCommand, CommandError
+
+from accounts.provisioning import detect_format, import_users, read_rows
+
+
+class Command(BaseCommand):
+    help = (
+        "Create accounts in bulk from a CSV (with header row) or NDJSON file. "
+        "Columns: username, email, password, first_name, last_name, role."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help='CSV or NDJSON file')
+        parser.add_argument(
+            '--format',
+            dest='input_format',
+            choices=['csv', 'ndjson'],
+            help='Input format (default: from the file extension)',
+        )
+        parser.add_argument('--workers', type=int, help='Processes used for password hashing')
+        parser.add_argument('--batch-size', type=int, help='Accounts written per transaction')
+        parser.add_argument(
+            '--activate',
+            action='store_true',
+            help='Create active, verified accounts and queue no verification emails',
+        )
+        parser.add_argument('--dry-run', action='store_true', help='Validate only')
+
+    def handle(self, *args, **options):
+        input_format = options['input_format'] or detect_format(options['path'])
+        try:
+            with open(options['path'], encoding='utf-8-sig', newline='') as stream:
+                report = import_users(
+                    read_rows(stream, input_format),
+                    activate=options['activate'],
+                    dry_run=options['dry_run'],
+                    workers=options['workers'],
+                    batch_size=options['batch_size'],
+                )
+        except OSError as e:
+            raise CommandError(str(e))
+
+        for error in report['errors']:
+            self.stderr.write(f"line {error['line']}: {json.dumps(error['errors'])}")
+        verb = 'Validated' if report['dry_run'] else 'Created'
+        count = report['valid'] if report['dry_run'] else report['created']
+        self.stdout.write(self.style.SUCCESS(
+            f"{verb} {count} accounts, {report['failed']} rows failed, "
+            f"{report['elapsed_seconds']}s ({report['rows_per_second']} rows/s)"
+        ))
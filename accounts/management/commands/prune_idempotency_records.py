@@ -0,0 +1,11 @@
+from django.core.management.base import BaseCommand
+
+from webinar_system.idempotency import prune_idempotency_records
+
+
+class Command(BaseCommand):
+    help = "Delete stored Idempotency-Key responses that have expired."
+
+    def handle(self, *args, **options):
+        deleted = prune_idempotency_records()
+        self.stdout.write(self.style.SUCCESS(f"Deleted {deleted} expired idempotency records"))
@@ -0,0 +1,69 @@
+import signal
+import threading
+
+from django.conf import settings
+from django.core.mail import get_connection
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+
+from accounts.email_utils import deliver_queued_emails
+
+
+class Command(BaseCommand):
+    help = "Deliver queued email from the outbox in batches over a reused mail connection."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=settings.EMAIL_OUTBOX_BATCH_SIZE,
+            help='Messages sent per batch',
+        )
+        parser.add_argument(
+            '--poll-interval',
+            type=float,
+            default=settings.EMAIL_OUTBOX_POLL_SECONDS,
+            help='Seconds to wait once the outbox is drained',
+        )
+        parser.add_argument(
+            '--once',
+            action='store_true',
+            help='Drain the messages that are due now and exit',
+        )
+
+    def handle(self, *args, **options):
+        batch_size = options['batch_size']
+        stop = threading.Event()
+        if not options['once']:
+            for signum in (signal.SIGINT, signal.SIGTERM):
+                signal.signal(signum, lambda *_: stop.set())
+            self.stdout.write("Email outbox worker running")
+
+        mail_connection = get_connection(fail_silently=False)
+        totals = {'sent': 0, 'retried': 0, 'dead': 0}
+        try:
+            while not stop.is_set():
+                close_old_connections()
+                counts = deliver_queued_emails(batch_size, mail_connection)
+                for key, value in counts.items():
+                    totals[key] += value
+                if any(counts.values()) and not options['once']:
+                    self.stdout.write(
+                        f"Sent {counts['sent']}, retrying {counts['retried']}, dead {counts['dead']}"
+                    )
+
+                # A short batch means nothing else is due yet
+                if sum(counts.values()) < batch_size:
+                    if options['once']:
+                        break
+                    mail_connection.close()
+                    stop.wait(options['poll_interval'])
+        finally:
+            mail_connection.close()
+
+        if options['once']:
+            self.stdout.write(self.style.SUCCESS(
+                f"Sent {totals['sent']}, retrying {totals['retried']}, dead {totals['dead']}"
+            ))
+        else:
+            self.stdout.write("Email outbox worker stopped")
@@ -0,0 +1,21 @@
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+    """
+    Functional index on LOWER(auth_user.email) for case-insensitive login
+    lookups. auth_user belongs to django.contrib.auth, so the index is
+    managed here with raw SQL (supported by both PostgreSQL and SQLite).
+    """
+
+    dependencies = [
+        ('accounts', '0003_email_verification_system'),
+        ('auth', '0012_alter_user_first_name_max_length'),
+    ]
+
+    operations = [
+        migrations.RunSQL(
+            sql='CREATE INDEX IF NOT EXISTS accounts_user_email_lower_idx ON auth_user (LOWER(email));',
+            reverse_sql='DROP INDEX IF EXISTS accounts_user_email_lower_idx;',
+        ),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 6.0 on 2026-10-19 00:52
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0005_email_outbox'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='userprofile',
+            name='pending_picture_hash',
+            field=models.CharField(blank=True, editable=False, help_text='SHA-256 of an upload still being processed', max_length=64),
+        ),
+        migrations.AddField(
+            model_name='userprofile',
+            name='picture_hash',
+            field=models.CharField(blank=True, editable=False, help_text='SHA-256 of the upload whose resized variants are served', max_length=64),
+        ),
+    ]
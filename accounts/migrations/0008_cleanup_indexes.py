@@ -0,0 +1,23 @@
+# Generated by Django 6.0 on 2026-10-19 01:11
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0007_revoked_token'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='emailverification',
+            index=models.Index(fields=['created_at'], name='accounts_otp_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='userprofile',
+            index=models.Index(condition=models.Q(('is_email_verified', False)), fields=['created_at'], name='accounts_unverified_idx'),
+        ),
+    ]
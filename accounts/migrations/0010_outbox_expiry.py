@@ -0,0 +1,30 @@
+# Generated by Django 6.0 on 2026-10-19 02:22
+
+from django.db import migrations, models
+
+
+def clear_dead_bodies(apps, schema_editor):
+    # Dead rows used to keep their bodies, one-time codes included
+    EmailOutbox = apps.get_model('accounts', 'EmailOutbox')
+    EmailOutbox.objects.filter(status='dead').exclude(body='', html_body='').update(body='', html_body='')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0009_idempotency_record'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='emailoutbox',
+            name='expires_at',
+            field=models.DateTimeField(blank=True, help_text='Not sent after this time', null=True),
+        ),
+        migrations.AlterField(
+            model_name='emailoutbox',
+            name='status',
+            field=models.CharField(choices=[('pending', 'Pending'), ('sent', 'Sent'), ('dead', 'Dead'), ('expired', 'Expired')], default='pending', max_length=10),
+        ),
+        migrations.RunPython(clear_dead_bodies, migrations.RunPython.noop),
+    ]
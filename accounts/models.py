@@ -1,15 +1,14 @@
 from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
 from django.db import models
 from django.contrib.auth.models import User
-from django.db.models.signals import post_save
+from django.db.models.signals import post_delete, post_save, pre_save
 from django.dispatch import receiver
-from django.core.files.base import ContentFile
-from django.contrib.auth.hashers import make_password, check_password
 from django.utils import timezone
-from io import BytesIO
-from PIL import Image, ImageDraw, ImageFont
-import random
-import os
+
+from .services import check_otp, mark_auth_changed
+
+OTP_EXPIRY_MINUTES = 10
 
 
 class UserProfile(models.Model):
@@ -35,6 +34,18 @@ class UserProfile(models.Model):
         blank=True,
         help_text='User profile picture'
     )
+    picture_hash = models.CharField(
+        max_length=64,
+        blank=True,
+        editable=False,
+        help_text='SHA-256 of the upload whose resized variants are served'
+    )
+    pending_picture_hash = models.CharField(
+        max_length=64,
+        blank=True,
+        editable=False,
+        help_text='SHA-256 of an upload still being processed'
+    )
     is_email_verified = models.BooleanField(
         default=False,
         help_text='Whether user has verified their email address'
@@ -47,62 +58,29 @@ class UserProfile(models.Model):
         verbose_name = 'User Profile'
         verbose_name_plural = 'User Profiles'
         ordering = ['-created_at']
+        indexes = [
+            # Partial: only the few unverified profiles, scanned by cleanup_unverified_accounts
+            models.Index(
+                fields=['created_at'],
+                name='accounts_unverified_idx',
+                condition=models.Q(is_email_verified=False),
+            ),
+        ]
 
     def __str__(self) -> str:
         return f"{self.user.username} - {self.get_role_display()}"
 
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # Remember the stored role so role changes can invalidate token claims
+        instance._loaded_role = instance.__dict__.get('role')
+        return instance
+
     @property
     def is_admin(self) -> bool:
         """Check if user has admin role"""
         return self.role == 'admin'
-    
-    def generate_avatar(self):
-        """Generate a default avatar with first letter of username"""
-        # Avatar parameters
-        size = 200
-        background_colors = [
-            '#FF6B6B', '#4ECDC4', '#45B7D1', '#FFA07A', '#98D8C8',
-            '#F7DC6F', '#BB8FCE', '#85C1E2', '#F8B739', '#52A3A3'
-        ]
-        
-        # Pick a random soft color
-        bg_color = random.choice(background_colors)
-        
-        # Create image
-        img = Image.new('RGB', (size, size), bg_color)
-        draw = ImageDraw.Draw(img)
-        
-        # Get first letter
-        first_letter = self.user.username[0].upper()
-        
-        # Try to use a nice font
-        try:
-            font = ImageFont.truetype(
-                "/Windows/Fonts/arial.ttf" if os.name == 'nt' else "/usr/share/fonts/truetype/dejavu/DejaVuSans-Bold.ttf",
-                120
-            )
-        except (IOError, OSError):
-            # Fallback to default font
-            font = ImageFont.load_default()
-        
-        # Calculate text position
-        bbox = draw.textbbox((0, 0), first_letter, font=font)
-        text_width = bbox[2] - bbox[0]
-        text_height = bbox[3] - bbox[1]
-        x = (size - text_width) // 2
-        y = (size - text_height) // 2 - 10
-        
-        # Draw text
-        draw.text((x, y), first_letter, fill='white', font=font)
-        
-        # Save to BytesIO
-        img_io = BytesIO()
-        img.save(img_io, format='PNG')
-        img_io.seek(0)
-        
-        # Save to model
-        filename = f'avatar_{self.user.username}.png'
-        self.profile_picture.save(filename, ContentFile(img_io.getvalue()), save=False)
 
 
 @receiver(post_save, sender=User)
@@ -111,11 +89,7 @@ def create_user_profile(sender, instance, created, **kwargs):
     if created:
         # Set role to 'admin' if user is superuser or staff
         role = 'admin' if (instance.is_superuser or instance.is_staff) else 'student'
-        profile = UserProfile.objects.create(user=instance, role=role)
-        
-        # Generate avatar
-        profile.generate_avatar()
-        profile.save()
+        UserProfile.objects.create(user=instance, role=role)
 
 
 class EmailVerification(models.Model):
@@ -147,11 +121,14 @@ class EmailVerification(models.Model):
         app_label = 'accounts'
         verbose_name = 'Email Verification'
         verbose_name_plural = 'Email Verifications'
+        indexes = [
+            models.Index(fields=['created_at'], name='accounts_otp_created_idx'),
+        ]
 
     def __str__(self) -> str:
         return f"Email Verification - {self.user.email}"
 
-    def is_expired(self, timeout_minutes: int = 10) -> bool:
+    def is_expired(self, timeout_minutes: int = OTP_EXPIRY_MINUTES) -> bool:
         """Check if OTP is expired (default 10 minutes)"""
         expiration_time = self.created_at + timezone.timedelta(minutes=timeout_minutes)
         return timezone.now() > expiration_time
@@ -167,7 +144,7 @@ class EmailVerification(models.Model):
             return False
         
         # Check OTP
-        return check_password(otp, self.otp_hash)
+        return check_otp(otp, self.otp_hash, self.user_id)
 
     def increment_attempts(self) -> None:
         """Increment failed attempt counter"""
@@ -190,7 +167,164 @@ class EmailVerification(models.Model):
 
 
 @receiver(post_save, sender=User)
-def save_user_profile(sender, instance, **kwargs):
+def save_user_profile(sender, instance, update_fields=None, **kwargs):
     """Save the UserProfile when User is saved"""
+    # Partial saves (e.g. last_login on every login) don't touch the profile
+    if update_fields is not None:
+        return
     if hasattr(instance, 'profile'):
         instance.profile.save()
+
+
+# Fields whose change does not affect token claims or account access
+_CLAIM_NEUTRAL_USER_FIELDS = {'last_login', 'first_name', 'last_name'}
+
+
+@receiver(pre_save, sender=User)
+@receiver(pre_save, sender=UserProfile)
+def refuse_claims_only_save(sender, instance, **kwargs):
+    """Users rebuilt from token claims are partial and must never be written back"""
+    if getattr(instance, 'from_token_claims', False):
+        raise RuntimeError(
+            f"{sender.__name__} built from token claims is read-only; load it from the database to modify it"
+        )
+
+
+@receiver(post_save, sender=User)
+def invalidate_user_claims(sender, instance, created, update_fields=None, **kwargs):
+    """Make tokens issued before a status or credential change fall back to the database"""
+    if created:
+        return
+    if update_fields is not None and set(update_fields) <= _CLAIM_NEUTRAL_USER_FIELDS:
+        return
+    mark_auth_changed(instance.pk)
+
+
+@receiver(post_delete, sender=User)
+def invalidate_deleted_user_claims(sender, instance, **kwargs):
+    """Stop honouring tokens of a deleted user"""
+    mark_auth_changed(instance.pk)
+
+
+@receiver(post_save, sender=UserProfile)
+def invalidate_role_claims(sender, instance, created, **kwargs):
+    """Make tokens carrying the previous role fall back to the database"""
+    loaded_role = getattr(instance, '_loaded_role', None)
+    if not created and instance.role != loaded_role:
+        mark_auth_changed(instance.user_id)
+    instance._loaded_role = instance.role
+
+
+class EmailOutbox(models.Model):
+    """
+    Outgoing email queued inside the request transaction.
+
+    Rows are delivered by the ``send_queued_email`` worker, so a slow or
+    unreachable mail server never holds up a request. Failed sends are
+    retried with backoff until they are marked dead. Rows with an
+    ``expires_at`` (one-time codes) are dropped once it passes unsent.
+    Only pending rows keep their bodies.
+    """
+    STATUS_PENDING = 'pending'
+    STATUS_SENT = 'sent'
+    STATUS_DEAD = 'dead'
+    STATUS_EXPIRED = 'expired'
+    STATUS_CHOICES = [
+        (STATUS_PENDING, 'Pending'),
+        (STATUS_SENT, 'Sent'),
+        (STATUS_DEAD, 'Dead'),
+        (STATUS_EXPIRED, 'Expired'),
+    ]
+
+    to_email = models.EmailField(max_length=254)
+    from_email = models.CharField(max_length=254, blank=True)
+    subject = models.CharField(max_length=255)
+    body = models.TextField(blank=True)
+    html_body = models.TextField(blank=True)
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default=STATUS_PENDING)
+    attempts = models.PositiveIntegerField(default=0)
+    next_attempt_at = models.DateTimeField(default=timezone.now)
+    last_error = models.TextField(blank=True)
+    expires_at = models.DateTimeField(null=True, blank=True, help_text="Not sent after this time")
+    created_at = models.DateTimeField(auto_now_add=True)
+    sent_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        app_label = 'accounts'
+        ordering = ['next_attempt_at', 'id']
+        verbose_name = 'Queued Email'
+        verbose_name_plural = 'Email Outbox'
+        indexes = [
+            models.Index(fields=['status', 'next_attempt_at'], name='accounts_outbox_due_idx'),
+        ]
+
+    def __str__(self) -> str:
+        return f"{self.subject} -> {self.to_email} ({self.status})"
+
+
+class RevokedToken(models.Model):
+    """
+    JWT revoked before its expiry, e.g. on logout or refresh rotation.
+
+    Checked on every authenticated request through the in-process filter in
+    ``accounts.revocation``; rows are pruned once the token would have
+    expired anyway.
+    """
+    jti = models.CharField(max_length=255, unique=True)
+    token_type = models.CharField(max_length=20)
+    user = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        null=True,
+        blank=True,
+        related_name='revoked_tokens',
+    )
+    expires_at = models.DateTimeField(db_index=True)
+    revoked_at = models.DateTimeField(auto_now_add=True, db_index=True)
+
+    class Meta:
+        app_label = 'accounts'
+        verbose_name = 'Revoked Token'
+        verbose_name_plural = 'Revoked Tokens'
+
+    def __str__(self) -> str:
+        return f"{self.token_type} {self.jti} (user_id={self.user_id})"
+
+
+class IdempotencyRecord(models.Model):
+    """
+    Outcome of a request sent with an ``Idempotency-Key`` header.
+
+    The row is inserted before the request runs, so its unique constraint
+    doubles as the lock against concurrent duplicates; the response is
+    filled in afterwards and replayed to retries until ``expires_at``.
+    See ``webinar_system.idempotency``.
+    """
+    user = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='idempotency_records',
+    )
+    scope = models.CharField(max_length=100, help_text='Endpoint the key was used on')
+    key = models.CharField(max_length=255)
+    request_hash = models.CharField(max_length=64)
+    response_status = models.PositiveSmallIntegerField(
+        null=True,
+        blank=True,
+        help_text='Empty while the first request is still running'
+    )
+    response_body = models.JSONField(null=True, blank=True, encoder=DjangoJSONEncoder)
+    locked_until = models.DateTimeField(help_text='A running request that outlives this is presumed dead')
+    expires_at = models.DateTimeField(db_index=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        app_label = 'accounts'
+        verbose_name = 'Idempotency Record'
+        verbose_name_plural = 'Idempotency Records'
+        constraints = [
+            models.UniqueConstraint(fields=['user', 'scope', 'key'], name='unique_idempotency_key'),
+        ]
+
+    def __str__(self) -> str:
+        return f"{self.scope} {self.key} (user_id={self.user_id})"
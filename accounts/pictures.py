@@ -0,0 +1,178 @@
+"""
+Profile picture processing.
+
+Uploads are streamed to a temporary file while being hashed, checked from
+their header only, and then resized off the request path into square WebP
+and JPEG variants with all metadata dropped. Variants are stored under the
+SHA-256 of the uploaded bytes, so identical uploads share files and skip
+processing entirely.
+"""
+import hashlib
+import logging
+import os
+import tempfile
+from io import BytesIO
+from typing import Optional
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.utils import timezone
+from PIL import Image, ImageOps, UnidentifiedImageError
+
+from .models import UserProfile
+
+logger = logging.getLogger(__name__)
+
+ALLOWED_FORMATS = {'JPEG', 'PNG', 'WEBP', 'GIF'}
+VARIANT_FORMATS = {'webp': 'WEBP', 'jpg': 'JPEG'}
+
+
+class InvalidPicture(ValueError):
+    """Raised when an upload is not an acceptable image"""
+
+
+def variant_name(digest: str, size: int, ext: str = 'webp') -> str:
+    """Storage name of one processed variant"""
+    return f'profile_pictures/{digest[:2]}/{digest}/{size}.{ext}'
+
+
+def picture_size_for(request) -> int:
+    """Pixel size requested with ``?picture_size=sm|md|lg`` (default md)"""
+    sizes = settings.PROFILE_PICTURE_SIZES
+    key = request.query_params.get('picture_size') if request is not None else None
+    return sizes.get(key, sizes['md'])
+
+
+def variant_url(profile: UserProfile, request=None) -> Optional[str]:
+    """
+    URL of the WebP variant matching the request, or None if the profile
+    has no processed picture.
+    """
+    if not profile.picture_hash:
+        return None
+    url = default_storage.url(variant_name(profile.picture_hash, picture_size_for(request)))
+    return request.build_absolute_uri(url) if request is not None else url
+
+
+def stage_upload(upload) -> tuple:
+    """
+    Stream an upload to a temporary file, hashing it on the way.
+
+    Only the image header is read to check the format and dimensions.
+
+    Returns:
+        Tuple of (sha256 hex digest, temporary file path)
+
+    Raises:
+        InvalidPicture: If the file is too large or not a supported image
+    """
+    if upload.size > settings.PROFILE_PICTURE_MAX_UPLOAD_BYTES:
+        raise InvalidPicture(
+            f'Image is larger than {settings.PROFILE_PICTURE_MAX_UPLOAD_BYTES // (1024 * 1024)} MB'
+        )
+
+    digest = hashlib.sha256()
+    fd, path = tempfile.mkstemp(prefix='profile_picture_', dir=settings.FILE_UPLOAD_TEMP_DIR)
+    try:
+        with os.fdopen(fd, 'wb') as staged:
+            for chunk in upload.chunks():
+                digest.update(chunk)
+                staged.write(chunk)
+
+        try:
+            with Image.open(path) as image:
+                image_format, (width, height) = image.format, image.size
+        except (UnidentifiedImageError, OSError, Image.DecompressionBombError):
+            raise InvalidPicture('File is not a valid image')
+        if image_format not in ALLOWED_FORMATS:
+            raise InvalidPicture(f'Unsupported image format: {image_format}')
+        if width * height > settings.PROFILE_PICTURE_MAX_PIXELS:
+            raise InvalidPicture('Image dimensions are too large')
+    except Exception:
+        os.unlink(path)
+        raise
+
+    return digest.hexdigest(), path
+
+
+def discard_staged(path: str) -> None:
+    """Remove a file written by stage_upload(), if it is still there"""
+    try:
+        os.unlink(path)
+    except FileNotFoundError:
+        pass
+
+
+def variants_exist(digest: str) -> bool:
+    """Check whether every variant of a picture is already stored"""
+    return all(
+        default_storage.exists(variant_name(digest, size, ext))
+        for size in settings.PROFILE_PICTURE_SIZES.values()
+        for ext in VARIANT_FORMATS
+    )
+
+
+def render_variants(path: str, digest: str) -> None:
+    """Write the missing variants of a staged image; EXIF and other metadata are not copied"""
+    with Image.open(path) as source:
+        source.seek(0)
+        image = ImageOps.exif_transpose(source)
+        has_alpha = image.mode in ('RGBA', 'LA') or (image.mode == 'P' and 'transparency' in image.info)
+        image = image.convert('RGBA' if has_alpha else 'RGB')
+
+    for size in sorted(settings.PROFILE_PICTURE_SIZES.values(), reverse=True):
+        resized = ImageOps.fit(image, (size, size), method=Image.Resampling.LANCZOS)
+        for ext, image_format in VARIANT_FORMATS.items():
+            name = variant_name(digest, size, ext)
+            if default_storage.exists(name):
+                continue
+            frame = resized
+            if image_format == 'JPEG' and frame.mode == 'RGBA':
+                frame = Image.new('RGB', frame.size, 'white')
+                frame.paste(resized, mask=resized.getchannel('A'))
+            buffer = BytesIO()
+            if image_format == 'JPEG':
+                frame.save(buffer, format='JPEG', quality=82, optimize=True, progressive=True)
+            else:
+                frame.save(buffer, format='WEBP', quality=80, method=4)
+            default_storage.save(name, ContentFile(buffer.getvalue()))
+
+
+def apply_picture(profile_id: int, digest: str) -> bool:
+    """
+    Point a profile at processed variants, unless a newer upload replaced it.
+
+    ``profile_picture`` is set to the largest JPEG so existing consumers of
+    the field get a bounded, metadata-free file.
+    """
+    largest = max(settings.PROFILE_PICTURE_SIZES.values())
+    return bool(
+        UserProfile.objects.filter(pk=profile_id, pending_picture_hash=digest).update(
+            picture_hash=digest,
+            pending_picture_hash='',
+            profile_picture=variant_name(digest, largest, 'jpg'),
+            updated_at=timezone.now(),
+        )
+    )
+
+
+def process_profile_picture(profile_id: int, digest: str, path: str) -> None:
+    """
+    Background job: render a staged upload's variants and switch the profile to them.
+
+    Args:
+        profile_id: Profile the upload belongs to
+        digest: SHA-256 of the uploaded bytes
+        path: Temporary file written by stage_upload(); removed when done
+    """
+    try:
+        if not variants_exist(digest):
+            render_variants(path, digest)
+        apply_picture(profile_id, digest)
+        logger.info(f"Profile picture {digest[:12]} ready for profile {profile_id}")
+    except Exception:
+        logger.exception(f"Processing profile picture {digest[:12]} for profile {profile_id} failed")
+        UserProfile.objects.filter(pk=profile_id, pending_picture_hash=digest).update(pending_picture_hash='')
+    finally:
+        discard_staged(path)
@@ -0,0 +1,160 @@
+"""
+JWT revocation.
+
+Revoked token ids (``jti``) are stored in ``RevokedToken``. Authentication
+checks them through a Bloom filter held in each process: a token whose id
+is not in the filter is definitely not revoked, so the common case costs a
+few hash operations and no query. Only filter hits, which are revoked tokens
+plus a small false-positive rate, are confirmed against the table.
+
+Each process pulls recently revoked ids every TOKEN_REVOCATION_REFRESH_SECONDS,
+so a revocation made by another worker takes effect within that interval.
+The revoking process sees it immediately. Every
+TOKEN_REVOCATION_REBUILD_SECONDS the filter is rebuilt from unexpired rows
+and expired rows are deleted.
+"""
+import hashlib
+import logging
+import math
+import threading
+import time
+from datetime import datetime, timedelta, timezone as dt_timezone
+
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+
+from .models import RevokedToken
+
+logger = logging.getLogger(__name__)
+
+# Rows revoked this close to the last refresh are read again, covering
+# transactions that committed slightly out of order
+REFRESH_OVERLAP = timedelta(seconds=5)
+
+
+class BloomFilter:
+    """Fixed-size Bloom filter over strings using double hashing"""
+
+    def __init__(self, capacity: int, error_rate: float):
+        capacity = max(capacity, 1)
+        self.size = max(8, int(-capacity * math.log(error_rate) / (math.log(2) ** 2)))
+        self.hash_count = max(1, round(self.size / capacity * math.log(2)))
+        self.capacity = capacity
+        self.count = 0
+        self._bits = bytearray((self.size + 7) // 8)
+
+    def _positions(self, item: str):
+        digest = hashlib.blake2b(item.encode(), digest_size=16).digest()
+        h1 = int.from_bytes(digest[:8], 'little')
+        h2 = int.from_bytes(digest[8:], 'little') | 1
+        return ((h1 + i * h2) % self.size for i in range(self.hash_count))
+
+    def add(self, item: str) -> None:
+        for position in self._positions(item):
+            self._bits[position >> 3] |= 1 << (position & 7)
+        self.count += 1
+
+    def __contains__(self, item: str) -> bool:
+        return all(self._bits[position >> 3] & (1 << (position & 7)) for position in self._positions(item))
+
+
+class RevocationList:
+    """Process-local view of the revoked-token table"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._filter = None
+        self._refreshed_at = 0.0
+        self._rebuilt_at = 0.0
+        self._watermark = None
+
+    def is_revoked(self, jti: str) -> bool:
+        """Check a token id; queries the table only on a filter hit"""
+        if not jti:
+            return False
+        self._ensure_fresh()
+        if jti not in self._filter:
+            return False
+        return RevokedToken.objects.filter(jti=jti).exists()
+
+    def add(self, jti: str) -> None:
+        """Put a just-revoked id into this process's filter"""
+        self._ensure_fresh()
+        with self._lock:
+            self._filter.add(jti)
+
+    def refresh(self, rebuild: bool = False) -> None:
+        """
+        Pull ids revoked since the last refresh, or rebuild the whole filter.
+
+        A rebuild also prunes rows whose tokens have expired.
+        """
+        now = timezone.now()
+        with self._lock:
+            if rebuild or self._filter is None:
+                pruned, _ = RevokedToken.objects.filter(expires_at__lte=now).delete()
+                if pruned:
+                    logger.info(f"Pruned {pruned} expired revoked tokens")
+                live = list(RevokedToken.objects.filter(expires_at__gt=now).values_list('jti', flat=True))
+                capacity = max(settings.TOKEN_REVOCATION_BLOOM_CAPACITY, 2 * len(live))
+                bloom = BloomFilter(capacity, settings.TOKEN_REVOCATION_BLOOM_ERROR_RATE)
+                for jti in live:
+                    bloom.add(jti)
+                self._filter = bloom
+                self._rebuilt_at = time.monotonic()
+            else:
+                recent = RevokedToken.objects.filter(
+                    revoked_at__gte=self._watermark - REFRESH_OVERLAP
+                ).values_list('jti', flat=True)
+                for jti in recent:
+                    self._filter.add(jti)
+            self._watermark = now
+            self._refreshed_at = time.monotonic()
+
+    def _ensure_fresh(self) -> None:
+        clock = time.monotonic()
+        if self._filter is None:
+            self.refresh()
+        elif clock - self._rebuilt_at >= settings.TOKEN_REVOCATION_REBUILD_SECONDS:
+            self.refresh(rebuild=True)
+        elif clock - self._refreshed_at >= settings.TOKEN_REVOCATION_REFRESH_SECONDS:
+            self.refresh()
+        elif self._filter.count > 2 * self._filter.capacity:
+            # Far past capacity the false-positive rate climbs; resize
+            self.refresh(rebuild=True)
+
+
+revocation_list = RevocationList()
+
+
+def is_token_revoked(token) -> bool:
+    """Check whether a validated token has been revoked"""
+    return revocation_list.is_revoked(token.get('jti'))
+
+
+def revoke_token(token, user=None) -> bool:
+    """
+    Revoke a validated token until it expires.
+
+    Args:
+        token: Validated simplejwt token
+        user: Owner of the token, if known
+
+    Returns:
+        True if the token was newly revoked
+    """
+    jti = token.get('jti')
+    if not jti:
+        return False
+    expires_at = datetime.fromtimestamp(token['exp'], tz=dt_timezone.utc)
+    _, created = RevokedToken.objects.get_or_create(
+        jti=jti,
+        defaults={
+            'token_type': token.get('token_type', ''),
+            'user': user,
+            'expires_at': expires_at,
+        },
+    )
+    transaction.on_commit(lambda: revocation_list.add(jti))
+    return created
@@ -1,8 +1,15 @@
-from rest_framework import serializers
-from django.contrib.auth.models import User
-from rest_framework_simplejwt.serializers import TokenObtainPairSerializer
+from rest_framework import exceptions, serializers
+from django.contrib.auth.models import User, update_last_login
+from rest_framework_simplejwt.serializers import TokenObtainPairSerializer, TokenRefreshSerializer
+from rest_framework_simplejwt.exceptions import InvalidToken
+from rest_framework_simplejwt.settings import api_settings
 from rest_framework_simplejwt.tokens import Token
 from .models import UserProfile
+from .authentication import set_identity_claims
+from .avatars import default_avatar_url, profile_picture_url
+from .pictures import variant_url
+from .revocation import is_token_revoked, revoke_token
+from .services import resolve_login_user
 
 
 class EmailOrUsernameTokenObtainPairSerializer(TokenObtainPairSerializer):
@@ -12,34 +19,87 @@ class EmailOrUsernameTokenObtainPairSerializer(TokenObtainPairSerializer):
 
     @classmethod
     def get_token(cls, user):
-        """Override to include role in token"""
+        """Override to include role and the other identity claims in token"""
         token = super().get_token(user)
-        
-        # Add custom claims
-        try:
-            token['role'] = user.profile.role
-        except UserProfile.DoesNotExist:
-            token['role'] = 'admin' if (user.is_superuser or user.is_staff) else 'student'
-        
-        token['username'] = user.username
-        token['email'] = user.email
-        
+        set_identity_claims(token, user)
         return token
 
     def validate(self, attrs):
-        credentials = {
-            'username': attrs.get('username'),
-            'password': attrs.get('password')
-        }
-        
-        # If username looks like an email, try to find user by email
-        username_or_email = credentials['username']
-        if '@' in username_or_email:
-            user = User.objects.filter(email__iexact=username_or_email).first()
-            if user:
-                credentials['username'] = user.username
-        
-        return super().validate(credentials)
+        """
+        Check the password against the account resolved by the login view.
+
+        The view passes the user it already loaded (with profile) as
+        ``login_user`` in the context, so no further lookups are needed and
+        the token claims come from the same instance. Without it the
+        identifier is resolved here.
+        """
+        identifier = attrs.get(self.username_field)
+        password = attrs.get('password')
+        if 'login_user' in self.context:
+            user = self.context['login_user']
+        else:
+            user = resolve_login_user(identifier)
+
+        if user is None:
+            # Run the hasher anyway so unknown accounts take as long as wrong passwords
+            User().set_password(password)
+        elif not user.check_password(password):
+            user = None
+
+        self.user = user
+        if not api_settings.USER_AUTHENTICATION_RULE(self.user):
+            raise exceptions.AuthenticationFailed(
+                self.error_messages['no_active_account'],
+                'no_active_account',
+            )
+
+        refresh = self.get_token(self.user)
+        data = {'refresh': str(refresh), 'access': str(refresh.access_token)}
+
+        if api_settings.UPDATE_LAST_LOGIN:
+            update_last_login(None, self.user)
+
+        return data
+
+
+class ClaimsTokenRefreshSerializer(TokenRefreshSerializer):
+    """
+    Refresh serializer that re-stamps identity claims from the database.
+
+    Refresh tokens would otherwise copy the claims from login into every new
+    access token, keeping a stale role alive after it changed.
+    """
+
+    def validate(self, attrs):
+        refresh = self.token_class(attrs['refresh'])
+        if is_token_revoked(refresh):
+            raise InvalidToken('Token has been revoked')
+
+        user_id = refresh.payload.get(api_settings.USER_ID_CLAIM)
+        user = User.objects.select_related('profile').filter(
+            **{api_settings.USER_ID_FIELD: user_id}
+        ).first()
+        if not api_settings.USER_AUTHENTICATION_RULE(user):
+            raise exceptions.AuthenticationFailed(
+                self.error_messages['no_active_account'],
+                'no_active_account',
+            )
+
+        set_identity_claims(refresh, user)
+        data = {'access': str(refresh.access_token)}
+
+        if api_settings.ROTATE_REFRESH_TOKENS:
+            # A concurrent replay of the same token may have passed the check
+            # above; only the request that revokes it gets a new pair
+            if api_settings.BLACKLIST_AFTER_ROTATION and not revoke_token(refresh, user):
+                raise InvalidToken('Token is blacklisted')
+            refresh.set_jti()
+            refresh.set_exp()
+            refresh.set_iat()
+            refresh.outstand()
+            data['refresh'] = str(refresh)
+
+        return data
 
 
 class UserProfileSerializer(serializers.ModelSerializer):
@@ -52,13 +112,15 @@ class UserProfileSerializer(serializers.ModelSerializer):
         read_only_fields = ['id', 'created_at', 'updated_at']
     
     def get_profile_picture_url(self, obj):
-        """Get full URL for profile picture"""
+        """Get full URL for profile picture, or the default avatar"""
         request = self.context.get('request')
+        if obj.picture_hash:
+            return variant_url(obj, request)
         if obj.profile_picture:
             if request:
                 return request.build_absolute_uri(obj.profile_picture.url)
             return obj.profile_picture.url
-        return None
+        return default_avatar_url(obj.user.username, request)
 
 
 class UserSerializer(serializers.ModelSerializer):
@@ -83,16 +145,8 @@ class UserSerializer(serializers.ModelSerializer):
             return 'admin' if (obj.is_superuser or obj.is_staff) else 'student'
     
     def get_profile_picture_url(self, obj):
-        """Get full URL for profile picture"""
-        request = self.context.get('request')
-        try:
-            if obj.profile.profile_picture:
-                if request:
-                    return request.build_absolute_uri(obj.profile.profile_picture.url)
-                return obj.profile.profile_picture.url
-        except UserProfile.DoesNotExist:
-            pass
-        return None
+        """Get full URL for profile picture, or the default avatar"""
+        return profile_picture_url(obj, self.context.get('request'))
 
 
 class UserListSerializer(serializers.ModelSerializer):
@@ -117,16 +171,8 @@ class UserListSerializer(serializers.ModelSerializer):
             return 'admin' if (obj.is_superuser or obj.is_staff) else 'student'
     
     def get_profile_picture_url(self, obj):
-        """Get full URL for profile picture"""
-        request = self.context.get('request')
-        try:
-            if obj.profile.profile_picture:
-                if request:
-                    return request.build_absolute_uri(obj.profile.profile_picture.url)
-                return obj.profile.profile_picture.url
-        except UserProfile.DoesNotExist:
-            pass
-        return None
+        """Get full URL for profile picture, or the default avatar"""
+        return profile_picture_url(obj, self.context.get('request'))
 
 
 class UserRoleUpdateSerializer(serializers.Serializer):
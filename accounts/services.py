@@ -0,0 +1,105 @@
+"""
+Service helpers for accounts.
+Resolves login identities with a single query that also loads the profile,
+tracks when a user's token claims go stale, and hashes one-time codes.
+"""
+import time
+from typing import Optional
+
+from django.conf import settings
+from django.contrib.auth.hashers import check_password
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.utils.crypto import constant_time_compare, salted_hmac
+from django.db.models import Case, Q, When
+from django.db.models.functions import Lower
+
+
+def resolve_login_user(identifier: str) -> Optional[User]:
+    """
+    Find the account a login identifier refers to.
+
+    Matches the username exactly or, for identifiers containing ``@``, the
+    email case-insensitively through ``LOWER(email)`` so the functional index
+    is used. The profile is joined in the same query. An exact username
+    match wins over an email match.
+
+    Args:
+        identifier: Username or email address typed at login
+
+    Returns:
+        User with ``profile`` preloaded, or None if nothing matches
+    """
+    if not identifier:
+        return None
+
+    match = Q(username=identifier)
+    if '@' in identifier:
+        match |= Q(email_lower=identifier.lower())
+
+    return (
+        User.objects.annotate(email_lower=Lower('email'))
+        .select_related('profile')
+        .filter(match)
+        .order_by(Case(When(username=identifier, then=0), default=1), 'id')
+        .first()
+    )
+
+
+AUTH_CHANGED_KEY = 'accounts:auth_changed:{user_id}'
+
+
+def mark_auth_changed(user_id) -> None:
+    """
+    Record that a user's role, status or credentials just changed.
+
+    Access tokens issued up to now carry stale claims, so claims-based
+    authentication falls back to the database for them. The marker only
+    needs to outlive those tokens.
+
+    Saving a User or UserProfile calls this through signals; code that
+    changes them with ``QuerySet.update()`` must call it itself.
+    """
+    cache.set(
+        AUTH_CHANGED_KEY.format(user_id=user_id),
+        time.time(),
+        int(settings.SIMPLE_JWT['ACCESS_TOKEN_LIFETIME'].total_seconds()) + 60,
+    )
+
+
+def auth_changed_since(user_id, issued_at) -> bool:
+    """Check whether the user changed at or after ``issued_at`` (epoch seconds)."""
+    changed_at = cache.get(AUTH_CHANGED_KEY.format(user_id=user_id))
+    return changed_at is not None and issued_at <= changed_at
+
+
+OTP_HASH_PREFIX = 'hmac_sha256$'
+OTP_KEY_SALT = 'accounts.otp'
+
+
+def hash_otp(otp: str, user_id) -> str:
+    """
+    Hash a one-time code with an HMAC keyed by SECRET_KEY.
+
+    Codes expire in minutes and allow only a few attempts, so the password
+    hasher's work factor buys nothing; the server key is what keeps the
+    small code space from being brute-forced offline. The user id is mixed
+    in so equal codes hash differently per account.
+
+    Returns:
+        ``hmac_sha256$<hex digest>``
+    """
+    digest = salted_hmac(OTP_KEY_SALT, f'{user_id}:{otp}', algorithm='sha256').hexdigest()
+    return f'{OTP_HASH_PREFIX}{digest}'
+
+
+def check_otp(otp: str, otp_hash: str, user_id) -> bool:
+    """
+    Check a one-time code against its stored hash in constant time.
+
+    Rows written before keyed hashing hold password-hasher output and are
+    still accepted until they expire.
+    """
+    if otp_hash.startswith(OTP_HASH_PREFIX):
+        return constant_time_compare(hash_otp(otp, user_id), otp_hash)
+    return check_password(otp, otp_hash)
@@ -1,3 +1,1039 @@
-from django.test import TestCase
+import os
+import shutil
+import tempfile
+from datetime import timedelta
+from io import BytesIO, StringIO
+from unittest import mock
 
-# Create your tests here.
+from django.conf import settings
+from django.contrib.auth.hashers import make_password
+from django.contrib.auth.models import User
+from django.core import mail
+from django.core.cache import cache
+from django.core.files.storage import default_storage
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.mail.backends.locmem import EmailBackend as LocmemEmailBackend
+from django.core.management import call_command
+from django.test import override_settings
+from django.utils import timezone
+from PIL import Image
+from rest_framework import status
+from rest_framework.exceptions import AuthenticationFailed
+from rest_framework.request import Request
+from rest_framework.test import APIRequestFactory, APITestCase
+from rest_framework_simplejwt.tokens import AccessToken
+from webinar_system.throttling import IPRateThrottle, reset_settled_counts
+
+from .authentication import ClaimsJWTAuthentication
+from . import email_utils
+from .avatars import default_avatar_url
+from .checks import check_claims_auth_cache
+from .cleanup import cleanup_unverified_accounts
+from .email_utils import create_or_update_email_verification, deliver_queued_emails, queue_email
+from .models import EmailOutbox, EmailVerification, RevokedToken, UserProfile
+from .permissions import IsAdmin
+from .provisioning import hash_passwords
+from .revocation import BloomFilter, revocation_list
+from .pictures import variant_name
+from .serializers import UserSerializer
+from .views import RegisterView
+from .services import OTP_HASH_PREFIX, check_otp, hash_otp, resolve_login_user
+
+
+@override_settings(PASSWORD_HASHERS=['django.contrib.auth.hashers.MD5PasswordHasher'])
+class LoginTests(APITestCase):
+    """Tests for the login endpoint and identity resolution"""
+
+    url = '/api/accounts/auth/login/'
+
+    def setUp(self):
+        cache.clear()
+        self.student = User.objects.create_user(
+            username='student1',
+            email='Student.One@Test.com',
+            password='testpass123'
+        )
+        UserProfile.objects.filter(user=self.student).update(is_email_verified=True)
+
+    def test_login_by_username(self):
+        """Test login with username returns tokens, claims and user data"""
+        with self.assertNumQueries(2):
+            response = self.client.post(self.url, {'username': 'student1', 'password': 'testpass123'})
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['user']['role'], 'student')
+        token = AccessToken(response.data['access'])
+        self.assertEqual(token['role'], 'student')
+        self.assertEqual(token['username'], 'student1')
+
+    def test_login_by_email_case_insensitive(self):
+        """Test login with email ignores case"""
+        with self.assertNumQueries(2):
+            response = self.client.post(
+                self.url, {'username': 'student.one@test.COM', 'password': 'testpass123'}
+            )
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['user']['id'], self.student.id)
+        self.student.refresh_from_db()
+        self.assertIsNotNone(self.student.last_login)
+
+    def test_login_wrong_password(self):
+        """Test a wrong password is rejected"""
+        response = self.client.post(self.url, {'username': 'student1', 'password': 'wrong'})
+
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_login_unknown_user(self):
+        """Test an unknown identifier is rejected"""
+        response = self.client.post(self.url, {'username': 'nobody@test.com', 'password': 'testpass123'})
+
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_login_unverified_email(self):
+        """Test students must verify their email first"""
+        UserProfile.objects.filter(user=self.student).update(is_email_verified=False)
+
+        response = self.client.post(self.url, {'username': 'student1', 'password': 'testpass123'})
+
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+        self.assertEqual(response.data['error_code'], 'email_not_verified')
+
+    def test_login_deactivated_account(self):
+        """Test deactivated student accounts are refused"""
+        User.objects.filter(pk=self.student.pk).update(is_active=False)
+
+        response = self.client.post(self.url, {'username': 'student1', 'password': 'testpass123'})
+
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+        self.assertEqual(response.data['error_code'], 'account_inactive')
+
+    def test_login_syncs_staff_profile(self):
+        """Test staff accounts get a verified admin profile on login"""
+        staff = User.objects.create_user(
+            username='staff',
+            email='staff@test.com',
+            password='testpass123',
+            is_staff=True
+        )
+        UserProfile.objects.filter(user=staff).update(role='student', is_email_verified=False)
+
+        response = self.client.post(self.url, {'username': 'staff', 'password': 'testpass123'})
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['user']['role'], 'admin')
+        self.assertEqual(AccessToken(response.data['access'])['role'], 'admin')
+        profile = UserProfile.objects.get(user=staff)
+        self.assertEqual(profile.role, 'admin')
+        self.assertTrue(profile.is_email_verified)
+
+    def test_username_match_wins_over_email(self):
+        """Test an exact username match takes precedence over an email match"""
+        other = User.objects.create_user(
+            username='student.one@test.com',
+            email='other@test.com',
+            password='testpass123'
+        )
+
+        self.assertEqual(resolve_login_user('student.one@test.com'), other)
+        self.assertEqual(resolve_login_user('Student.One@test.com'), self.student)
+
+
+@override_settings(
+    PASSWORD_HASHERS=['django.contrib.auth.hashers.MD5PasswordHasher'],
+    # The test process is the only worker, so its local cache is shared
+    CLAIMS_AUTH_ENABLED=True,
+)
+class ClaimsAuthenticationTests(APITestCase):
+    """Tests for claims-based authentication of read-only requests"""
+
+    def setUp(self):
+        cache.clear()
+        # Start each test with a fresh revocation filter so no periodic refresh
+        # lands inside a query-count assertion
+        revocation_list.refresh()
+        self.admin = User.objects.create_user(
+            username='admin1',
+            email='admin1@test.com',
+            password='testpass123',
+            is_staff=True
+        )
+        self.student = User.objects.create_user(
+            username='student1',
+            email='student1@test.com',
+            password='testpass123',
+            first_name='Stu'
+        )
+        UserProfile.objects.filter(user=self.student).update(is_email_verified=True)
+        self.factory = APIRequestFactory()
+
+    def login(self, username):
+        response = self.client.post(
+            '/api/accounts/auth/login/', {'username': username, 'password': 'testpass123'}
+        )
+        return response.data
+
+    def authenticate(self, method, access):
+        request = Request(
+            getattr(self.factory, method)('/', HTTP_AUTHORIZATION=f'Bearer {access}'),
+            parser_context={'view': None},
+        )
+        return ClaimsJWTAuthentication().authenticate(request)
+
+    def test_safe_request_authenticates_without_queries(self):
+        """Test GET builds the user and profile from claims alone"""
+        access = self.login('admin1')['access']
+        request = Request(self.factory.get('/', HTTP_AUTHORIZATION=f'Bearer {access}'))
+
+        with self.assertNumQueries(0):
+            user, _ = ClaimsJWTAuthentication().authenticate(request)
+            request.user = user
+            self.assertTrue(IsAdmin().has_permission(request, None))
+
+        self.assertEqual(user.pk, self.admin.pk)
+        self.assertEqual(user.username, 'admin1')
+        self.assertEqual(user, self.admin)
+        self.assertEqual(user.profile.role, 'admin')
+
+    def test_disabled_claims_auth_loads_user(self):
+        """Test GET goes to the database when claims auth is off"""
+        access = self.login('student1')['access']
+
+        with override_settings(CLAIMS_AUTH_ENABLED=False), self.assertNumQueries(1):
+            user, _ = self.authenticate('get', access)
+
+        self.assertFalse(getattr(user, 'from_token_claims', False))
+
+    def test_claims_auth_needs_shared_cache(self):
+        """Test the system check refuses claims auth over a per-process cache"""
+        local = {'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}}
+        shared = {'default': {'BACKEND': 'django.core.cache.backends.redis.RedisCache'}}
+
+        with override_settings(CACHES=local):
+            self.assertEqual([error.id for error in check_claims_auth_cache(None)], ['accounts.E001'])
+        with override_settings(CACHES=shared):
+            self.assertEqual(check_claims_auth_cache(None), [])
+
+    def test_unsafe_request_loads_user(self):
+        """Test writes always authenticate against the database"""
+        access = self.login('student1')['access']
+
+        with self.assertNumQueries(1):
+            user, _ = self.authenticate('post', access)
+
+        self.assertFalse(getattr(user, 'from_token_claims', False))
+
+    def test_role_change_falls_back_to_database(self):
+        """Test tokens issued before a role change stop being trusted"""
+        access = self.login('student1')['access']
+        profile = UserProfile.objects.get(user=self.student)
+        profile.role = 'admin'
+        profile.save()
+
+        with self.assertNumQueries(2):
+            user, _ = self.authenticate('get', access)
+            self.assertEqual(user.profile.role, 'admin')
+
+    def test_deactivation_rejects_existing_token(self):
+        """Test a deactivated user cannot keep using an old token"""
+        access = self.login('student1')['access']
+        self.student.is_active = False
+        self.student.save()
+
+        with self.assertRaises(AuthenticationFailed):
+            self.authenticate('get', access)
+
+    def test_last_login_update_keeps_claims_trusted(self):
+        """Test routine last_login writes don't invalidate tokens"""
+        access = self.login('student1')['access']
+        self.login('student1')
+
+        with self.assertNumQueries(0):
+            self.authenticate('get', access)
+
+    def test_refresh_restamps_claims(self):
+        """Test refreshed access tokens carry the current role"""
+        tokens = self.login('student1')
+        UserProfile.objects.filter(user=self.student).update(role='admin')
+
+        response = self.client.post('/api/accounts/auth/refresh/', {'refresh': tokens['refresh']})
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(AccessToken(response.data['access'])['role'], 'admin')
+
+    def test_claims_user_is_read_only(self):
+        """Test a claims user can never be written back"""
+        user, _ = self.authenticate('get', self.login('student1')['access'])
+
+        with self.assertRaises(RuntimeError):
+            user.save()
+        self.assertEqual(User.objects.get(pk=self.student.pk).first_name, 'Stu')
+
+    def test_me_returns_full_user(self):
+        """Test /users/me/ still returns database fields"""
+        access = self.login('student1')['access']
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {access}')
+
+        response = self.client.get('/api/accounts/users/me/')
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['first_name'], 'Stu')
+        self.assertEqual(response.data['role'], 'student')
+
+
+class OTPHashingTests(APITestCase):
+    """Tests for keyed-HMAC one-time code hashing"""
+
+    url = '/api/accounts/auth/verify-email/'
+
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(
+            username='pending',
+            email='pending@test.com',
+            password='testpass123',
+            is_active=False
+        )
+
+    def test_hash_is_keyed_and_per_user(self):
+        """Test codes hash to prefixed HMAC digests that differ per account"""
+        otp_hash = hash_otp('123456', self.user.id)
+
+        self.assertTrue(otp_hash.startswith(OTP_HASH_PREFIX))
+        self.assertNotEqual(otp_hash, hash_otp('123456', self.user.id + 1))
+        self.assertTrue(check_otp('123456', otp_hash, self.user.id))
+        self.assertFalse(check_otp('654321', otp_hash, self.user.id))
+        self.assertFalse(check_otp('123456', otp_hash, self.user.id + 1))
+
+    def test_verify_email_with_new_code(self):
+        """Test the verify endpoint accepts a freshly issued code"""
+        verification, otp = create_or_update_email_verification(self.user)
+        self.assertTrue(verification.otp_hash.startswith(OTP_HASH_PREFIX))
+
+        response = self.client.post(self.url, {'email': 'pending@test.com', 'otp': otp})
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.user.refresh_from_db()
+        self.assertTrue(self.user.is_active)
+        self.assertFalse(EmailVerification.objects.filter(user=self.user).exists())
+
+    def test_wrong_code_counts_attempt(self):
+        """Test a wrong code is rejected and counted"""
+        _, otp = create_or_update_email_verification(self.user)
+        wrong = '000000' if otp != '000000' else '111111'
+
+        response = self.client.post(self.url, {'email': 'pending@test.com', 'otp': wrong})
+
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(EmailVerification.objects.get(user=self.user).attempts, 1)
+
+    @override_settings(PASSWORD_HASHERS=['django.contrib.auth.hashers.MD5PasswordHasher'])
+    def test_legacy_password_hasher_rows_still_verify(self):
+        """Test codes stored with the password hasher before the switch keep working"""
+        EmailVerification.objects.create(user=self.user, otp_hash=make_password('424242'))
+
+        response = self.client.post(self.url, {'email': 'pending@test.com', 'otp': '424242'})
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+
+class CountingEmailBackend(LocmemEmailBackend):
+    """Locmem backend that counts how many connections were created"""
+    instances = 0
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        CountingEmailBackend.instances += 1
+
+
+@override_settings(
+    PASSWORD_HASHERS=['django.contrib.auth.hashers.MD5PasswordHasher'],
+    EMAIL_BACKEND='django.core.mail.backends.locmem.EmailBackend',
+)
+class EmailOutboxTests(APITestCase):
+    """Tests for the email outbox and its worker"""
+
+    def test_register_queues_email_instead_of_sending(self):
+        """Test registration writes an outbox row and sends nothing inline"""
+        response = self.client.post('/api/accounts/auth/register/', {
+            'username': 'newbie',
+            'email': 'newbie@test.com',
+            'password': 'strong-pass-123',
+            'password_confirm': 'strong-pass-123',
+        })
+
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(len(mail.outbox), 0)
+        queued = EmailOutbox.objects.get(to_email='newbie@test.com')
+        self.assertEqual(queued.status, EmailOutbox.STATUS_PENDING)
+        self.assertEqual(queued.subject, 'Email Verification Code')
+        self.assertTrue(queued.html_body)
+
+    @override_settings(BACKGROUND_TASKS_EAGER=True)
+    def test_web_process_sends_queued_email_after_commit(self):
+        """Test the outbox is drained without a separate worker once the request commits"""
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post('/api/accounts/auth/register/', {
+                'username': 'newbie',
+                'email': 'newbie@test.com',
+                'password': 'strong-pass-123',
+                'password_confirm': 'strong-pass-123',
+            })
+
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(len(mail.outbox), 1)
+        self.assertEqual(mail.outbox[0].to, ['newbie@test.com'])
+        self.assertEqual(EmailOutbox.objects.get().status, EmailOutbox.STATUS_SENT)
+
+    @override_settings(EMAIL_BACKEND='accounts.tests.CountingEmailBackend')
+    def test_worker_sends_batch_over_one_connection(self):
+        """Test the worker drains the outbox over a single connection"""
+        for i in range(3):
+            queue_email(f'user{i}@test.com', f'Hello {i}', 'Plain body', '<p>HTML body</p>')
+        CountingEmailBackend.instances = 0
+
+        call_command('send_queued_email', '--once', '--batch-size', '2', stdout=StringIO())
+
+        self.assertEqual(CountingEmailBackend.instances, 1)
+        self.assertEqual(len(mail.outbox), 3)
+        self.assertEqual(mail.outbox[0].alternatives[0].content, '<p>HTML body</p>')
+        self.assertFalse(EmailOutbox.objects.exclude(status=EmailOutbox.STATUS_SENT).exists())
+        self.assertFalse(EmailOutbox.objects.exclude(body='').exists())
+
+    @override_settings(
+        EMAIL_BACKEND='django.core.mail.backends.smtp.EmailBackend',
+        EMAIL_HOST='127.0.0.1',
+        EMAIL_PORT=1,
+        EMAIL_USE_TLS=False,
+        EMAIL_TIMEOUT=2,
+        EMAIL_OUTBOX_MAX_ATTEMPTS=2,
+    )
+    def test_failed_send_backs_off_then_dead_letters(self):
+        """Test an undeliverable message is retried later and finally marked dead"""
+        queued = queue_email('unreachable@test.com', 'Hello', 'Body')
+
+        self.assertEqual(deliver_queued_emails(), {'sent': 0, 'retried': 1, 'dead': 0})
+        queued.refresh_from_db()
+        self.assertEqual(queued.attempts, 1)
+        self.assertGreater(queued.next_attempt_at, timezone.now())
+        self.assertTrue(queued.last_error)
+
+        # Not due again until the backoff elapses
+        self.assertEqual(deliver_queued_emails(), {'sent': 0, 'retried': 0, 'dead': 0})
+
+        EmailOutbox.objects.filter(pk=queued.pk).update(next_attempt_at=timezone.now())
+        self.assertEqual(deliver_queued_emails(), {'sent': 0, 'retried': 0, 'dead': 1})
+        queued.refresh_from_db()
+        self.assertEqual(queued.status, EmailOutbox.STATUS_DEAD)
+        self.assertEqual(queued.body, '')
+
+    def test_expired_code_is_never_sent(self):
+        """Test a verification email still queued when its code expires is dropped"""
+        queued = queue_email(
+            'late@test.com', 'Your code', 'Code: 123456', '<p>123456</p>',
+            expires_at=timezone.now() - timedelta(seconds=1)
+        )
+
+        self.assertEqual(deliver_queued_emails(), {'sent': 0, 'retried': 0, 'dead': 0})
+
+        queued.refresh_from_db()
+        self.assertEqual(queued.status, EmailOutbox.STATUS_EXPIRED)
+        self.assertEqual((queued.body, queued.html_body), ('', ''))
+        self.assertEqual(len(mail.outbox), 0)
+
+    def test_crash_mid_batch_keeps_delivered_rows(self):
+        """Test rows sent before a drain dies stay sent and the rest wait out the lease"""
+        first = queue_email('first@test.com', 'One', 'Body')
+        second = queue_email('second@test.com', 'Two', 'Body')
+
+        class Killed(BaseException):
+            pass
+
+        with mock.patch('accounts.email_utils.EmailMultiAlternatives.send', side_effect=[1, Killed()]):
+            with self.assertRaises(Killed):
+                deliver_queued_emails()
+
+        first.refresh_from_db()
+        second.refresh_from_db()
+        self.assertEqual(first.status, EmailOutbox.STATUS_SENT)
+        self.assertEqual(second.status, EmailOutbox.STATUS_PENDING)
+        self.assertGreater(second.next_attempt_at, timezone.now())
+        self.assertEqual(deliver_queued_emails(), {'sent': 0, 'retried': 0, 'dead': 0})
+
+    def test_web_process_wakes_up_for_retries(self):
+        """Test a drain that leaves a retry pending arms a timer for it"""
+        queued = queue_email('retry@test.com', 'Hello', 'Body')
+        EmailOutbox.objects.filter(pk=queued.pk).update(next_attempt_at=timezone.now() + timedelta(seconds=30))
+        self.addCleanup(setattr, email_utils, '_retry_timer', None)
+
+        with mock.patch('accounts.email_utils.threading.Timer') as timer:
+            email_utils._arm_retry_timer()
+            email_utils._arm_retry_timer()
+
+        timer.assert_called_once()
+        delay, callback = timer.call_args.args
+        self.assertAlmostEqual(delay, 30, delta=2)
+        self.assertIs(callback, email_utils._retry_due)
+        timer.return_value.start.assert_called_once()
+
+
+@override_settings(PASSWORD_HASHERS=['django.contrib.auth.hashers.MD5PasswordHasher'])
+class AvatarTests(APITestCase):
+    """Tests for lazily rendered default avatars"""
+
+    def test_new_user_gets_no_avatar_file(self):
+        """Test creating a user renders and stores nothing"""
+        user = User.objects.create_user(username='alice', email='alice@test.com', password='testpass123')
+
+        self.assertFalse(UserProfile.objects.get(user=user).profile_picture)
+
+    def test_serializer_falls_back_to_shared_avatar(self):
+        """Test users with the same initial share one avatar URL"""
+        alice = User.objects.create_user(username='alice', email='alice@test.com', password='testpass123')
+        adam = User.objects.create_user(username='adam', email='adam@test.com', password='testpass123')
+
+        url = UserSerializer(alice).data['profile_picture_url']
+
+        self.assertEqual(url, UserSerializer(adam).data['profile_picture_url'])
+        self.assertEqual(url, default_avatar_url('alice'))
+        self.assertEqual(UserSerializer(alice).data['profile']['profile_picture_url'], url)
+
+    def test_avatar_served_as_cacheable_svg(self):
+        """Test the avatar endpoint returns an immutable SVG"""
+        response = self.client.get(default_avatar_url('alice'))
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response['Content-Type'], 'image/svg+xml')
+        self.assertIn('immutable', response['Cache-Control'])
+        self.assertIn(b'>A</text>', response.content)
+
+    def test_unknown_avatar_is_not_found(self):
+        """Test out-of-range colors and multi-character letters are rejected"""
+        self.assertEqual(self.client.get('/api/accounts/avatars/99/A.svg').status_code, 404)
+        self.assertEqual(self.client.get('/api/accounts/avatars/1/AB.svg').status_code, 404)
+
+
+def make_image_upload(color='red', size=(900, 600), image_format='JPEG', name='photo.jpg'):
+    """Build an in-memory image upload carrying EXIF metadata"""
+    image = Image.new('RGB', size, color)
+    exif = Image.Exif()
+    exif[0x010F] = 'TestCamera'  # Make
+    buffer = BytesIO()
+    image.save(buffer, format=image_format, exif=exif)
+    return SimpleUploadedFile(name, buffer.getvalue(), content_type='image/jpeg')
+
+
+@override_settings(
+    PASSWORD_HASHERS=['django.contrib.auth.hashers.MD5PasswordHasher'],
+    BACKGROUND_TASKS_EAGER=True,
+)
+class ProfilePictureTests(APITestCase):
+    """Tests for the profile picture processing pipeline"""
+
+    def setUp(self):
+        media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media_root, ignore_errors=True)
+        self.staging_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.staging_dir, ignore_errors=True)
+        media = override_settings(MEDIA_ROOT=media_root, FILE_UPLOAD_TEMP_DIR=self.staging_dir)
+        media.enable()
+        self.addCleanup(media.disable)
+
+        self.user = User.objects.create_user(username='alice', email='alice@test.com', password='testpass123')
+        self.client.force_authenticate(self.user)
+
+    def upload(self, user, upload):
+        with self.captureOnCommitCallbacks(execute=True):
+            return self.client.post(
+                f'/api/accounts/users/{user.id}/upload_profile_picture/',
+                {'profile_picture': upload},
+                format='multipart',
+            )
+
+    def test_upload_produces_stripped_variants(self):
+        """Test uploads are resized into square WebP/JPEG variants without metadata"""
+        response = self.upload(self.user, make_image_upload())
+
+        self.assertEqual(response.status_code, status.HTTP_202_ACCEPTED)
+        profile = UserProfile.objects.get(user=self.user)
+        self.assertEqual(len(profile.picture_hash), 64)
+        self.assertEqual(profile.pending_picture_hash, '')
+        for size in (64, 128, 256):
+            for ext, image_format in (('webp', 'WEBP'), ('jpg', 'JPEG')):
+                with default_storage.open(variant_name(profile.picture_hash, size, ext)) as stored:
+                    with Image.open(stored) as variant:
+                        self.assertEqual(variant.format, image_format)
+                        self.assertEqual(variant.size, (size, size))
+                        self.assertEqual(len(variant.getexif()), 0)
+        self.assertEqual(profile.profile_picture.name, variant_name(profile.picture_hash, 256, 'jpg'))
+
+    def test_url_follows_requested_size(self):
+        """Test the serializer returns the variant matching ?picture_size="""
+        self.upload(self.user, make_image_upload())
+        digest = UserProfile.objects.get(user=self.user).picture_hash
+
+        response = self.client.get('/api/accounts/users/me/', {'picture_size': 'sm'})
+
+        self.assertTrue(response.data['profile_picture_url'].endswith(variant_name(digest, 64)))
+        self.assertTrue(response.data['profile']['profile_picture_url'].endswith(variant_name(digest, 64)))
+
+    def test_duplicate_upload_shares_files(self):
+        """Test identical bytes reuse the stored variants without reprocessing"""
+        self.upload(self.user, make_image_upload())
+        other = User.objects.create_user(username='bob', email='bob@test.com', password='testpass123')
+        self.client.force_authenticate(other)
+
+        response = self.upload(other, make_image_upload())
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(
+            UserProfile.objects.get(user=other).picture_hash,
+            UserProfile.objects.get(user=self.user).picture_hash,
+        )
+        digest = UserProfile.objects.get(user=other).picture_hash
+        self.assertEqual(len(default_storage.listdir(f'profile_pictures/{digest[:2]}/{digest}')[1]), 6)
+
+    def test_rejects_non_image(self):
+        """Test files that are not images are refused before any processing"""
+        upload = SimpleUploadedFile('notes.jpg', b'not an image', content_type='image/jpeg')
+
+        response = self.upload(self.user, upload)
+
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(UserProfile.objects.get(user=self.user).pending_picture_hash, '')
+
+    def test_failed_processing_cleans_up(self):
+        """Test a failing job removes the staged file and clears the pending hash"""
+        with mock.patch('accounts.pictures.render_variants', side_effect=OSError('disk full')):
+            response = self.upload(self.user, make_image_upload())
+
+        self.assertEqual(response.status_code, status.HTTP_202_ACCEPTED)
+        profile = UserProfile.objects.get(user=self.user)
+        self.assertEqual(profile.pending_picture_hash, '')
+        self.assertEqual(profile.picture_hash, '')
+        self.assertEqual(os.listdir(self.staging_dir), [])
+
+    def test_rolled_back_upload_removes_staged_file(self):
+        """Test the staged file is removed when the job is never handed over"""
+        with mock.patch('accounts.views.run_in_background', side_effect=RuntimeError('shutting down')):
+            with self.assertRaises(RuntimeError):
+                self.upload(self.user, make_image_upload())
+
+        self.assertEqual(UserProfile.objects.get(user=self.user).pending_picture_hash, '')
+        self.assertEqual(os.listdir(self.staging_dir), [])
+
+
+def throttle_rates(**rates):
+    """Override the throttle rates for a test"""
+    return override_settings(REST_FRAMEWORK={**settings.REST_FRAMEWORK, 'DEFAULT_THROTTLE_RATES': rates})
+
+
+@override_settings(PASSWORD_HASHERS=['django.contrib.auth.hashers.MD5PasswordHasher'])
+class RateLimitTests(APITestCase):
+    """Tests for sliding-window rate limiting of auth endpoints"""
+
+    url = '/api/accounts/auth/login/'
+
+    def setUp(self):
+        cache.clear()
+        reset_settled_counts()
+
+    @throttle_rates(login_account='3/min', login_ip='100/min')
+    def test_login_limited_per_account(self):
+        """Test guesses against one account are cut off while others still work"""
+        for _ in range(3):
+            response = self.client.post(self.url, {'username': 'victim', 'password': 'guess'})
+            self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+
+        response = self.client.post(self.url, {'username': 'VICTIM', 'password': 'guess'})
+
+        self.assertEqual(response.status_code, status.HTTP_429_TOO_MANY_REQUESTS)
+        self.assertGreater(int(response['Retry-After']), 0)
+        response = self.client.post(self.url, {'username': 'someone-else', 'password': 'guess'})
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    @throttle_rates(login_ip='2/min')
+    def test_login_limited_per_ip(self):
+        """Test one client can't spread guesses over many accounts"""
+        for name in ('a', 'b'):
+            self.client.post(self.url, {'username': name, 'password': 'guess'})
+
+        response = self.client.post(self.url, {'username': 'c', 'password': 'guess'}, REMOTE_ADDR='127.0.0.1')
+        self.assertEqual(response.status_code, status.HTTP_429_TOO_MANY_REQUESTS)
+
+        response = self.client.post(self.url, {'username': 'c', 'password': 'guess'}, REMOTE_ADDR='10.0.0.9')
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    @throttle_rates(login_ip='2/min')
+    def test_spoofed_forwarded_for_keeps_window(self):
+        """Test a client can't reset its limit by sending its own X-Forwarded-For"""
+        for spoofed in ('1.1.1.1', '2.2.2.2'):
+            self.client.post(
+                self.url, {'username': 'a', 'password': 'guess'},
+                HTTP_X_FORWARDED_FOR=f'{spoofed}, 203.0.113.7'
+            )
+
+        response = self.client.post(
+            self.url, {'username': 'a', 'password': 'guess'},
+            HTTP_X_FORWARDED_FOR='3.3.3.3, 203.0.113.7'
+        )
+
+        self.assertEqual(response.status_code, status.HTTP_429_TOO_MANY_REQUESTS)
+
+    @throttle_rates(register_ip='10/min')
+    def test_previous_window_slides_out(self):
+        """Test the previous window's count is weighted by its remaining overlap"""
+        request = Request(APIRequestFactory().post('/'))
+        view = RegisterView()
+
+        def allow_at(seconds):
+            throttle = IPRateThrottle()
+            throttle.timer = lambda: 6000 + seconds
+            return throttle.allow_request(request, view), throttle
+
+        for _ in range(10):
+            self.assertTrue(allow_at(50)[0])
+        self.assertFalse(allow_at(55)[0])
+
+        # 5s into the next window 10 * 55/60 of the old requests still count;
+        # at 6s in, 10 * 54/60 + 1 fits
+        allowed, throttle = allow_at(65)
+        self.assertFalse(allowed)
+        self.assertEqual(throttle.wait(), 1)
+        self.assertTrue(allow_at(66)[0])
+        self.assertFalse(allow_at(67)[0])
+
+        # 55s in, only 10 * 5/60 remain
+        for _ in range(8):
+            self.assertTrue(allow_at(115)[0])
+        self.assertFalse(allow_at(115)[0])
+
+    @throttle_rates(register_ip='10/min')
+    def test_allowed_request_costs_one_cache_call(self):
+        """Test the fast path is a single atomic increment per key"""
+        request = Request(APIRequestFactory().post('/'))
+        view = RegisterView()
+        throttle = IPRateThrottle()
+        throttle.timer = lambda: 6000
+        throttle.allow_request(request, view)
+
+        with mock.patch.object(cache, 'get', wraps=cache.get) as get, \
+                mock.patch.object(cache, 'incr', wraps=cache.incr) as incr:
+            self.assertTrue(throttle.allow_request(request, view))
+
+        self.assertEqual(incr.call_count, 1)
+        self.assertEqual(get.call_count, 0)
+
+
+@override_settings(PASSWORD_HASHERS=['django.contrib.auth.hashers.MD5PasswordHasher'])
+class TokenRevocationTests(APITestCase):
+    """Tests for logout and refresh-rotation token revocation"""
+
+    def setUp(self):
+        cache.clear()
+        revocation_list.refresh(rebuild=True)
+        self.user = User.objects.create_user(username='student1', email='student1@test.com', password='testpass123')
+        UserProfile.objects.filter(user=self.user).update(is_email_verified=True)
+        self.tokens = self.client.post(
+            '/api/accounts/auth/login/', {'username': 'student1', 'password': 'testpass123'}
+        ).data
+
+    def logout(self, **data):
+        with self.captureOnCommitCallbacks(execute=True):
+            return self.client.post('/api/accounts/auth/logout/', data, format='json')
+
+    def test_logout_revokes_access_and_refresh(self):
+        """Test tokens stop working for reads, writes and refresh after logout"""
+        self.client.credentials(HTTP_AUTHORIZATION=f"Bearer {self.tokens['access']}")
+        response = self.logout(refresh=self.tokens['refresh'])
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['revoked'], 2)
+        self.assertEqual(RevokedToken.objects.filter(user=self.user).count(), 2)
+        self.assertEqual(self.client.get('/api/accounts/users/me/').status_code, status.HTTP_401_UNAUTHORIZED)
+        self.client.credentials()
+        response = self.client.post('/api/accounts/auth/refresh/', {'refresh': self.tokens['refresh']})
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_logout_with_body_tokens_only(self):
+        """Test a client whose access token is gone can still revoke its refresh token"""
+        response = self.logout(refresh=self.tokens['refresh'])
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['revoked'], 1)
+        self.assertTrue(RevokedToken.objects.filter(token_type='refresh', user__isnull=True).exists())
+
+    def test_rotation_revokes_previous_refresh(self):
+        """Test a rotated refresh token can't be replayed"""
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post('/api/accounts/auth/refresh/', {'refresh': self.tokens['refresh']})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+        replay = self.client.post('/api/accounts/auth/refresh/', {'refresh': self.tokens['refresh']})
+
+        self.assertEqual(replay.status_code, status.HTTP_401_UNAUTHORIZED)
+        rotated = self.client.post('/api/accounts/auth/refresh/', {'refresh': response.data['refresh']})
+        self.assertEqual(rotated.status_code, status.HTTP_200_OK)
+
+    def test_concurrent_replay_gets_no_tokens(self):
+        """Test a replay that slipped past the revocation check still loses the race"""
+        response = self.client.post('/api/accounts/auth/refresh/', {'refresh': self.tokens['refresh']})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+        # The second request checked before the first one had written its revocation
+        with mock.patch('accounts.serializers.is_token_revoked', return_value=False):
+            replay = self.client.post('/api/accounts/auth/refresh/', {'refresh': self.tokens['refresh']})
+
+        self.assertEqual(replay.status_code, status.HTTP_401_UNAUTHORIZED)
+        self.assertNotIn('access', replay.data)
+
+    def test_valid_token_checked_without_queries(self):
+        """Test non-revoked tokens are cleared by the filter alone"""
+        self.logout(refresh=self.tokens['refresh'])
+        access = AccessToken(self.tokens['access'])
+
+        with self.assertNumQueries(0):
+            self.assertFalse(revocation_list.is_revoked(access['jti']))
+
+    def test_refresh_picks_up_revocations_from_other_processes(self):
+        """Test rows written elsewhere reach the filter on the next refresh"""
+        RevokedToken.objects.create(jti='elsewhere', token_type='access', expires_at=timezone.now() + timedelta(minutes=1))
+        self.assertFalse(revocation_list.is_revoked('elsewhere'))
+
+        revocation_list.refresh()
+
+        self.assertTrue(revocation_list.is_revoked('elsewhere'))
+
+    def test_rebuild_prunes_expired_rows(self):
+        """Test expired revocations are deleted when the filter is rebuilt"""
+        RevokedToken.objects.create(jti='old', token_type='access', expires_at=timezone.now() - timedelta(minutes=1))
+        RevokedToken.objects.create(jti='live', token_type='access', expires_at=timezone.now() + timedelta(minutes=1))
+
+        revocation_list.refresh(rebuild=True)
+
+        self.assertEqual(list(RevokedToken.objects.values_list('jti', flat=True)), ['live'])
+        self.assertTrue(revocation_list.is_revoked('live'))
+
+    def test_bloom_filter_has_no_false_negatives(self):
+        """Test every added id is found and unrelated ids are mostly rejected"""
+        bloom = BloomFilter(1000, 0.01)
+        for i in range(1000):
+            bloom.add(f'jti-{i}')
+
+        self.assertTrue(all(f'jti-{i}' in bloom for i in range(1000)))
+        false_positives = sum(f'other-{i}' in bloom for i in range(10000))
+        self.assertLess(false_positives, 300)
+
+
+@override_settings(PASSWORD_HASHERS=['django.contrib.auth.hashers.MD5PasswordHasher'])
+class BulkImportTests(APITestCase):
+    """Tests for bulk user provisioning"""
+
+    def setUp(self):
+        self.admin = User.objects.create_user(username='admin1', email='admin1@test.com', password='adminpass123', is_staff=True)
+        self.client.force_authenticate(user=self.admin)
+
+    def upload(self, content, name='users.csv', **data):
+        upload = SimpleUploadedFile(name, content.encode(), content_type='text/csv')
+        return self.client.post('/api/accounts/users/bulk_import/', {'file': upload, **data}, format='multipart')
+
+    def test_csv_import_creates_accounts_and_queues_verification(self):
+        """Test imported accounts look like self-registered ones"""
+        response = self.upload(
+            "username,email,password,first_name,role\n"
+            "alice,alice@test.com,Str0ngPass!,Alice,student\n"
+            "bob,bob@test.com,Str0ngPass!,,admin\n"
+        )
+
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(response.data['created'], 2)
+        alice = User.objects.get(username='alice')
+        self.assertFalse(alice.is_active)
+        self.assertTrue(alice.check_password('Str0ngPass!'))
+        self.assertEqual(alice.profile.role, 'student')
+        self.assertEqual(User.objects.get(username='bob').profile.role, 'admin')
+        self.assertEqual(EmailVerification.objects.filter(user__username__in=['alice', 'bob']).count(), 2)
+        self.assertEqual(EmailOutbox.objects.filter(to_email__in=['alice@test.com', 'bob@test.com']).count(), 2)
+
+    @override_settings(BACKGROUND_TASKS_EAGER=True)
+    def test_import_sends_verification_after_commit(self):
+        """Test imported accounts' codes are sent without waiting for other mail"""
+        with self.captureOnCommitCallbacks(execute=True):
+            self.upload("username,email,password\nivy,ivy@test.com,Str0ngPass!\n")
+
+        self.assertEqual(len(mail.outbox), 1)
+        self.assertEqual(mail.outbox[0].to, ['ivy@test.com'])
+        self.assertEqual(EmailOutbox.objects.get(to_email='ivy@test.com').status, EmailOutbox.STATUS_SENT)
+
+    @override_settings(BULK_IMPORT_MAX_ROWS=2)
+    def test_endpoint_row_cap(self):
+        """Test uploads over the endpoint's cap are refused before any hashing"""
+        response = self.upload(
+            "username,email,password\n"
+            + "".join(f"user{i},user{i}@test.com,Str0ngPass!\n" for i in range(3))
+        )
+
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn('import_users', response.data['detail'])
+        self.assertFalse(User.objects.filter(username__startswith='user').exists())
+
+    @override_settings(BULK_IMPORT_HASH_WORKERS=4)
+    def test_endpoint_hashes_without_process_pool(self):
+        """Test the admin endpoint never forks the web worker to hash"""
+        with mock.patch('accounts.provisioning.ProcessPoolExecutor') as pool:
+            response = self.upload(
+                "username,email,password\n"
+                "alice,alice@test.com,Str0ngPass!\n"
+                "bob,bob@test.com,Str0ngPass!\n"
+            )
+
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        pool.assert_not_called()
+
+    def test_per_line_errors(self):
+        """Test invalid, duplicate and existing rows are reported by line and skipped"""
+        response = self.upload(
+            "username,email,password\n"
+            "carol,carol@test.com,Str0ngPass!\n"
+            "carol,other@test.com,Str0ngPass!\n"
+            "dave,ADMIN1@test.com,Str0ngPass!\n"
+            "erin,not-an-email,short\n"
+        )
+
+        self.assertEqual(response.data['created'], 1)
+        self.assertEqual(response.data['failed'], 3)
+        errors = {error['line']: error['errors'] for error in response.data['errors']}
+        self.assertIn('username', errors[3])
+        self.assertIn('email', errors[4])
+        self.assertEqual(set(errors[5]), {'email', 'password'})
+        self.assertFalse(User.objects.filter(username__in=['dave', 'erin']).exists())
+
+    def test_ndjson_import_with_activate(self):
+        """Test activated imports are verified and send no email"""
+        response = self.upload(
+            '{"username": "frank", "email": "frank@test.com", "password": "Str0ngPass!"}\n'
+            '\n'
+            '[1, 2]\n',
+            name='users.ndjson',
+            activate='true',
+        )
+
+        self.assertEqual(response.data['created'], 1)
+        self.assertEqual(response.data['errors'][0]['line'], 3)
+        frank = User.objects.get(username='frank')
+        self.assertTrue(frank.is_active)
+        self.assertTrue(frank.profile.is_email_verified)
+        self.assertFalse(EmailOutbox.objects.filter(to_email='frank@test.com').exists())
+
+    def test_dry_run_creates_nothing(self):
+        """Test dry runs only validate"""
+        response = self.upload("username,email,password\ngina,gina@test.com,Str0ngPass!\n", dry_run='1')
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['valid'], 1)
+        self.assertFalse(User.objects.filter(username='gina').exists())
+
+    def test_non_admin_forbidden(self):
+        """Test only admins can import"""
+        student = User.objects.create_user(username='student1', email='student1@test.com', password='testpass123')
+        self.client.force_authenticate(user=student)
+
+        response = self.upload("username,email,password\nhank,hank@test.com,Str0ngPass!\n")
+
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+
+    def test_command_hashes_in_worker_processes(self):
+        """Test the command imports a file with a process pool"""
+        with tempfile.NamedTemporaryFile('w', suffix='.csv', delete=False) as source:
+            source.write("username,email,password\n")
+            for i in range(6):
+                source.write(f"user{i},user{i}@test.com,Str0ngPass!{i}\n")
+        self.addCleanup(os.unlink, source.name)
+        out = StringIO()
+
+        call_command('import_users', source.name, '--workers', '2', '--batch-size', '4', stdout=out)
+
+        self.assertIn('Created 6 accounts', out.getvalue())
+        self.assertTrue(User.objects.get(username='user5').check_password('Str0ngPass!5'))
+
+    def test_hash_passwords_keeps_order(self):
+        """Test pooled hashing returns hashes in input order"""
+        passwords = [f'password-{i}' for i in range(5)]
+        hashes = hash_passwords(passwords, workers=2)
+
+        user = User()
+        for password, encoded in zip(passwords, hashes):
+            user.password = encoded
+            self.assertTrue(user.check_password(password))
+
+
+@override_settings(PASSWORD_HASHERS=['django.contrib.auth.hashers.MD5PasswordHasher'])
+class AccountCleanupTests(APITestCase):
+    """Tests for deleting expired OTPs and abandoned registrations"""
+
+    def register(self, username, days_ago=0, otp_minutes_ago=0, **user_fields):
+        user = User.objects.create_user(
+            username=username, email=f'{username}@test.com', password='testpass123',
+            is_active=False, **user_fields
+        )
+        create_or_update_email_verification(user)
+        UserProfile.objects.filter(user=user).update(created_at=timezone.now() - timedelta(days=days_ago))
+        EmailVerification.objects.filter(user=user).update(
+            created_at=timezone.now() - timedelta(days=days_ago, minutes=otp_minutes_ago)
+        )
+        return user
+
+    def test_deletes_expired_codes_and_stale_users(self):
+        """Test old unverified accounts go, recent ones keep their account"""
+        self.register('fresh')
+        self.register('expired_code', otp_minutes_ago=30)
+        activated = self.register('activated', otp_minutes_ago=30)
+        User.objects.filter(pk=activated.pk).update(is_active=True)
+        stale = self.register('stale', days_ago=10)
+
+        report = cleanup_unverified_accounts(chunk_size=1)
+
+        self.assertEqual(report['verifications'], 1)
+        self.assertEqual(report['users'], 1)
+        self.assertFalse(User.objects.filter(pk=stale.pk).exists())
+        self.assertFalse(EmailVerification.objects.filter(user=activated).exists())
+        self.assertTrue(EmailVerification.objects.filter(user__username='fresh').exists())
+        # Still waiting to verify: the expired code is kept with the account
+        self.assertTrue(EmailVerification.objects.filter(user__username='expired_code').exists())
+
+    def test_keeps_recently_resent_and_activated_accounts(self):
+        """Test a new code within the window or activation protects old accounts"""
+        resent = self.register('resent', days_ago=10)
+        EmailVerification.objects.filter(user=resent).update(created_at=timezone.now() - timedelta(minutes=1))
+        activated = self.register('activated', days_ago=10)
+        User.objects.filter(pk=activated.pk).update(is_active=True)
+        logged_in = self.register('logged_in', days_ago=10, last_login=timezone.now() - timedelta(days=9))
+
+        report = cleanup_unverified_accounts()
+
+        self.assertEqual(report['users'], 0)
+        self.assertEqual(User.objects.filter(pk__in=[resent.pk, activated.pk, logged_in.pk]).count(), 3)
+
+    def test_keeps_users_whose_resent_code_expired(self):
+        """Test a code resent within the window protects the account after it expires"""
+        resent = self.register('resent', days_ago=10)
+        EmailVerification.objects.filter(user=resent).update(created_at=timezone.now() - timedelta(days=2))
+
+        for _ in range(2):
+            report = cleanup_unverified_accounts()
+
+        self.assertEqual(report['users'], 0)
+        self.assertTrue(User.objects.filter(pk=resent.pk).exists())
+        self.assertTrue(EmailVerification.objects.filter(user=resent).exists())
+
+    def test_command_dry_run(self):
+        """Test dry runs count without deleting"""
+        self.register('stale', days_ago=10)
+        activated = self.register('activated', otp_minutes_ago=30)
+        User.objects.filter(pk=activated.pk).update(is_active=True)
+        out = StringIO()
+
+        call_command('cleanup_unverified_accounts', '--dry-run', stdout=out)
+
+        self.assertIn('Would delete 1 expired verification codes and 1 unverified accounts', out.getvalue())
+        self.assertTrue(User.objects.filter(username='stale').exists())
@@ -13,6 +13,7 @@ from .views import (
     ResendOTPView,
     TestEmailView,
     UserDebugStateView,
+    AvatarView,
 )
 
 router = SimpleRouter()
@@ -32,5 +33,6 @@ urlpatterns = [
     path('auth/change-password/', ChangePasswordView.as_view(), name='change_password'),
     
     # User and profile endpoints
+    path('avatars/<int:color>/<str:letter>.svg', AvatarView.as_view(), name='avatar'),
     path('', include(router.urls)),
 ]
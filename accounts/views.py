@@ -3,12 +3,19 @@ from rest_framework.decorators import action
 from rest_framework.response import Response
 from rest_framework.permissions import IsAuthenticated, AllowAny
 from rest_framework.views import APIView
+from rest_framework_simplejwt.exceptions import TokenError
+from rest_framework_simplejwt.settings import api_settings as jwt_settings
+from rest_framework_simplejwt.tokens import AccessToken, RefreshToken
 from rest_framework_simplejwt.views import TokenObtainPairView
 from django.contrib.auth.models import User
 from django.contrib.auth import update_session_auth_hash
-from django.core.mail import send_mail
 from django.conf import settings
+from django.http import Http404, HttpResponse
+from django.db import transaction
 from django.utils import timezone
+import csv
+import io
+import itertools
 import logging
 
 from .models import UserProfile, EmailVerification
@@ -25,7 +32,22 @@ from .serializers import (
     UserDebugStateSerializer,
 )
 from .permissions import IsAdmin
-from .email_utils import create_or_update_email_verification, send_otp_email
+from .provisioning import detect_format, import_users, read_rows
+from .revocation import revoke_token
+from .services import resolve_login_user
+from .avatars import AVATAR_COLORS, profile_picture_url, render_avatar_svg
+from .pictures import (
+    InvalidPicture,
+    apply_picture,
+    discard_staged,
+    process_profile_picture,
+    stage_upload,
+    variant_url,
+    variants_exist,
+)
+from .email_utils import create_or_update_email_verification, queue_email, queue_otp_email
+from webinar_system.background import run_in_background
+from webinar_system.throttling import AccountRateThrottle, IPRateThrottle
 
 logger = logging.getLogger(__name__)
 
@@ -40,22 +62,45 @@ class CustomTokenObtainPairView(TokenObtainPairView):
     4. If all checks pass, proceed with token generation
     """
     permission_classes = [AllowAny]
+    throttle_classes = [IPRateThrottle, AccountRateThrottle]
+    throttle_scope = 'login'
     serializer_class = EmailOrUsernameTokenObtainPairSerializer
 
+    def get_serializer_context(self):
+        context = super().get_serializer_context()
+        if hasattr(self, 'login_user'):
+            context['login_user'] = self.login_user
+        return context
+
+    def _sync_admin_profile(self, user, profile):
+        """Make sure an admin/staff account has a verified admin profile"""
+        if profile is None:
+            profile = UserProfile.objects.create(user=user, role='admin', is_email_verified=True)
+        elif profile.role != 'admin' or not profile.is_email_verified:
+            profile.role = 'admin'
+            profile.is_email_verified = True
+            profile.save(update_fields=['role', 'is_email_verified', 'updated_at'])
+        else:
+            return profile
+
+        # Keep the instance the serializer and token claims will read in sync
+        user.profile = profile
+        logger.info(
+            "Synced admin profile during login",
+            extra={'user_id': user.id, 'username': user.username}
+        )
+        return profile
+
     def post(self, request, *args, **kwargs):
-        # First check if user exists and is email verified
+        # Resolve the account once (user + profile in a single query); the
+        # serializer checks the password against this same instance
         login_identifier = request.data.get('username')
-        user = None
-        
-        if login_identifier:
-            # Accept either username or email for lookup
-            user = User.objects.filter(username=login_identifier).first()
-            if user is None and "@" in login_identifier:
-                user = User.objects.filter(email__iexact=login_identifier).first()
+        user = resolve_login_user(login_identifier) if isinstance(login_identifier, str) else None
+        self.login_user = user
         
         # GATING LOGIC: Apply checks in order
         if user:
-            profile = UserProfile.objects.filter(user=user).first()
+            profile = getattr(user, 'profile', None)
             is_admin_account = (
                 user.is_superuser
                 or user.is_staff
@@ -88,46 +133,30 @@ class CustomTokenObtainPairView(TokenObtainPairView):
             # Admin accounts should be able to authenticate in frontend dashboard
             # even when created via CLI without email verification workflow.
             if is_admin_account:
-                profile, _ = UserProfile.objects.get_or_create(user=user)
-                profile_updated = False
-                if profile.role != 'admin':
-                    profile.role = 'admin'
-                    profile_updated = True
-                if not profile.is_email_verified:
-                    profile.is_email_verified = True
-                    profile_updated = True
-                if profile_updated:
-                    profile.save(update_fields=['role', 'is_email_verified', 'updated_at'])
-                    logger.info(
-                        "Synced admin profile during login",
-                        extra={'user_id': user.id, 'username': user.username}
-                    )
-            else:
-                # CHECK 2: Non-admin user email must be verified
-                try:
-                    profile = user.profile
-                    if not profile.is_email_verified:
-                        logger.warning(
-                            f"Login attempt for unverified email",
-                            extra={'email': user.email, 'user_id': user.id}
-                        )
-                        return Response(
-                            {
-                                'detail': 'Please verify your email first.',
-                                'email': user.email,
-                                'error_code': 'email_not_verified'
-                            },
-                            status=status.HTTP_403_FORBIDDEN
-                        )
-                except UserProfile.DoesNotExist:
-                    logger.error(
-                        f"UserProfile not found for user",
-                        extra={'user_id': user.id, 'email': user.email}
-                    )
-                    return Response(
-                        {'detail': 'User profile not found. Please contact support.'},
-                        status=status.HTTP_404_NOT_FOUND
-                    )
+                self._sync_admin_profile(user, profile)
+            elif profile is None:
+                logger.error(
+                    f"UserProfile not found for user",
+                    extra={'user_id': user.id, 'email': user.email}
+                )
+                return Response(
+                    {'detail': 'User profile not found. Please contact support.'},
+                    status=status.HTTP_404_NOT_FOUND
+                )
+            # CHECK 2: Non-admin user email must be verified
+            elif not profile.is_email_verified:
+                logger.warning(
+                    f"Login attempt for unverified email",
+                    extra={'email': user.email, 'user_id': user.id}
+                )
+                return Response(
+                    {
+                        'detail': 'Please verify your email first.',
+                        'email': user.email,
+                        'error_code': 'email_not_verified'
+                    },
+                    status=status.HTTP_403_FORBIDDEN
+                )
         
         # All checks passed - proceed with normal token flow
         response = super().post(request, *args, **kwargs)
@@ -137,21 +166,6 @@ class CustomTokenObtainPairView(TokenObtainPairView):
                 f"Successful login",
                 extra={'user_id': user.id, 'email': user.email}
             )
-            
-            # Ensure UserProfile exists and update role for admin/staff accounts
-            profile, created = UserProfile.objects.get_or_create(user=user)
-            if user.is_superuser or user.is_staff:
-                profile_changed = False
-                if profile.role != 'admin':
-                    profile.role = 'admin'
-                    profile_changed = True
-                if not profile.is_email_verified:
-                    profile.is_email_verified = True
-                    profile_changed = True
-                if profile_changed:
-                    profile.save(update_fields=['role', 'is_email_verified', 'updated_at'])
-                    logger.info(f"Auto-promoted superuser to admin role", extra={'user_id': user.id})
-            
             response.data['user'] = UserSerializer(user, context={'request': request}).data
         
         return response
@@ -164,66 +178,45 @@ class RegisterView(APIView):
     1. Create user with is_active=False
     2. Create UserProfile with is_email_verified=False
     3. Generate OTP and save hash
-    4. Send email with OTP
+    4. Queue email with OTP (sent by the send_queued_email worker)
     5. Return success/failure response
     """
     permission_classes = [AllowAny]
+    throttle_classes = [IPRateThrottle, AccountRateThrottle]
+    throttle_scope = 'register'
     serializer_class = UserRegistrationSerializer
 
     def post(self, request):
         serializer = UserRegistrationSerializer(data=request.data)
         if serializer.is_valid():
             try:
-                # Step 1: Create user with is_active=False
-                user = User.objects.create_user(
-                    username=serializer.validated_data['username'],
-                    email=serializer.validated_data['email'],
-                    password=serializer.validated_data['password'],
-                    first_name=serializer.validated_data.get('first_name', ''),
-                    last_name=serializer.validated_data.get('last_name', ''),
-                    is_active=False  # User must verify email first
-                )
-                logger.info(f"New user registered: {user.email} (user_id={user.id})")
-                
-                # Step 2: Ensure UserProfile is created
-                profile, created = UserProfile.objects.get_or_create(user=user)
-                profile.is_email_verified = False
-                profile.save()
-                logger.info(f"UserProfile created for {user.email} (user_id={user.id})")
-                
-                # Step 3: Generate and save OTP
-                verification, otp = create_or_update_email_verification(user)
-                logger.debug(f"OTP generated for {user.email} - hash saved in DB")
-                
-                # Step 4: Send OTP email
-                try:
-                    email_sent = send_otp_email(user=user, otp=otp)
-                    logger.info(f"OTP email send attempt completed for {user.email}")
-                    
-                except Exception as email_error:
-                    # Email sending failed - user is still created but can't complete registration
-                    logger.error(
-                        f"Email sending failed during registration for {user.email}",
-                        extra={
-                            'user_id': user.id,
-                            'email': user.email,
-                            'error_type': type(email_error).__name__,
-                        }
+                # The account and its verification email commit together
+                with transaction.atomic():
+                    # Step 1: Create user with is_active=False
+                    user = User.objects.create_user(
+                        username=serializer.validated_data['username'],
+                        email=serializer.validated_data['email'],
+                        password=serializer.validated_data['password'],
+                        first_name=serializer.validated_data.get('first_name', ''),
+                        last_name=serializer.validated_data.get('last_name', ''),
+                        is_active=False  # User must verify email first
                     )
+                    logger.info(f"New user registered: {user.email} (user_id={user.id})")
                     
-                    # Return clear error about email failure
-                    return Response(
-                        {
-                            "message": "User registered but email sending failed.",
-                            "email": user.email,
-                            "error": "email_send_failed",
-                            "error_detail": str(email_error) if settings.DEBUG else "Unable to send verification email. Please try again later."
-                        },
-                        status=status.HTTP_201_CREATED  # User created, but email not sent
-                    )
+                    # Step 2: Ensure UserProfile is created
+                    profile, created = UserProfile.objects.get_or_create(user=user)
+                    profile.is_email_verified = False
+                    profile.save()
+                    logger.info(f"UserProfile created for {user.email} (user_id={user.id})")
+                    
+                    # Step 3: Generate and save OTP
+                    verification, otp = create_or_update_email_verification(user)
+                    logger.debug(f"OTP generated for {user.email} - hash saved in DB")
+                    
+                    # Step 4: Queue OTP email for the outbox worker
+                    queue_otp_email(user=user, otp=otp)
                 
-                # Success: Email sent
-                logger.info(f"Registration completed successfully for {user.email} - verification email sent")
+                logger.info(f"Registration completed successfully for {user.email} - verification email queued")
                 return Response(
                     {
                         "message": "User registered successfully. Please check your email for the verification code.",
@@ -328,7 +321,9 @@ class UserViewSet(viewsets.ModelViewSet):
     @action(detail=False, methods=['get'])
     def me(self, request):
         """Get current user's information"""
-        serializer = self.get_serializer(request.user)
+        # request.user may be rebuilt from token claims; names and picture need the row
+        user = User.objects.select_related('profile').get(pk=request.user.pk)
+        serializer = self.get_serializer(user)
         return Response(serializer.data)
     
     @action(detail=True, methods=['post'], permission_classes=[IsAdmin])
@@ -372,6 +367,41 @@ class UserViewSet(viewsets.ModelViewSet):
             )
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
     
+    @action(detail=False, methods=['post'], permission_classes=[IsAdmin], url_path='bulk_import')
+    def bulk_import(self, request):
+        """Create accounts from an uploaded CSV or NDJSON file (admin only)
+
+        Form fields:
+        - file: CSV with a header row, or NDJSON (.ndjson/.jsonl)
+        - activate: create active, verified accounts without verification emails
+        - dry_run: validate only
+        """
+        upload = request.FILES.get('file')
+        if upload is None:
+            return Response({'detail': 'No file provided'}, status=status.HTTP_400_BAD_REQUEST)
+        
+        input_format = detect_format(upload.name, upload.content_type)
+        stream = io.TextIOWrapper(upload.file, encoding='utf-8-sig', newline='')
+        try:
+            rows = list(itertools.islice(read_rows(stream, input_format), settings.BULK_IMPORT_MAX_ROWS + 1))
+        except (UnicodeDecodeError, csv.Error) as e:
+            return Response({'detail': f'Could not read file: {e}'}, status=status.HTTP_400_BAD_REQUEST)
+        if len(rows) > settings.BULK_IMPORT_MAX_ROWS:
+            return Response(
+                {'detail': f'At most {settings.BULK_IMPORT_MAX_ROWS} rows per upload; use the import_users command for larger files.'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        
+        activate = str(request.data.get('activate', '')).lower() in ('1', 'true', 'yes')
+        dry_run = str(request.data.get('dry_run', '')).lower() in ('1', 'true', 'yes')
+        # Hash in this process: forking a pool from a web worker mid-request
+        # would copy its open database connections into the children
+        report = import_users(rows, activate=activate, dry_run=dry_run, workers=1)
+        return Response(
+            report,
+            status=status.HTTP_201_CREATED if report['created'] else status.HTTP_200_OK
+        )
+    
     @action(detail=True, methods=['post'], permission_classes=[IsAuthenticated])
     def upload_profile_picture(self, request, pk=None):
         """Upload profile picture for a user"""
@@ -396,19 +426,65 @@ class UserViewSet(viewsets.ModelViewSet):
                 status=status.HTTP_400_BAD_REQUEST
             )
         
-        profile, created = UserProfile.objects.get_or_create(user=user)
-        profile.profile_picture = request.FILES['profile_picture']
-        profile.save()
+        try:
+            digest, staged_path = stage_upload(request.FILES['profile_picture'])
+        except InvalidPicture as e:
+            return Response({'detail': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        
+        # The staged file belongs to the job once the transaction commits;
+        # if it never does, the job won't run and the file is removed here
+        try:
+            with transaction.atomic():
+                profile, created = UserProfile.objects.get_or_create(user=user)
+                profile.pending_picture_hash = digest
+                profile.save(update_fields=['pending_picture_hash'])
+                # Identical bytes were processed before: switch over without any image work
+                reused = variants_exist(digest)
+                if reused:
+                    apply_picture(profile.id, digest)
+                else:
+                    run_in_background(process_profile_picture, profile.id, digest, staged_path)
+        except Exception:
+            discard_staged(staged_path)
+            raise
+        
+        if reused:
+            discard_staged(staged_path)
+            profile.refresh_from_db()
+            return Response(
+                {
+                    'message': 'Profile picture updated',
+                    'profile_picture_url': variant_url(profile, request)
+                },
+                status=status.HTTP_200_OK
+            )
         
         return Response(
             {
-                'message': 'Profile picture updated',
-                'profile_picture_url': request.build_absolute_uri(profile.profile_picture.url)
+                'message': 'Profile picture uploaded and is being processed',
+                'profile_picture_url': profile_picture_url(user, request)
             },
-            status=status.HTTP_200_OK
+            status=status.HTTP_202_ACCEPTED
         )
 
 
+class AvatarView(APIView):
+    """Default avatar for users without a profile picture.
+
+    The URL encodes everything the image depends on, so responses are
+    cacheable forever.
+    """
+    permission_classes = [AllowAny]
+    authentication_classes = []
+
+    def get(self, request, color, letter):
+        if len(letter) != 1 or not 0 <= color < len(AVATAR_COLORS):
+            raise Http404
+        response = HttpResponse(render_avatar_svg(letter, color), content_type='image/svg+xml')
+        response['Cache-Control'] = 'public, max-age=31536000, immutable'
+        return response
+
+
 class ChangePasswordView(APIView):
     """View for changing user password"""
     permission_classes = [IsAuthenticated]
@@ -441,16 +517,44 @@ class ChangePasswordView(APIView):
 
 
 class LogoutView(APIView):
-    """Logout endpoint for token blacklisting (if using token blacklist)"""
-    permission_classes = [IsAuthenticated]
+    """Logout endpoint that revokes the caller's tokens
+
+    Revokes the access token used to authenticate, plus any ``refresh`` or
+    ``access`` token sent in the body, so a client can log out even after
+    its access token expired. Expired or invalid tokens are already unusable
+    and are skipped.
+    """
+    permission_classes = [AllowAny]
     
     def post(self, request):
-        """
-        Logout user by blacklisting token
-        Note: Requires django-rest-framework-simplejwt with TOKEN_BLACKLIST_ENABLED
-        """
+        tokens = []
+        if request.auth is not None:
+            tokens.append(request.auth)
+        for field, token_class in (('refresh', RefreshToken), ('access', AccessToken)):
+            raw_token = request.data.get(field)
+            if not raw_token:
+                continue
+            try:
+                tokens.append(token_class(raw_token))
+            except TokenError:
+                continue
+        
+        if not tokens and not (request.data.get('refresh') or request.data.get('access')):
+            return Response(
+                {'detail': 'Provide the tokens to revoke or authenticate with one.'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        
+        user = request.user if request.user.is_authenticated else None
+        with transaction.atomic():
+            revoked = 0
+            for token in tokens:
+                # Only attribute tokens that belong to the authenticated caller
+                owned = user is not None and str(token.get(jwt_settings.USER_ID_CLAIM)) == str(user.pk)
+                revoked += revoke_token(token, user if owned else None)
+        
         return Response(
-            {'message': 'Logout successful. Please discard your tokens.'},
+            {'message': 'Logout successful.', 'revoked': revoked},
             status=status.HTTP_200_OK
         )
 
@@ -458,6 +562,8 @@ class LogoutView(APIView):
 class VerifyEmailView(APIView):
     """Email verification endpoint with OTP"""
     permission_classes = [AllowAny]
+    throttle_classes = [IPRateThrottle, AccountRateThrottle]
+    throttle_scope = 'verify_email'
 
     def post(self, request):
         serializer = VerifyEmailSerializer(data=request.data)
@@ -479,7 +585,7 @@ class VerifyEmailView(APIView):
                 verification = EmailVerification.objects.get(user=user)
             except EmailVerification.DoesNotExist:
                 return Response(
-                    {'detail': 'No verification record found. Please register again.'},
+                    {'detail': 'No active verification code found. Please request a new OTP.'},
                     status=status.HTTP_404_NOT_FOUND
                 )
             
@@ -536,13 +642,12 @@ class TestEmailView(APIView):
     """Temporary debug endpoint to test email sending configuration.
     
     This endpoint:
-    - Tests SMTP connectivity
-    - Verifies email_utils.send_otp_email() works
     - Validates EMAIL settings
+    - Queues a test email for the send_queued_email worker
     
     Response:
-    - 200: Email sent successfully
-    - 500: Email sending failed (shows error details)
+    - 202: Email queued (check the outbox row for delivery errors)
+    - 500: Email is not configured
     """
     permission_classes = [AllowAny]
 
@@ -592,71 +697,40 @@ class TestEmailView(APIView):
                     status=status.HTTP_500_INTERNAL_SERVER_ERROR
                 )
         
-        try:
-            # Test SMTP by sending a simple test email
-            send_mail(
-                subject="Test Email - SMTP Configuration Check",
-                message=f"This is a test email sent at {timezone.now()}. If you received this, SMTP is working correctly.",
-                from_email=settings.DEFAULT_FROM_EMAIL or settings.EMAIL_HOST_USER,
-                recipient_list=[test_email],
-                html_message=f"""
+        # Delivery happens in the send_queued_email worker; failures show up
+        # on the outbox row's last_error
+        queued = queue_email(
+            test_email,
+            subject="Test Email - SMTP Configuration Check",
+            body=f"This is a test email queued at {timezone.now()}. If you received this, SMTP is working correctly.",
+            html_body=f"""
                 <html>
                     <body style="font-family: Arial; text-align: center;">
                         <h2>SMTP Configuration Working</h2>
-                        <p>Sent at: {timezone.now()}</p>
+                        <p>Queued at: {timezone.now()}</p>
                         <p>This test confirms your email sending is properly configured.</p>
                     </body>
                 </html>
                 """,
-                fail_silently=False,
-            )
-            
-            logger.info(f"Test email successfully sent to {test_email}")
-            return Response(
-                {
-                    'success': True,
-                    'message': f'Test email sent successfully to {test_email}',
-                    'timestamp': timezone.now().isoformat()
-                },
-                status=status.HTTP_200_OK
-            )
-            
-        except Exception as e:
-            logger.error(
-                f"Test email failed to {test_email}",
-                exc_info=True,
-                extra={
-                    'email': test_email,
-                    'error_type': type(e).__name__,
-                    'email_backend': getattr(settings, 'EMAIL_BACKEND', ''),
-                    'email_host': getattr(settings, 'EMAIL_HOST', ''),
-                    'email_port': getattr(settings, 'EMAIL_PORT', ''),
-                    'email_use_tls': getattr(settings, 'EMAIL_USE_TLS', ''),
-                }
-            )
-            
-            return Response(
-                {
-                    'success': False,
-                    'error': 'email_send_failed',
-                    'detail': str(e),
-                    'debug_info': {
-                        'email_backend': getattr(settings, 'EMAIL_BACKEND', ''),
-                        'email_host': getattr(settings, 'EMAIL_HOST', ''),
-                        'email_port': getattr(settings, 'EMAIL_PORT', ''),
-                        'email_use_tls': getattr(settings, 'EMAIL_USE_TLS', ''),
-                        'from_email': getattr(settings, 'DEFAULT_FROM_EMAIL', '') or getattr(settings, 'EMAIL_HOST_USER', ''),
-                        'error_type': type(e).__name__,
-                    } if settings.DEBUG else {},
-                    'message': 'Failed to send test email. Check server logs for details.'
-                },
-                status=status.HTTP_500_INTERNAL_SERVER_ERROR
-            )
+        )
+        
+        logger.info(f"Test email queued to {test_email} (outbox_id={queued.id})")
+        return Response(
+            {
+                'success': True,
+                'message': f'Test email queued for {test_email}',
+                'outbox_id': queued.id,
+                'timestamp': timezone.now().isoformat()
+            },
+            status=status.HTTP_202_ACCEPTED
+        )
 
 
 class ResendOTPView(APIView):
     """Resend OTP endpoint"""
     permission_classes = [AllowAny]
+    throttle_classes = [IPRateThrottle, AccountRateThrottle]
+    throttle_scope = 'resend_otp'
 
     def post(self, request):
         serializer = ResendOTPSerializer(data=request.data)
@@ -699,21 +773,13 @@ class ResendOTPView(APIView):
             except EmailVerification.DoesNotExist:
                 verification = None
             
-            # Generate and send new OTP
-            verification, otp = create_or_update_email_verification(user)
-            verification.resent_at = timezone.now()
-            verification.save()
-            
-            email_sent = send_otp_email(user=user, otp=otp)
-            
-            if not email_sent:
-                return Response(
-                    {
-                        'detail': 'Failed to send email. Please try again later.',
-                        'error_code': 'email_send_failed'
-                    },
-                    status=status.HTTP_500_INTERNAL_SERVER_ERROR
-                )
+            # Generate and queue new OTP
+            with transaction.atomic():
+                verification, otp = create_or_update_email_verification(user)
+                verification.resent_at = timezone.now()
+                verification.save()
+                
+                queue_otp_email(user=user, otp=otp)
             
             return Response(
                 {
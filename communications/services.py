@@ -4,7 +4,14 @@ Provides reusable functions to create notifications from anywhere in the project
 """
 from typing import List, Optional
 from django.contrib.auth.models import User
+from django.core.exceptions import EmptyResultSet
+from django.db import connection
 from django.db.models import QuerySet
+from django.db.models.constants import OnConflict
+from django.utils import timezone
+from live_sessions.models import LiveSession, LiveSessionParticipant
+from registrations.models import Registration
+from webinars.models import Event
 from .models import UserNotification, Announcement
 
 
@@ -90,6 +97,140 @@ def create_bulk_notifications(
     return len(created)
 
 
+def fan_out_notifications(
+    recipient_ids: QuerySet,
+    title: str,
+    message: str,
+    notification_type: str,
+    related_webinar_id=None,
+    announcement_id=None,
+    event_id=None,
+    recording_id=None,
+) -> int:
+    """
+    Create one notification per recipient with a single INSERT ... SELECT.
+    
+    Unlike create_bulk_notifications, recipients are never loaded into Python:
+    the database reads them straight from the given subquery, so the cost does
+    not grow with the number of rows held in memory.
+    
+    Args:
+        recipient_ids: QuerySet selecting exactly one column of user ids,
+            e.g. ``Registration.objects.filter(event=...).values('user_id')``
+        title: Notification title
+        message: Notification message/content
+        notification_type: Type from UserNotification.NOTIFICATION_TYPES
+        related_webinar_id: Optional webinar id (generic)
+        announcement_id: Optional announcement id
+        event_id: Optional event id
+        recording_id: Optional recording id
+    
+    Returns:
+        Number of notifications created
+    """
+    try:
+        recipients_sql, recipients_params = recipient_ids.query.sql_with_params()
+    except EmptyResultSet:
+        return 0
+
+    values = {
+        'notification_type': notification_type,
+        'title': title,
+        'content': message,
+        'announcement_id': announcement_id,
+        'event_id': event_id,
+        'recording_id': recording_id,
+        'related_webinar_id': related_webinar_id,
+        'is_read': False,
+        'created_at': connection.ops.adapt_datetimefield_value(timezone.now()),
+    }
+    opts = UserNotification._meta
+    # Cut text to the column's length here: CAST(... AS varchar(n)) below
+    # would truncate silently on PostgreSQL, and SQLite doesn't check at all
+    for column, value in values.items():
+        max_length = opts.get_field(column).max_length
+        if isinstance(value, str) and max_length and len(value) > max_length:
+            values[column] = value[:max_length]
+    quote = connection.ops.quote_name
+    table = quote(opts.db_table)
+    columns = ', '.join(quote(column) for column in ['user_id', *values])
+    # Typed parameters: PostgreSQL would otherwise guess text for them, which
+    # doesn't fit the bigint id columns when they are NULL
+    placeholders = ', '.join(
+        f'CAST(%s AS {opts.get_field(column).cast_db_type(connection)})' for column in values
+    )
+    # Skip rows that hit unique_announcement_per_user, like ignore_conflicts
+    insert = connection.ops.insert_statement(on_conflict=OnConflict.IGNORE)
+    on_conflict = connection.ops.on_conflict_suffix_sql([], OnConflict.IGNORE, None, None)
+    # Recipients are deduplicated on their own, before the constants are added
+    sql = (
+        f"{insert} {table} ({columns}) "
+        f"SELECT recipients.*, {placeholders} "
+        f"FROM (SELECT DISTINCT * FROM ({recipients_sql}) recipient_ids) recipients {on_conflict}"
+    )
+    params = [*values.values(), *recipients_params]
+
+    with connection.cursor() as cursor:
+        cursor.execute(sql, params)
+        return cursor.rowcount
+
+
+def fan_out_live_session_started(webinar_id) -> int:
+    """
+    Notify every registrant of a webinar that its live session started.
+    
+    Set-based counterpart of notify_live_session_started, meant to run off the
+    request path (see webinar_system.background.run_in_background).
+    
+    Args:
+        webinar_id: Id of the webinar/event that went live
+    
+    Returns:
+        Number of notifications created
+    """
+    title = Event.objects.filter(id=webinar_id).values_list('title', flat=True).first()
+    if title is None:
+        return 0
+
+    return fan_out_notifications(
+        recipient_ids=Registration.objects.filter(event_id=webinar_id).values('user_id'),
+        title=f"Live Session Started: {title}",
+        message=f"The live session for '{title}' has just started. Join now!",
+        notification_type='live_started',
+        related_webinar_id=webinar_id,
+        event_id=webinar_id,  # For backwards compatibility
+    )
+
+
+def fan_out_live_session_ended(session_id) -> int:
+    """
+    Notify everyone who joined a live session that it has ended.
+    
+    Set-based counterpart of notify_live_session_ended.
+    
+    Args:
+        session_id: Id of the live session that ended
+    
+    Returns:
+        Number of notifications created
+    """
+    session = LiveSession.objects.filter(id=session_id).values(
+        'webinar_id', 'webinar__title'
+    ).first()
+    if session is None:
+        return 0
+
+    title = session['webinar__title']
+    return fan_out_notifications(
+        recipient_ids=LiveSessionParticipant.objects.filter(session_id=session_id).values('user_id'),
+        title=f"Live Session Ended: {title}",
+        message=f"The live session for '{title}' has ended. Recording will be available soon.",
+        notification_type='live_ended',
+        related_webinar_id=session['webinar_id'],
+        event_id=session['webinar_id'],
+    )
+
+
 def notify_live_session_started(webinar, registered_users: QuerySet[User]) -> int:
     """
     Notify all registered users when a live session starts.
@@ -153,6 +294,28 @@ def notify_registration_approved(user: User, webinar) -> UserNotification:
     )
 
 
+def notify_registrations_approved(webinar, users: QuerySet[User] | List[User]) -> int:
+    """
+    Notify several users at once that their registration was approved,
+    e.g. when they are promoted from a webinar's waitlist.
+    
+    Args:
+        webinar: The webinar they are now registered for
+        users: QuerySet or list of users to notify
+    
+    Returns:
+        Number of notifications created
+    """
+    return create_bulk_notifications(
+        users=users,
+        title="Registration Approved",
+        message=f"Your registration for '{webinar.title}' has been approved!",
+        notification_type='registration_approved',
+        related_webinar=webinar,
+        event=webinar,
+    )
+
+
 def notify_new_announcement(announcement: Announcement, target_users: QuerySet[User]) -> int:
     """
     Notify users about a new announcement.
@@ -1,3 +1,251 @@
-from django.test import TestCase
+from datetime import timedelta
+from unittest import skipUnless
 
-# Create your tests here.
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.test import APITestCase
+
+from accounts.models import IdempotencyRecord
+from webinars.models import Event
+from registrations.models import Registration
+from live_sessions.models import LiveSession, LiveSessionParticipant
+from .models import Message, UserNotification
+from .services import (
+    fan_out_notifications,
+    fan_out_live_session_started,
+    fan_out_live_session_ended,
+)
+
+
+User = get_user_model()
+
+
+class NotificationFanOutTests(TestCase):
+    """Tests for set-based notification fan-out"""
+
+    def setUp(self):
+        self.organizer = User.objects.create_user(
+            username='organizer',
+            email='organizer@test.com',
+            password='testpass123',
+            is_staff=True
+        )
+        self.students = [
+            User.objects.create_user(
+                username=f'student{i}',
+                email=f'student{i}@test.com',
+                password='testpass123'
+            )
+            for i in range(3)
+        ]
+        self.webinar = Event.objects.create(
+            title='Fan-out Webinar',
+            date='2026-03-15',
+            time='14:00:00',
+            organizer=self.organizer,
+        )
+        for student in self.students[:2]:
+            Registration.objects.create(user=student, event=self.webinar)
+
+    def test_live_started_notifies_registrants_in_one_insert(self):
+        """Test start fan-out reaches every registrant with a single statement"""
+        with self.assertNumQueries(2):
+            created = fan_out_live_session_started(self.webinar.id)
+
+        self.assertEqual(created, 2)
+        notifications = UserNotification.objects.filter(notification_type='live_started')
+        self.assertEqual(
+            set(notifications.values_list('user_id', flat=True)),
+            {self.students[0].id, self.students[1].id}
+        )
+        notification = notifications.first()
+        self.assertEqual(notification.related_webinar, self.webinar)
+        self.assertEqual(notification.event, self.webinar)
+        self.assertIn(self.webinar.title, notification.title)
+        self.assertFalse(notification.is_read)
+        self.assertIsNotNone(notification.created_at)
+
+    def test_live_ended_notifies_participants(self):
+        """Test end fan-out only reaches users who joined the session"""
+        session = LiveSession.objects.create(webinar=self.webinar, started_by=self.organizer)
+        LiveSessionParticipant.objects.create(session=session, user=self.students[0])
+
+        created = fan_out_live_session_ended(session.id)
+
+        self.assertEqual(created, 1)
+        notification = UserNotification.objects.get(notification_type='live_ended')
+        self.assertEqual(notification.user, self.students[0])
+
+    def test_fan_out_unknown_webinar(self):
+        """Test fan-out for a missing webinar creates nothing"""
+        self.assertEqual(fan_out_live_session_started(99999), 0)
+        self.assertEqual(UserNotification.objects.count(), 0)
+
+    def test_fan_out_empty_recipients(self):
+        """Test an empty recipient subquery is a no-op"""
+        created = fan_out_notifications(
+            recipient_ids=User.objects.filter(id__in=[]).values('id'),
+            title='Nobody',
+            message='Nothing to see',
+            notification_type='system',
+        )
+
+        self.assertEqual(created, 0)
+
+    def test_fan_out_cuts_long_title_to_column(self):
+        """Test over-long titles are cut to max_length on every database"""
+        fan_out_notifications(
+            recipient_ids=User.objects.filter(id=self.students[0].id).values('id'),
+            title='T' * 300,
+            message='M' * 5000,
+            notification_type='system',
+        )
+
+        notification = UserNotification.objects.get()
+        self.assertEqual(notification.title, 'T' * 255)
+        self.assertEqual(notification.content, 'M' * 5000)
+
+
+@skipUnless(connection.vendor == 'postgresql', 'Exercises PostgreSQL parameter typing')
+class PostgresNotificationFanOutTests(TestCase):
+    """Tests for the fan-out INSERT ... SELECT against PostgreSQL's type rules"""
+
+    def test_null_ids_and_duplicate_recipients(self):
+        """Test NULL foreign keys insert into bigint columns and recipients are deduplicated"""
+        organizer = User.objects.create_user(username='organizer', email='organizer@test.com', password='testpass123')
+        student = User.objects.create_user(username='student', email='student@test.com', password='testpass123')
+        webinars = [
+            Event.objects.create(title=f'PG Webinar {i}', date='2026-03-15', time='14:00:00', organizer=organizer)
+            for i in range(2)
+        ]
+        for webinar in webinars:
+            Registration.objects.create(user=student, event=webinar)
+        # The student appears once per webinar
+        recipients = Registration.objects.filter(event__in=webinars).values('user_id')
+
+        created = fan_out_notifications(
+            recipient_ids=recipients,
+            title='Hello',
+            message='Body',
+            notification_type='system',
+            related_webinar_id=webinars[0].id,
+        )
+
+        self.assertEqual(created, 1)
+        notification = UserNotification.objects.get()
+        self.assertIsNone(notification.announcement_id)
+        self.assertIsNone(notification.recording_id)
+        self.assertEqual(notification.related_webinar_id, webinars[0].id)
+
+
+class SendMessageThrottleTests(APITestCase):
+    """Tests for rate limiting of direct messages"""
+
+    def setUp(self):
+        cache.clear()
+        self.sender = User.objects.create_user(username='sender', email='sender@test.com', password='testpass123')
+        self.recipient = User.objects.create_user(username='recipient', email='recipient@test.com', password='testpass123')
+        self.client.force_authenticate(self.sender)
+
+    @override_settings(REST_FRAMEWORK={
+        **settings.REST_FRAMEWORK,
+        'DEFAULT_THROTTLE_RATES': {'send_message_account': '2/min'},
+    })
+    def test_sending_is_limited_per_user(self):
+        """Test a user over the message rate gets 429 with Retry-After"""
+        payload = {'participant_ids': [self.recipient.id], 'content': 'Hello'}
+
+        for _ in range(2):
+            response = self.client.post('/api/communications/inbox/send/', payload, format='json')
+            self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+
+        response = self.client.post('/api/communications/inbox/send/', payload, format='json')
+
+        self.assertEqual(response.status_code, status.HTTP_429_TOO_MANY_REQUESTS)
+        self.assertGreater(int(response['Retry-After']), 0)
+        self.assertEqual(Message.objects.count(), 2)
+
+        # Reading the inbox is not limited
+        response = self.client.get('/api/communications/inbox/conversations/')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+
+class SendMessageIdempotencyTests(APITestCase):
+    """Tests for Idempotency-Key handling on message sending"""
+
+    def setUp(self):
+        cache.clear()
+        self.sender = User.objects.create_user(username='sender', email='sender@test.com', password='testpass123')
+        self.recipient = User.objects.create_user(username='recipient', email='recipient@test.com', password='testpass123')
+        self.client.force_authenticate(self.sender)
+        self.payload = {'participant_ids': [self.recipient.id], 'content': 'Hello'}
+
+    def send(self, key, payload=None):
+        return self.client.post(
+            '/api/communications/inbox/send/', payload or self.payload, format='json', HTTP_IDEMPOTENCY_KEY=key
+        )
+
+    def test_retry_replays_stored_response(self):
+        """Test a retried send returns the first response and creates no second message"""
+        first = self.send('msg-1')
+
+        with self.assertNumQueries(1):
+            retry = self.send('msg-1')
+
+        self.assertEqual(retry.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(retry.data, first.data)
+        self.assertEqual(retry['Idempotent-Replayed'], 'true')
+        self.assertEqual(Message.objects.count(), 1)
+
+    def test_new_key_sends_again(self):
+        """Test different keys are different messages"""
+        self.send('msg-1')
+        self.send('msg-2')
+
+        self.assertEqual(Message.objects.count(), 2)
+
+    def test_key_reused_with_other_payload_rejected(self):
+        """Test a key can't be reused for a different request"""
+        self.send('msg-1')
+
+        response = self.send('msg-1', {'participant_ids': [self.recipient.id], 'content': 'Other'})
+
+        self.assertEqual(response.status_code, status.HTTP_422_UNPROCESSABLE_ENTITY)
+        self.assertEqual(Message.objects.count(), 1)
+
+    def test_concurrent_duplicate_gets_conflict(self):
+        """Test a duplicate arriving while the first is running doesn't run"""
+        IdempotencyRecord.objects.create(
+            user=self.sender,
+            scope='InboxViewSet.send_message',
+            key='msg-1',
+            request_hash='pending',
+            locked_until=timezone.now() + timedelta(minutes=1),
+            expires_at=timezone.now() + timedelta(days=1),
+        )
+
+        response = self.send('msg-1')
+
+        self.assertEqual(response.status_code, status.HTTP_409_CONFLICT)
+        self.assertEqual(Message.objects.count(), 0)
+
+    def test_abandoned_key_is_taken_over(self):
+        """Test a key whose request died can be used once its lock lapses"""
+        IdempotencyRecord.objects.create(
+            user=self.sender,
+            scope='InboxViewSet.send_message',
+            key='msg-1',
+            request_hash='pending',
+            locked_until=timezone.now() - timedelta(seconds=1),
+            expires_at=timezone.now() + timedelta(days=1),
+        )
+
+        response = self.send('msg-1')
+
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(IdempotencyRecord.objects.get().response_status, 201)
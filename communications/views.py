@@ -17,6 +17,8 @@ from .serializers import (
     SendMessageSerializer,
 )
 from accounts.permissions import IsAdmin
+from webinar_system.idempotency import idempotent
+from webinar_system.throttling import AccountRateThrottle
 from .services import create_notification
 
 
@@ -145,6 +147,8 @@ class WebinarChatMessageViewSet(viewsets.ModelViewSet):
 class InboxViewSet(viewsets.ViewSet):
     """ViewSet for inbox/messaging functionality"""
     permission_classes = [IsAuthenticated]
+    # Set per action; only sending is rate limited
+    throttle_scope = None
 
     @action(detail=False, methods=['get'], url_path='conversations')
     def list_conversations(self, request):
@@ -206,7 +210,14 @@ class InboxViewSet(viewsets.ViewSet):
                 status=status.HTTP_404_NOT_FOUND
             )
 
-    @action(detail=False, methods=['post'], url_path='send')
+    @action(
+        detail=False,
+        methods=['post'],
+        url_path='send',
+        throttle_classes=[AccountRateThrottle],
+        throttle_scope='send_message',
+    )
+    @idempotent
     def send_message(self, request):
         """Send a message (creates conversation if needed)"""
         serializer = SendMessageSerializer(data=request.data)
@@ -66,6 +66,12 @@ const authService = {
     },
 
     logout: (): void => {
+        // Revoke both tokens server-side; local state is cleared regardless
+        const refresh = localStorage.getItem('refresh_token');
+        const access = localStorage.getItem('access_token');
+        if (refresh || access) {
+            apiClient.post('/accounts/auth/logout/', { refresh, access }).catch(() => undefined);
+        }
         localStorage.removeItem('access_token');
         localStorage.removeItem('refresh_token');
         localStorage.removeItem('user');
@@ -4,13 +4,13 @@ from .models import LiveSession, LiveSessionParticipant
 
 @admin.register(LiveSession)
 class LiveSessionAdmin(admin.ModelAdmin):
-    list_display = ('webinar', 'room_name', 'is_active', 'started_by', 'created_at', 'start_time', 'end_time')
+    list_display = ('webinar', 'run_number', 'room_name', 'is_active', 'started_by', 'created_at', 'start_time', 'end_time')
     list_filter = ('is_active', 'created_at', 'start_time', 'end_time')
     search_fields = ('webinar__title', 'room_name')
-    readonly_fields = ('room_name', 'created_at', 'started_at', 'start_time', 'end_time')
+    readonly_fields = ('run_number', 'room_name', 'created_at', 'started_at', 'start_time', 'end_time')
     fieldsets = (
         ('Session Info', {
-            'fields': ('webinar', 'room_name', 'is_active')
+            'fields': ('webinar', 'run_number', 'room_name', 'is_active')
         }),
         ('Timing', {
             'fields': ('created_at', 'started_at', 'start_time', 'end_time')
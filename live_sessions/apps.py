@@ -4,3 +4,7 @@ from django.apps import AppConfig
 class LiveSessionsConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'live_sessions'
+
+    def ready(self):
+        """Import signals when the app is ready"""
+        import live_sessions.signals
@@ -0,0 +1,20 @@
+from django.core.management.base import BaseCommand
+
+from live_sessions.models import LiveAnalyticsTotals, WebinarLiveStats, DailyLiveStats
+from live_sessions.services import rebuild_live_analytics
+
+
+class Command(BaseCommand):
+    help = "Recompute live session analytics rollups from the raw session tables."
+
+    def handle(self, *args, **options):
+        rebuild_live_analytics()
+
+        totals = LiveAnalyticsTotals.objects.get(pk=1)
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Rebuilt live analytics: {totals.total_sessions} sessions, "
+                f"{WebinarLiveStats.objects.count()} webinars, "
+                f"{DailyLiveStats.objects.count()} daily buckets"
+            )
+        )
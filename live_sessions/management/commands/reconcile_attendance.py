@@ -0,0 +1,46 @@
+from django.core.management.base import BaseCommand
+
+from live_sessions.models import LiveSession
+from live_sessions.services import reconcile_attendance
+
+
+class Command(BaseCommand):
+    help = "Mark registrations attended from live session participants of ended runs."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--webinar',
+            type=int,
+            action='append',
+            dest='webinars',
+            help='Only runs of this webinar; repeat for several (default all)',
+        )
+        parser.add_argument(
+            '--session',
+            type=int,
+            action='append',
+            dest='sessions',
+            help='Only this run; repeat for several',
+        )
+        parser.add_argument(
+            '--min-minutes',
+            type=int,
+            help='Minimum minutes between joining and the end of the run (default LIVE_ATTENDANCE_MIN_MINUTES)',
+        )
+
+    def handle(self, *args, **options):
+        sessions = LiveSession.objects.filter(is_active=False, end_time__isnull=False).order_by('id')
+        if options['webinars']:
+            sessions = sessions.filter(webinar_id__in=options['webinars'])
+        if options['sessions']:
+            sessions = sessions.filter(id__in=options['sessions'])
+
+        runs = 0
+        marked = 0
+        for session_id in sessions.values_list('id', flat=True).iterator():
+            marked += reconcile_attendance(session_id, options['min_minutes'])
+            runs += 1
+
+        self.stdout.write(self.style.SUCCESS(
+            f"Reconciled {runs} live session runs: {marked} registrations marked attended"
+        ))
@@ -0,0 +1,63 @@
+import signal
+import threading
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+from django.utils import timezone
+
+from live_sessions.scheduler import LiveSessionScheduler
+
+
+class Command(BaseCommand):
+    help = "Open and close live sessions automatically from the webinar timetable."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--horizon',
+            type=int,
+            default=settings.LIVE_SCHEDULER_HORIZON_MINUTES,
+            help='Minutes of upcoming transitions kept in memory',
+        )
+        parser.add_argument(
+            '--reload-interval',
+            type=float,
+            default=settings.LIVE_SCHEDULER_RELOAD_SECONDS,
+            help='Maximum seconds between checks for edited webinars',
+        )
+        parser.add_argument(
+            '--once',
+            action='store_true',
+            help='Apply transitions that are due now and exit',
+        )
+
+    def handle(self, *args, **options):
+        scheduler = LiveSessionScheduler(horizon=timedelta(minutes=options['horizon']))
+        scheduler.load(timezone.now())
+
+        if options['once']:
+            applied = scheduler.run_due(timezone.now())
+            self.stdout.write(self.style.SUCCESS(f"Applied {applied} live session transitions"))
+            return
+
+        stop = threading.Event()
+        for signum in (signal.SIGINT, signal.SIGTERM):
+            signal.signal(signum, lambda *_: stop.set())
+
+        self.stdout.write(
+            f"Live session scheduler running ({len(scheduler)} transitions queued)"
+        )
+        while not stop.is_set():
+            close_old_connections()
+            applied = scheduler.tick(timezone.now())
+            if applied:
+                self.stdout.write(f"Applied {applied} live session transitions")
+
+            delay = options['reload_interval']
+            next_at = scheduler.next_transition_at()
+            if next_at is not None:
+                delay = min(delay, max((next_at - timezone.now()).total_seconds(), 0))
+            stop.wait(delay)
+
+        self.stdout.write("Live session scheduler stopped")
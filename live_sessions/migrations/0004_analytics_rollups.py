@@ -0,0 +1,64 @@
+# Generated by Django 6.0 on 2026-10-19 00:15
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('live_sessions', '0003_rename_live_sessio_webinar_idx_live_sessio_webinar_37d63f_idx_and_more'),
+        ('webinars', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DailyLiveStats',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('day', models.DateField(unique=True)),
+                ('sessions_started', models.PositiveIntegerField(default=0)),
+                ('sessions_completed', models.PositiveIntegerField(default=0)),
+                ('participants_joined', models.PositiveIntegerField(default=0)),
+                ('total_duration_seconds', models.FloatField(default=0)),
+            ],
+            options={
+                'verbose_name': 'Daily Live Stats',
+                'verbose_name_plural': 'Daily Live Stats',
+                'ordering': ['day'],
+            },
+        ),
+        migrations.CreateModel(
+            name='LiveAnalyticsTotals',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('total_webinars', models.PositiveIntegerField(default=0)),
+                ('total_sessions', models.PositiveIntegerField(default=0)),
+                ('active_sessions', models.IntegerField(default=0)),
+                ('completed_sessions', models.PositiveIntegerField(default=0)),
+                ('total_participants', models.PositiveIntegerField(default=0, help_text='Distinct users who joined any live session')),
+                ('total_duration_seconds', models.FloatField(default=0, help_text='Summed duration of completed sessions')),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'verbose_name': 'Live Analytics Totals',
+                'verbose_name_plural': 'Live Analytics Totals',
+            },
+        ),
+        migrations.CreateModel(
+            name='WebinarLiveStats',
+            fields=[
+                ('webinar', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='live_stats', serialize=False, to='webinars.event')),
+                ('total_sessions', models.PositiveIntegerField(default=0)),
+                ('completed_sessions', models.PositiveIntegerField(default=0)),
+                ('participant_count', models.PositiveIntegerField(default=0, help_text='Distinct users who joined a live session of this webinar')),
+                ('total_duration_seconds', models.FloatField(default=0)),
+                ('last_started_at', models.DateTimeField(blank=True, null=True)),
+            ],
+            options={
+                'verbose_name': 'Webinar Live Stats',
+                'verbose_name_plural': 'Webinar Live Stats',
+                'indexes': [models.Index(fields=['-participant_count'], name='live_sessio_partici_81ff71_idx')],
+            },
+        ),
+    ]
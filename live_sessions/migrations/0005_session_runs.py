@@ -0,0 +1,39 @@
+# Generated by Django 6.0 on 2026-10-19 00:23
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('live_sessions', '0004_analytics_rollups'),
+        ('webinars', '0002_event_schedule_columns'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='livesession',
+            name='live_sessio_webinar_37d63f_idx',
+        ),
+        migrations.AddField(
+            model_name='livesession',
+            name='run_number',
+            field=models.PositiveIntegerField(default=1, help_text='Sequence of this run within the webinar, starting at 1'),
+        ),
+        migrations.AlterField(
+            model_name='livesession',
+            name='webinar',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='live_sessions', to='webinars.event'),
+        ),
+        migrations.AddConstraint(
+            model_name='livesession',
+            constraint=models.UniqueConstraint(condition=models.Q(('is_active', True)), fields=('webinar',), name='unique_active_run_per_webinar'),
+        ),
+        migrations.AddConstraint(
+            model_name='livesession',
+            constraint=models.UniqueConstraint(fields=('webinar', 'run_number'), name='unique_webinar_run_number'),
+        ),
+    ]
@@ -0,0 +1,18 @@
+from django.db import migrations
+
+
+def create_totals_row(apps, schema_editor):
+    # Join/start/end counters only UPDATE this row, so it must always exist
+    LiveAnalyticsTotals = apps.get_model('live_sessions', 'LiveAnalyticsTotals')
+    LiveAnalyticsTotals.objects.get_or_create(pk=1)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('live_sessions', '0005_session_runs'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_totals_row, migrations.RunPython.noop),
+    ]
@@ -4,11 +4,20 @@ import uuid
 
 
 class LiveSession(models.Model):
-    """Live session for webinars using Jitsi Meet"""
-    webinar = models.OneToOneField(
+    """
+    One live run of a webinar using Jitsi Meet.
+
+    A webinar can be run several times; each run has its own room and
+    participant records, and at most one run per webinar is active.
+    """
+    webinar = models.ForeignKey(
         'webinars.Event',
         on_delete=models.CASCADE,
-        related_name='live_session',
+        related_name='live_sessions',
+    )
+    run_number = models.PositiveIntegerField(
+        default=1,
+        help_text="Sequence of this run within the webinar, starting at 1"
     )
     room_name = models.CharField(
         max_length=255,
@@ -46,14 +55,40 @@ class LiveSession(models.Model):
         verbose_name = 'Live Session'
         verbose_name_plural = 'Live Sessions'
         ordering = ['-created_at']
+        constraints = [
+            # Also the index behind "current active run for a webinar"
+            models.UniqueConstraint(
+                fields=['webinar'],
+                condition=models.Q(is_active=True),
+                name='unique_active_run_per_webinar',
+            ),
+            models.UniqueConstraint(
+                fields=['webinar', 'run_number'],
+                name='unique_webinar_run_number',
+            ),
+        ]
         indexes = [
-            models.Index(fields=['webinar']),
             models.Index(fields=['is_active']),
         ]
 
     def __str__(self) -> str:
         return f"Live Session - {self.webinar.title}"
 
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # Remember the stored state so signals can tell starts and ends apart
+        instance._loaded_is_active = instance.__dict__.get('is_active')
+        return instance
+
+    @property
+    def duration_seconds(self):
+        """Seconds between the (latest) start and the end of the session"""
+        if not self.end_time:
+            return None
+        started = self.started_at or self.start_time
+        return max((self.end_time - started).total_seconds(), 0)
+
     def generate_room_name(self):
         """Generate a unique room name for Jitsi Meet"""
         # Format: webinar_<webinar_id>_<uuid_random_string>
@@ -93,3 +128,75 @@ class LiveSessionParticipant(models.Model):
 
     def __str__(self) -> str:
         return f"{self.user} in {self.session}"
+
+
+class LiveAnalyticsTotals(models.Model):
+    """Running totals across all live sessions (single row, pk=1)"""
+    total_webinars = models.PositiveIntegerField(default=0)
+    total_sessions = models.PositiveIntegerField(default=0)
+    active_sessions = models.IntegerField(default=0)
+    completed_sessions = models.PositiveIntegerField(default=0)
+    total_participants = models.PositiveIntegerField(
+        default=0,
+        help_text="Distinct users who joined any live session"
+    )
+    total_duration_seconds = models.FloatField(
+        default=0,
+        help_text="Summed duration of completed sessions"
+    )
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        app_label = 'live_sessions'
+        verbose_name = 'Live Analytics Totals'
+        verbose_name_plural = 'Live Analytics Totals'
+
+    def __str__(self) -> str:
+        return f"Live analytics: {self.total_sessions} sessions"
+
+
+class WebinarLiveStats(models.Model):
+    """Per-webinar live session rollup"""
+    webinar = models.OneToOneField(
+        'webinars.Event',
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name='live_stats',
+    )
+    total_sessions = models.PositiveIntegerField(default=0)
+    completed_sessions = models.PositiveIntegerField(default=0)
+    participant_count = models.PositiveIntegerField(
+        default=0,
+        help_text="Distinct users who joined a live session of this webinar"
+    )
+    total_duration_seconds = models.FloatField(default=0)
+    last_started_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        app_label = 'live_sessions'
+        verbose_name = 'Webinar Live Stats'
+        verbose_name_plural = 'Webinar Live Stats'
+        indexes = [
+            models.Index(fields=['-participant_count']),
+        ]
+
+    def __str__(self) -> str:
+        return f"Live stats - {self.webinar_id}"
+
+
+class DailyLiveStats(models.Model):
+    """Live session activity bucketed per day"""
+    day = models.DateField(unique=True)
+    sessions_started = models.PositiveIntegerField(default=0)
+    sessions_completed = models.PositiveIntegerField(default=0)
+    participants_joined = models.PositiveIntegerField(default=0)
+    total_duration_seconds = models.FloatField(default=0)
+
+    class Meta:
+        app_label = 'live_sessions'
+        verbose_name = 'Daily Live Stats'
+        verbose_name_plural = 'Daily Live Stats'
+        ordering = ['day']
+
+    def __str__(self) -> str:
+        return f"Live stats - {self.day}"
@@ -0,0 +1,215 @@
+"""
+Timetable-driven scheduler for live sessions.
+
+Keeps a min-heap of upcoming start/end transitions and applies them through
+the same service functions as the viewset. The heap is filled one horizon at
+a time from range queries on the indexed ``Event.starts_at``/``ends_at``
+columns, and refreshed from ``Event.updated_at`` so edits are picked up
+without rescanning the events table.
+"""
+import heapq
+import itertools
+import logging
+from datetime import timedelta
+
+from django.db import transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from webinars.models import Event
+from .models import LiveSession
+from .services import start_live_session, end_live_session
+
+logger = logging.getLogger(__name__)
+
+START = 'start'
+END = 'end'
+
+# Re-read edits this far behind the last reload, so rows committed by a
+# transaction that began before the previous reload are not missed
+RELOAD_OVERLAP = timedelta(seconds=5)
+
+_EVENT_FIELDS = ('id', 'starts_at', 'ends_at', 'manual_status', 'updated_at')
+
+
+class LiveSessionScheduler:
+    """
+    In-memory schedule of live session transitions.
+
+    Every heap entry carries the ``updated_at`` of the event snapshot it was
+    built from. When an event changes, its new transitions are pushed and the
+    old entries are dropped lazily as they surface.
+    """
+
+    def __init__(self, horizon: timedelta = timedelta(hours=1)):
+        self.horizon = horizon
+        self._heap = []
+        self._sequence = itertools.count()
+        # event_id -> (updated_at, ends_at) of the snapshot currently scheduled
+        self._versions = {}
+        self._covered_until = None
+        self._watermark = None
+
+    def __len__(self) -> int:
+        return len(self._heap)
+
+    def load(self, now) -> None:
+        """
+        Fill the heap with every event running now or changing state within the horizon.
+
+        Filters on ``ends_at > now`` first, so the index scan only touches
+        current and future events rather than the whole history.
+        """
+        self._heap = []
+        self._versions = {}
+        self._watermark = timezone.now()
+        self._covered_until = now + self.horizon
+
+        events = Event.objects.filter(
+            ends_at__gt=now,
+            starts_at__lte=self._covered_until,
+        ).only(*_EVENT_FIELDS)
+        for event in events:
+            self._schedule(event, now)
+
+    def reload_changed(self, now) -> int:
+        """
+        Reschedule events edited since the last reload.
+
+        Returns:
+            Number of events whose transitions were rescheduled
+        """
+        since = self._watermark - RELOAD_OVERLAP
+        self._watermark = timezone.now()
+
+        rescheduled = 0
+        for event in Event.objects.filter(updated_at__gt=since).only(*_EVENT_FIELDS):
+            if self._is_current(event):
+                continue
+            self._schedule(event, now)
+            rescheduled += 1
+        return rescheduled
+
+    def extend(self, now) -> bool:
+        """
+        Slide the horizon forward once half of it has elapsed.
+
+        Only the newly uncovered window is queried, as two index range scans.
+
+        Returns:
+            True if the horizon moved
+        """
+        if now + self.horizon - self._covered_until < self.horizon / 2:
+            return False
+
+        window_start = self._covered_until
+        self._covered_until = now + self.horizon
+
+        events = Event.objects.filter(
+            Q(starts_at__gt=window_start, starts_at__lte=self._covered_until)
+            | Q(ends_at__gt=window_start, ends_at__lte=self._covered_until)
+        ).only(*_EVENT_FIELDS)
+        for event in events:
+            if self._is_current(event):
+                self._schedule(event, now, after=window_start)
+            else:
+                self._schedule(event, now)
+        return True
+
+    def next_transition_at(self):
+        """Get the time of the earliest pending transition, or None if the heap is empty."""
+        while self._heap and not self._is_live_entry(self._heap[0]):
+            heapq.heappop(self._heap)
+        return self._heap[0][0] if self._heap else None
+
+    def run_due(self, now) -> int:
+        """
+        Apply every transition due at ``now``.
+
+        Returns:
+            Number of sessions actually started or ended
+        """
+        applied = 0
+        while self._heap and self._heap[0][0] <= now:
+            entry = heapq.heappop(self._heap)
+            if not self._is_live_entry(entry):
+                continue
+            _, _, kind, event_id, _ = entry
+            try:
+                with transaction.atomic():
+                    if self._apply(kind, event_id):
+                        applied += 1
+            except Exception:
+                logger.exception(f"Failed to {kind} live session for webinar {event_id}")
+        return applied
+
+    def tick(self, now) -> int:
+        """Pick up edits, slide the horizon and apply due transitions."""
+        self.reload_changed(now)
+        slid = self.extend(now)
+        applied = self.run_due(now)
+        if slid:
+            # Events that are over have nothing left in the heap
+            self._versions = {
+                event_id: version
+                for event_id, version in self._versions.items()
+                if version[1] is None or version[1] > now
+            }
+        return applied
+
+    def _is_current(self, event) -> bool:
+        version = self._versions.get(event.id)
+        return version is not None and version[0] == event.updated_at
+
+    def _is_live_entry(self, entry) -> bool:
+        version = self._versions.get(entry[3])
+        return version is not None and version[0] == entry[4]
+
+    def _schedule(self, event, now, after=None) -> None:
+        """
+        Push the event's transitions that fall inside the covered window.
+
+        With ``after`` set only transitions later than it are pushed (used when
+        the horizon slides). Without it the event is scheduled from scratch:
+        an event already inside its slot gets an immediate start.
+        """
+        self._versions[event.id] = (event.updated_at, event.ends_at)
+        if event.manual_status or event.starts_at is None:
+            return
+
+        for kind, when in ((START, event.starts_at), (END, event.ends_at)):
+            if after is None:
+                if kind == START and when <= now < event.ends_at:
+                    when = now
+                due = when >= now
+            else:
+                due = when > after
+            if due and when <= self._covered_until:
+                heapq.heappush(
+                    self._heap,
+                    (when, next(self._sequence), kind, event.id, event.updated_at)
+                )
+
+    def _apply(self, kind: str, event_id) -> bool:
+        event = Event.objects.select_related('organizer').filter(pk=event_id).first()
+        if event is None or event.manual_status:
+            return False
+
+        if kind == END:
+            ended = end_live_session(event)
+            if ended:
+                logger.info(f"Closed live session for webinar {event_id}")
+            return ended is not None
+
+        # Don't reopen a slot the organizer already ran and closed
+        already_held = LiveSession.objects.filter(
+            webinar=event,
+            end_time__gte=event.starts_at
+        ).exists()
+        if already_held or event.ends_at <= timezone.now():
+            return False
+
+        _, started = start_live_session(event, event.organizer)
+        if started:
+            logger.info(f"Opened live session for webinar {event_id}")
+        return started
@@ -10,6 +10,7 @@ class LiveSessionSerializer(serializers.ModelSerializer):
         fields = [
             'id',
             'webinar',
+            'run_number',
             'room_name',
             'is_active',
             'created_at',
@@ -17,7 +18,7 @@ class LiveSessionSerializer(serializers.ModelSerializer):
             'start_time',
             'end_time',
         ]
-        read_only_fields = ['id', 'room_name', 'created_at', 'started_at', 'start_time', 'end_time']
+        read_only_fields = ['id', 'run_number', 'room_name', 'created_at', 'started_at', 'start_time', 'end_time']
 
 
 class LiveSessionStartSerializer(serializers.ModelSerializer):
@@ -25,8 +26,8 @@ class LiveSessionStartSerializer(serializers.ModelSerializer):
     
     class Meta:
         model = LiveSession
-        fields = ['room_name', 'is_active']
-        read_only_fields = ['room_name', 'is_active']
+        fields = ['id', 'run_number', 'room_name', 'is_active']
+        read_only_fields = ['id', 'run_number', 'room_name', 'is_active']
 
 
 class LiveSessionStatusSerializer(serializers.ModelSerializer):
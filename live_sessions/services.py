@@ -0,0 +1,528 @@
+"""
+Service helpers for live sessions.
+Starts and ends sessions for both the viewset and the scheduler, keeps the
+public status lookup cheap enough for every webinar page to poll, maintains
+the analytics rollups as sessions start, end and gain participants, and marks
+registrations attended from who joined.
+
+Rollups are only ever incremented as things happen. Deletes can't be undone
+the same way: a cascade deletes rows in batches before any signal fires, so a
+user in two deleted sessions would be subtracted twice. Instead each delete
+notes the webinars and days it touched, and after commit one background job
+recomputes just those rows and the totals from the raw tables.
+"""
+import threading
+import time
+from datetime import datetime, time as day_time, timedelta
+from typing import Optional
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import IntegrityError, transaction
+from django.db.models import Count, Exists, F, FilteredRelation, Max, OuterRef, Q, Sum
+from django.db.models.functions import Coalesce
+from django.db.models.functions import TruncDate
+from django.utils import timezone
+
+from communications.services import fan_out_live_session_started, fan_out_live_session_ended
+from registrations.models import Registration
+from webinar_system.background import run_in_background
+from webinars.models import Event
+from .models import (
+    LiveSession,
+    LiveSessionParticipant,
+    LiveAnalyticsTotals,
+    WebinarLiveStats,
+    DailyLiveStats,
+)
+
+
+STATUS_CACHE_KEY = 'live_sessions:status:{webinar_id}'
+
+# Long-polls currently waiting in this process; each holds a worker thread
+_waiters = 0
+_waiters_lock = threading.Lock()
+
+
+def _status_cache_key(webinar_id) -> str:
+    return STATUS_CACHE_KEY.format(webinar_id=webinar_id)
+
+
+def _load_live_status(webinar_id) -> dict:
+    """
+    Read the status payload for a webinar from the database.
+
+    Uses a single LEFT JOIN from the webinar to its active run (a probe on the
+    partial unique index), so a missing webinar and a webinar that is not
+    live are told apart in one query.
+    """
+    row = Event.objects.filter(id=webinar_id).annotate(
+        active_run=FilteredRelation(
+            'live_sessions',
+            condition=Q(live_sessions__is_active=True),
+        ),
+    ).values(
+        'active_run__is_active',
+        'active_run__room_name',
+    ).first()
+
+    if row is None:
+        return {'found': False, 'is_active': False, 'room_name': None}
+
+    return {
+        'found': True,
+        'is_active': bool(row['active_run__is_active']),
+        'room_name': row['active_run__room_name'],
+    }
+
+
+def get_live_status(webinar_id) -> dict:
+    """
+    Get the live status payload for a webinar, served from the shared cache.
+
+    Returns:
+        Dict with ``found``, ``is_active`` and ``room_name`` keys
+    """
+    key = _status_cache_key(webinar_id)
+    payload = cache.get(key)
+    if payload is None:
+        payload = _load_live_status(webinar_id)
+        cache.set(key, payload, settings.LIVE_STATUS_CACHE_TIMEOUT)
+    return payload
+
+
+def invalidate_live_status(webinar_id) -> None:
+    """Drop the cached status so the next poll reads the new state."""
+    cache.delete(_status_cache_key(webinar_id))
+
+
+def wait_for_live_status(webinar_id, since_active: Optional[bool], timeout: float) -> dict:
+    """
+    Long-poll the live status of a webinar.
+
+    Blocks until ``is_active`` differs from ``since_active`` or ``timeout``
+    seconds pass, re-checking the cache every ``LIVE_STATUS_POLL_INTERVAL``.
+    When ``since_active`` is None the state at call time is the baseline.
+    At most ``LIVE_STATUS_MAX_WAITERS`` calls wait at once per process; the
+    rest return the current state without waiting, with ``retry_after`` set
+    to the seconds the client should wait before polling again.
+
+    Returns:
+        The latest status payload
+    """
+    payload = get_live_status(webinar_id)
+    if not payload['found'] or timeout <= 0:
+        return payload
+
+    if since_active is None:
+        since_active = payload['is_active']
+
+    global _waiters
+    with _waiters_lock:
+        if _waiters >= settings.LIVE_STATUS_MAX_WAITERS:
+            return {**payload, 'retry_after': max(settings.LIVE_STATUS_BUSY_RETRY_SECONDS, 1)}
+        _waiters += 1
+    try:
+        deadline = time.monotonic() + timeout
+        while payload['is_active'] == since_active:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            time.sleep(min(settings.LIVE_STATUS_POLL_INTERVAL, remaining))
+            payload = get_live_status(webinar_id)
+    finally:
+        with _waiters_lock:
+            _waiters -= 1
+
+    return payload
+
+
+def get_active_run(webinar) -> Optional[LiveSession]:
+    """Get the active run of a webinar, if any."""
+    return LiveSession.objects.filter(webinar=webinar, is_active=True).first()
+
+
+def start_live_session(webinar: Event, started_by) -> tuple:
+    """
+    Open a new run of the webinar's live session, or return the one already running.
+
+    Each run gets its own room and participant records. Registrants are
+    notified in the background once the change commits.
+
+    Args:
+        webinar: Event to go live
+        started_by: User recorded as the session host
+
+    Returns:
+        Tuple of (LiveSession, started) where ``started`` is False if a run
+        was already active
+    """
+    active_run = get_active_run(webinar)
+    if active_run:
+        return active_run, False
+
+    last_run = LiveSession.objects.filter(webinar=webinar).aggregate(
+        last=Max('run_number')
+    )['last'] or 0
+    try:
+        with transaction.atomic():
+            live_session = LiveSession.objects.create(
+                webinar=webinar,
+                run_number=last_run + 1,
+                started_by=started_by,
+                started_at=timezone.now(),
+                is_active=True,
+            )
+    except IntegrityError:
+        # A concurrent start won the race for the active run
+        active_run = get_active_run(webinar)
+        if active_run is None:
+            raise
+        return active_run, False
+
+    run_in_background(fan_out_live_session_started, webinar.id)
+    invalidate_live_status(webinar.id)
+    return live_session, True
+
+
+def end_live_session(webinar: Event) -> Optional[LiveSession]:
+    """
+    Close the active run of a webinar's live session.
+
+    Participants of that run are notified in the background once the change
+    commits.
+
+    Returns:
+        The ended LiveSession, or None if no run was active
+    """
+    live_session = get_active_run(webinar)
+    if not live_session:
+        return None
+
+    live_session.is_active = False
+    live_session.end_time = timezone.now()
+    live_session.save()
+
+    run_in_background(fan_out_live_session_ended, live_session.id)
+    run_in_background(reconcile_attendance, live_session.id)
+    invalidate_live_status(webinar.id)
+    return live_session
+
+
+def reconcile_attendance(session_id, min_minutes: Optional[int] = None) -> int:
+    """
+    Mark registrations of an ended run attended from its participants.
+
+    One ``UPDATE ... WHERE EXISTS`` covers the whole run. Registrations are
+    only ever set to attended, so marks made by hand are kept.
+
+    Args:
+        session_id: Id of an ended live session
+        min_minutes: Minimum minutes between joining and the end of the run
+            (default LIVE_ATTENDANCE_MIN_MINUTES)
+
+    Returns:
+        Number of registrations newly marked attended
+    """
+    session = LiveSession.objects.filter(
+        id=session_id, is_active=False, end_time__isnull=False
+    ).values('webinar_id', 'end_time').first()
+    if session is None:
+        return 0
+
+    if min_minutes is None:
+        min_minutes = settings.LIVE_ATTENDANCE_MIN_MINUTES
+    joined = LiveSessionParticipant.objects.filter(
+        session_id=session_id,
+        user_id=OuterRef('user_id'),
+        joined_at__lte=session['end_time'] - timedelta(minutes=min_minutes),
+    )
+    return Registration.objects.filter(
+        Exists(joined), event_id=session['webinar_id'], attended=False
+    ).update(attended=True)
+
+
+def _increment(model, lookup: dict, **deltas) -> bool:
+    """
+    Apply ``F() + delta`` updates to a rollup row, creating it first if needed.
+
+    Returns:
+        True if the row was created by this call
+    """
+    row, created = model.objects.get_or_create(**lookup)
+    model.objects.filter(pk=row.pk).update(
+        **{field: F(field) + delta for field, delta in deltas.items()}
+    )
+    return created
+
+
+def _increment_totals(**deltas) -> None:
+    """
+    Apply ``F() + delta`` updates to the global totals row.
+
+    A single UPDATE with no existence check: the row is created by a data
+    migration and recreated by ``rebuild_live_analytics``.
+    """
+    LiveAnalyticsTotals.objects.filter(pk=1).update(
+        **{field: F(field) + delta for field, delta in deltas.items()}
+    )
+
+
+def record_session_started(session: LiveSession) -> None:
+    """Count a session run that just became active."""
+    started = session.started_at or session.start_time or timezone.now()
+    with transaction.atomic():
+        new_webinar = _increment(
+            WebinarLiveStats,
+            {'webinar_id': session.webinar_id},
+            total_sessions=1,
+        )
+        WebinarLiveStats.objects.filter(pk=session.webinar_id).update(last_started_at=started)
+        _increment(DailyLiveStats, {'day': timezone.localdate(started)}, sessions_started=1)
+        _increment_totals(
+            total_webinars=1 if new_webinar else 0,
+            total_sessions=1,
+            active_sessions=1,
+        )
+
+
+def record_session_ended(session: LiveSession, was_active: bool = True) -> None:
+    """
+    Count a completed session run and its duration.
+
+    ``was_active`` is False for rows created already finished (imports,
+    admin edits); those are counted as a session and a completion at once.
+    """
+    duration = session.duration_seconds or 0
+    with transaction.atomic():
+        new_webinar = _increment(
+            WebinarLiveStats,
+            {'webinar_id': session.webinar_id},
+            total_sessions=0 if was_active else 1,
+            completed_sessions=1,
+            total_duration_seconds=duration,
+        )
+        _increment(
+            DailyLiveStats,
+            {'day': timezone.localdate(session.end_time)},
+            sessions_completed=1,
+            total_duration_seconds=duration,
+        )
+        _increment_totals(
+            total_webinars=1 if new_webinar else 0,
+            total_sessions=0 if was_active else 1,
+            active_sessions=-1 if was_active else 0,
+            completed_sessions=1,
+            total_duration_seconds=duration,
+        )
+
+
+def record_participant_joined(participant: LiveSessionParticipant) -> None:
+    """Count a new participant, keeping distinct-user totals with index probes."""
+    webinar_id = participant.session.webinar_id
+    others = LiveSessionParticipant.objects.filter(user_id=participant.user_id).exclude(pk=participant.pk)
+    first_ever = not others.exists()
+    first_for_webinar = first_ever or not others.filter(session__webinar_id=webinar_id).exists()
+
+    with transaction.atomic():
+        if first_for_webinar:
+            _increment(WebinarLiveStats, {'webinar_id': webinar_id}, participant_count=1)
+        _increment(
+            DailyLiveStats,
+            {'day': timezone.localdate(participant.joined_at)},
+            participants_joined=1,
+        )
+        # Last, so the shared row is locked only until the commit
+        if first_ever:
+            _increment_totals(total_participants=1)
+
+
+def schedule_rollup_refresh(origin, webinar_ids=(), days=(), session_ids=()) -> None:
+    """
+    Recompute rollups touched by a delete once its transaction commits.
+
+    All signals from one ``delete()`` call share ``origin``, so a cascade
+    over many rows queues a single refresh covering everything it touched.
+    """
+    pending = getattr(origin, '_live_rollups_pending', None)
+    if pending is None:
+        pending = {'webinars': set(), 'days': set(), 'sessions': set(), 'queued': False}
+        if origin is not None:
+            origin._live_rollups_pending = pending
+    pending['webinars'].update(webinar_ids)
+    pending['days'].update(days)
+    pending['sessions'].update(session_ids)
+
+    def submit():
+        if pending['queued']:
+            return
+        pending['queued'] = True
+        if getattr(origin, '_live_rollups_pending', None) is pending:
+            # A later delete through the same object starts a new batch
+            del origin._live_rollups_pending
+        run_in_background(
+            refresh_live_rollups,
+            sorted(pending['webinars']),
+            sorted(pending['days']),
+            sorted(pending['sessions']),
+        )
+
+    # Registered per signal, so a rolled back savepoint can't lose the batch
+    transaction.on_commit(submit)
+
+
+def _run_seconds(row: dict) -> float:
+    started = row['started_at'] or row['start_time']
+    return max((row['end_time'] - started).total_seconds(), 0)
+
+
+def _refresh_webinar_stats(webinar_id) -> None:
+    sessions = list(
+        LiveSession.objects.filter(webinar_id=webinar_id)
+        .values('is_active', 'start_time', 'started_at', 'end_time')
+    )
+    if not sessions:
+        WebinarLiveStats.objects.filter(pk=webinar_id).delete()
+        return
+
+    completed = [row for row in sessions if not row['is_active'] and row['end_time']]
+    WebinarLiveStats.objects.update_or_create(
+        webinar_id=webinar_id,
+        defaults={
+            'total_sessions': len(sessions),
+            'completed_sessions': len(completed),
+            'total_duration_seconds': sum(_run_seconds(row) for row in completed),
+            'last_started_at': max(row['started_at'] or row['start_time'] for row in sessions),
+            'participant_count': LiveSessionParticipant.objects.filter(
+                session__webinar_id=webinar_id
+            ).values('user').distinct().count(),
+        },
+    )
+
+
+def _refresh_daily_stats(day) -> None:
+    start = timezone.make_aware(datetime.combine(day, day_time.min))
+    end = start + timedelta(days=1)
+    started = LiveSession.objects.filter(
+        Q(started_at__gte=start, started_at__lt=end)
+        | Q(started_at__isnull=True, start_time__gte=start, start_time__lt=end)
+    ).count()
+    completed = list(
+        LiveSession.objects.filter(is_active=False, end_time__gte=start, end_time__lt=end)
+        .values('start_time', 'started_at', 'end_time')
+    )
+    joined = LiveSessionParticipant.objects.filter(joined_at__gte=start, joined_at__lt=end).count()
+
+    if not (started or completed or joined):
+        DailyLiveStats.objects.filter(day=day).delete()
+        return
+    DailyLiveStats.objects.update_or_create(
+        day=day,
+        defaults={
+            'sessions_started': started,
+            'sessions_completed': len(completed),
+            'participants_joined': joined,
+            'total_duration_seconds': sum(_run_seconds(row) for row in completed),
+        },
+    )
+
+
+@transaction.atomic
+def refresh_live_rollups(webinar_ids=(), days=(), session_ids=()) -> None:
+    """
+    Recompute the rollups of some webinars and days, then the totals.
+
+    Used after deletes. ``session_ids`` adds the webinars of sessions that
+    still exist (e.g. when only participants were deleted).
+    """
+    webinar_ids = set(webinar_ids)
+    webinar_ids.update(LiveSession.objects.filter(pk__in=session_ids).values_list('webinar_id', flat=True))
+    for webinar_id in webinar_ids:
+        _refresh_webinar_stats(webinar_id)
+    for day in days:
+        _refresh_daily_stats(day)
+
+    per_webinar = WebinarLiveStats.objects.aggregate(
+        total_webinars=Count('pk'),
+        total_sessions=Coalesce(Sum('total_sessions'), 0),
+        completed_sessions=Coalesce(Sum('completed_sessions'), 0),
+        total_duration_seconds=Coalesce(Sum('total_duration_seconds'), 0.0),
+    )
+    LiveAnalyticsTotals.objects.update_or_create(
+        pk=1,
+        defaults={
+            **per_webinar,
+            'active_sessions': LiveSession.objects.filter(is_active=True).count(),
+            'total_participants': LiveSessionParticipant.objects.values('user').distinct().count(),
+        },
+    )
+
+
+@transaction.atomic
+def rebuild_live_analytics() -> None:
+    """
+    Recompute every rollup from the raw session and participant tables.
+
+    Full scans - meant for backfilling after a deploy or repairing drift,
+    never for the request path.
+    """
+    WebinarLiveStats.objects.all().delete()
+    DailyLiveStats.objects.all().delete()
+    LiveAnalyticsTotals.objects.all().delete()
+
+    completed = Q(is_active=False, end_time__isnull=False)
+    sessions = LiveSession.objects.values(
+        'webinar_id', 'is_active', 'start_time', 'started_at', 'end_time'
+    ).iterator()
+
+    per_webinar = {}
+    per_day = {}
+
+    def day_row(day):
+        return per_day.setdefault(day, DailyLiveStats(day=day))
+
+    for row in sessions:
+        stats = per_webinar.setdefault(
+            row['webinar_id'], WebinarLiveStats(webinar_id=row['webinar_id'])
+        )
+        started = row['started_at'] or row['start_time']
+        stats.total_sessions += 1
+        if stats.last_started_at is None or started > stats.last_started_at:
+            stats.last_started_at = started
+        day_row(timezone.localdate(started)).sessions_started += 1
+
+        if not row['is_active'] and row['end_time']:
+            duration = max((row['end_time'] - started).total_seconds(), 0)
+            stats.completed_sessions += 1
+            stats.total_duration_seconds += duration
+            bucket = day_row(timezone.localdate(row['end_time']))
+            bucket.sessions_completed += 1
+            bucket.total_duration_seconds += duration
+
+    participant_counts = LiveSessionParticipant.objects.values(
+        'session__webinar_id'
+    ).annotate(users=Count('user', distinct=True))
+    for row in participant_counts:
+        per_webinar[row['session__webinar_id']].participant_count = row['users']
+
+    joins_per_day = LiveSessionParticipant.objects.annotate(
+        day=TruncDate('joined_at')
+    ).values('day').annotate(joins=Count('id'))
+    for row in joins_per_day:
+        day_row(row['day']).participants_joined = row['joins']
+
+    WebinarLiveStats.objects.bulk_create(per_webinar.values())
+    DailyLiveStats.objects.bulk_create(per_day.values())
+
+    aggregates = LiveSession.objects.aggregate(
+        total_sessions=Count('id'),
+        active_sessions=Count('id', filter=Q(is_active=True)),
+        completed_sessions=Count('id', filter=completed),
+    )
+    LiveAnalyticsTotals.objects.create(
+        pk=1,
+        total_webinars=len(per_webinar),
+        total_participants=LiveSessionParticipant.objects.values('user').distinct().count(),
+        total_duration_seconds=sum(s.total_duration_seconds for s in per_webinar.values()),
+        **aggregates,
+    )
@@ -0,0 +1,55 @@
+"""
+Signals for the live_sessions app.
+Keep the analytics rollups current as sessions start, end and gain participants,
+and repair them when sessions or participants are deleted.
+"""
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+from django.utils import timezone
+
+from .models import LiveSession, LiveSessionParticipant
+from .services import (
+    record_participant_joined,
+    record_session_ended,
+    record_session_started,
+    schedule_rollup_refresh,
+)
+
+
+@receiver(post_save, sender=LiveSession)
+def update_session_rollups(sender, instance, created, **kwargs):
+    """Record start/end transitions by comparing with the state last loaded or saved."""
+    was_active = None if created else getattr(instance, '_loaded_is_active', None)
+
+    if instance.is_active and not was_active:
+        record_session_started(instance)
+    elif not instance.is_active and instance.end_time and (created or was_active):
+        record_session_ended(instance, was_active=bool(was_active))
+
+    instance._loaded_is_active = instance.is_active
+
+
+@receiver(post_save, sender=LiveSessionParticipant)
+def update_participant_rollups(sender, instance, created, **kwargs):
+    """Count each new participant record once."""
+    if created:
+        record_participant_joined(instance)
+
+
+@receiver(post_delete, sender=LiveSession)
+def forget_session_rollups(sender, instance, origin=None, **kwargs):
+    """Recount the webinar and days a deleted session was counted in."""
+    days = [timezone.localdate(instance.started_at or instance.start_time)]
+    if instance.end_time:
+        days.append(timezone.localdate(instance.end_time))
+    schedule_rollup_refresh(origin, webinar_ids=[instance.webinar_id], days=days)
+
+
+@receiver(post_delete, sender=LiveSessionParticipant)
+def forget_participant_rollups(sender, instance, origin=None, **kwargs):
+    """Recount the webinar and day a deleted participant was counted in."""
+    schedule_rollup_refresh(
+        origin,
+        days=[timezone.localdate(instance.joined_at)],
+        session_ids=[instance.session_id],
+    )
@@ -1,12 +1,29 @@
+from datetime import timedelta
+from io import StringIO
+
+from django.conf import settings
 from django.contrib.auth import get_user_model
-from django.test import TestCase
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import IntegrityError, connection, transaction
+from django.test.utils import CaptureQueriesContext
+from django.test import TestCase, override_settings
 from django.utils import timezone
 from rest_framework.test import APITestCase, APIClient
 from rest_framework import status
 
 from webinars.models import Event
 from registrations.models import Registration
-from .models import LiveSession, LiveSessionParticipant
+from communications.models import UserNotification
+from .models import (
+    LiveSession,
+    LiveSessionParticipant,
+    LiveAnalyticsTotals,
+    WebinarLiveStats,
+    DailyLiveStats,
+)
+from .scheduler import LiveSessionScheduler
+from .services import get_live_status, reconcile_attendance
 
 
 User = get_user_model()
@@ -18,6 +35,7 @@ class LiveSessionAPITests(APITestCase):
     def setUp(self):
         """Create test users, webinar, and registrations"""
         self.client = APIClient()
+        cache.clear()
         
         # Create organizer (using is_staff to auto-set admin role via signal)
         self.organizer = User.objects.create_user(
@@ -73,6 +91,27 @@ class LiveSessionAPITests(APITestCase):
         self.assertIsNone(live_session.end_time)
         self.assertIsNotNone(live_session.start_time)
     
+    @override_settings(BACKGROUND_TASKS_EAGER=True)
+    def test_start_and_end_notify_after_commit(self):
+        """Test start/end fan out notifications once the request commits"""
+        self.client.force_authenticate(user=self.organizer)
+        
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.post(f'/api/live/start/{self.webinar.id}/')
+        
+        started = UserNotification.objects.filter(notification_type='live_started')
+        self.assertEqual(list(started.values_list('user_id', flat=True)), [self.student1.id])
+        
+        self.client.force_authenticate(user=self.student1)
+        self.client.get(f'/api/live/join/{self.webinar.id}/')
+        
+        self.client.force_authenticate(user=self.organizer)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.post(f'/api/live/end/{self.webinar.id}/')
+        
+        ended = UserNotification.objects.filter(notification_type='live_ended')
+        self.assertEqual(list(ended.values_list('user_id', flat=True)), [self.student1.id])
+    
     def test_start_session_returns_existing_active_session(self):
         """Test starting session twice returns existing active session"""
         self.client.force_authenticate(user=self.organizer)
@@ -93,6 +132,104 @@ class LiveSessionAPITests(APITestCase):
         # Should only have one session in database
         self.assertEqual(LiveSession.objects.filter(webinar=self.webinar).count(), 1)
     
+    def test_restart_creates_new_run_with_own_attendance(self):
+        """Test restarting a webinar opens a new run instead of reusing the old one"""
+        Registration.objects.create(user=self.student2, event=self.webinar)
+        
+        self.client.force_authenticate(user=self.organizer)
+        first = self.client.post(f'/api/live/start/{self.webinar.id}/')
+        self.client.force_authenticate(user=self.student1)
+        self.client.get(f'/api/live/join/{self.webinar.id}/')
+        self.client.force_authenticate(user=self.organizer)
+        self.client.post(f'/api/live/end/{self.webinar.id}/')
+        
+        second = self.client.post(f'/api/live/start/{self.webinar.id}/')
+        self.client.force_authenticate(user=self.student2)
+        join = self.client.get(f'/api/live/join/{self.webinar.id}/')
+        
+        self.assertEqual(first.data['run_number'], 1)
+        self.assertEqual(second.data['run_number'], 2)
+        self.assertNotEqual(first.data['room_name'], second.data['room_name'])
+        self.assertEqual(join.data['run_number'], 2)
+        self.assertEqual(join.data['participant_count'], 1)
+        
+        run1 = LiveSession.objects.get(id=first.data['id'])
+        run2 = LiveSession.objects.get(id=second.data['id'])
+        self.assertFalse(run1.is_active)
+        self.assertTrue(run2.is_active)
+        self.assertEqual(list(run1.participants.values_list('user_id', flat=True)), [self.student1.id])
+        self.assertEqual(list(run2.participants.values_list('user_id', flat=True)), [self.student2.id])
+    
+    @override_settings(BACKGROUND_TASKS_EAGER=True)
+    def test_end_notifies_only_current_run_participants(self):
+        """Test end-of-session notifications are scoped to the run that ended"""
+        Registration.objects.create(user=self.student2, event=self.webinar)
+        self.client.force_authenticate(user=self.organizer)
+        self.client.post(f'/api/live/start/{self.webinar.id}/')
+        self.client.force_authenticate(user=self.student1)
+        self.client.get(f'/api/live/join/{self.webinar.id}/')
+        self.client.force_authenticate(user=self.organizer)
+        self.client.post(f'/api/live/end/{self.webinar.id}/')
+        self.client.post(f'/api/live/start/{self.webinar.id}/')
+        self.client.force_authenticate(user=self.student2)
+        self.client.get(f'/api/live/join/{self.webinar.id}/')
+        
+        self.client.force_authenticate(user=self.organizer)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.post(f'/api/live/end/{self.webinar.id}/')
+        
+        ended = UserNotification.objects.filter(notification_type='live_ended')
+        self.assertEqual(list(ended.values_list('user_id', flat=True)), [self.student2.id])
+    
+    def test_single_active_run_per_webinar(self):
+        """Test the database refuses a second active run"""
+        LiveSession.objects.create(webinar=self.webinar, started_by=self.organizer)
+        
+        with self.assertRaises(IntegrityError), transaction.atomic():
+            LiveSession.objects.create(webinar=self.webinar, started_by=self.organizer, run_number=2)
+    
+    def test_analytics_webinar_runs_and_single_run(self):
+        """Test analytics can list a webinar's runs and drill into one run"""
+        self.client.force_authenticate(user=self.organizer)
+        self.client.post(f'/api/live/start/{self.webinar.id}/')
+        self.client.force_authenticate(user=self.student1)
+        self.client.get(f'/api/live/join/{self.webinar.id}/')
+        self.client.force_authenticate(user=self.organizer)
+        self.client.post(f'/api/live/end/{self.webinar.id}/')
+        second = self.client.post(f'/api/live/start/{self.webinar.id}/')
+        
+        runs = self.client.get('/api/live/analytics/', {'webinar': self.webinar.id})
+        self.assertEqual(runs.status_code, status.HTTP_200_OK)
+        self.assertEqual([run['run_number'] for run in runs.data['runs']], [1, 2])
+        self.assertEqual([run['participant_count'] for run in runs.data['runs']], [1, 0])
+        self.assertIsNotNone(runs.data['runs'][0]['duration_minutes'])
+        self.assertTrue(runs.data['runs'][1]['is_active'])
+        
+        run = self.client.get('/api/live/analytics/', {'run': runs.data['runs'][0]['run_id']})
+        self.assertEqual(run.status_code, status.HTTP_200_OK)
+        self.assertEqual(run.data['webinar_id'], self.webinar.id)
+        self.assertEqual([p['user_id'] for p in run.data['participants']], [self.student1.id])
+        
+        current = self.client.get('/api/live/analytics/', {'run': second.data['id']})
+        self.assertEqual(current.data['participants'], [])
+    
+    def test_analytics_run_invalid_or_unknown(self):
+        """Test run/webinar filters validate their ids"""
+        self.client.force_authenticate(user=self.organizer)
+        
+        self.assertEqual(
+            self.client.get('/api/live/analytics/', {'run': 'abc'}).status_code,
+            status.HTTP_400_BAD_REQUEST
+        )
+        self.assertEqual(
+            self.client.get('/api/live/analytics/', {'run': 99999}).status_code,
+            status.HTTP_404_NOT_FOUND
+        )
+        self.assertEqual(
+            self.client.get('/api/live/analytics/', {'webinar': 99999}).status_code,
+            status.HTTP_404_NOT_FOUND
+        )
+    
     def test_start_session_unauthorized(self):
         """Test non-organizer cannot start a session"""
         self.client.force_authenticate(user=self.student1)
@@ -294,6 +431,83 @@ class LiveSessionAPITests(APITestCase):
         self.assertFalse(response.data['is_active'])
         self.assertIsNone(response.data['room_name'])
     
+    def test_status_endpoint_nonexistent_webinar(self):
+        """Test status endpoint returns 404 for unknown webinar"""
+        response = self.client.get('/api/live/status/99999/')
+        
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+    
+    def test_status_endpoint_served_from_cache(self):
+        """Test repeated status polls do not hit the database"""
+        status_url = f'/api/live/status/{self.webinar.id}/'
+        self.client.get(status_url)
+        
+        with self.assertNumQueries(0):
+            response = self.client.get(status_url)
+        
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertFalse(response.data['is_active'])
+    
+    def test_status_cache_invalidated_on_start_and_end(self):
+        """Test start/end invalidate the cached status"""
+        status_url = f'/api/live/status/{self.webinar.id}/'
+        self.assertFalse(self.client.get(status_url).data['is_active'])
+        
+        self.client.force_authenticate(user=self.organizer)
+        self.client.post(f'/api/live/start/{self.webinar.id}/')
+        self.assertTrue(self.client.get(status_url).data['is_active'])
+        
+        self.client.post(f'/api/live/end/{self.webinar.id}/')
+        self.assertFalse(self.client.get(status_url).data['is_active'])
+    
+    def test_status_long_poll_returns_when_state_differs(self):
+        """Test long-poll returns immediately once is_active differs from since"""
+        self.client.force_authenticate(user=self.organizer)
+        self.client.post(f'/api/live/start/{self.webinar.id}/')
+        
+        self.client.force_authenticate(user=None)
+        started = timezone.now()
+        response = self.client.get(
+            f'/api/live/status/{self.webinar.id}/', {'wait': 10, 'since': 'false'}
+        )
+        
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertTrue(response.data['is_active'])
+        self.assertLess((timezone.now() - started).total_seconds(), 5)
+    
+    @override_settings(LIVE_STATUS_POLL_INTERVAL=0.05)
+    def test_status_long_poll_times_out_without_change(self):
+        """Test long-poll returns the unchanged state after the wait expires"""
+        started = timezone.now()
+        response = self.client.get(
+            f'/api/live/status/{self.webinar.id}/', {'wait': 0.3, 'since': 'false'}
+        )
+        
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertFalse(response.data['is_active'])
+        self.assertGreaterEqual((timezone.now() - started).total_seconds(), 0.3)
+    
+    def test_status_long_poll_invalid_wait(self):
+        """Test non-numeric and non-finite waits are rejected"""
+        for wait in ['soon', 'nan', 'inf']:
+            response = self.client.get(f'/api/live/status/{self.webinar.id}/', {'wait': wait})
+            
+            self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+    
+    @override_settings(LIVE_STATUS_MAX_WAITERS=0)
+    def test_status_long_poll_answers_at_once_when_waiters_full(self):
+        """Test long-polls beyond the waiter cap don't hold a worker"""
+        started = timezone.now()
+        response = self.client.get(
+            f'/api/live/status/{self.webinar.id}/', {'wait': 10, 'since': 'false'}
+        )
+        
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertFalse(response.data['is_active'])
+        self.assertLess((timezone.now() - started).total_seconds(), 5)
+        self.assertEqual(response.data['retry_after'], settings.LIVE_STATUS_BUSY_RETRY_SECONDS)
+        self.assertEqual(response['Retry-After'], str(settings.LIVE_STATUS_BUSY_RETRY_SECONDS))
+    
     def test_analytics_endpoint_as_admin(self):
         """Test admin can access analytics endpoint"""
         self.client.force_authenticate(user=self.organizer)
@@ -452,6 +666,318 @@ class LiveSessionAPITests(APITestCase):
         self.assertAlmostEqual(avg_duration, 30.0, delta=1.0)
 
 
+class LiveSessionAnalyticsRollupTests(APITestCase):
+    """Tests for the incrementally maintained analytics rollups"""
+    
+    def setUp(self):
+        self.organizer = User.objects.create_user(
+            username='organizer',
+            email='organizer@test.com',
+            password='testpass123',
+            is_staff=True
+        )
+        self.students = [
+            User.objects.create_user(
+                username=f'student{i}',
+                email=f'student{i}@test.com',
+                password='testpass123'
+            )
+            for i in range(2)
+        ]
+        self.webinars = [
+            Event.objects.create(
+                title=f'Rollup Webinar {i}',
+                date='2026-03-15',
+                time='14:00:00',
+                organizer=self.organizer,
+            )
+            for i in range(3)
+        ]
+        for webinar in self.webinars:
+            for student in self.students:
+                Registration.objects.create(user=student, event=webinar)
+    
+    def run_session(self, webinar, participants):
+        self.client.force_authenticate(user=self.organizer)
+        self.client.post(f'/api/live/start/{webinar.id}/')
+        for participant in participants:
+            self.client.force_authenticate(user=participant)
+            self.client.get(f'/api/live/join/{webinar.id}/')
+        self.client.force_authenticate(user=self.organizer)
+        self.client.post(f'/api/live/end/{webinar.id}/')
+    
+    def test_rollups_track_sessions_and_distinct_participants(self):
+        """Test totals and per-webinar stats follow start/join/end"""
+        self.run_session(self.webinars[0], self.students)
+        self.run_session(self.webinars[1], self.students[:1])
+        
+        totals = LiveAnalyticsTotals.objects.get(pk=1)
+        self.assertEqual(totals.total_webinars, 2)
+        self.assertEqual(totals.total_sessions, 2)
+        self.assertEqual(totals.active_sessions, 0)
+        self.assertEqual(totals.completed_sessions, 2)
+        self.assertEqual(totals.total_participants, 2)
+        
+        stats = WebinarLiveStats.objects.get(webinar=self.webinars[0])
+        self.assertEqual(stats.participant_count, 2)
+        self.assertEqual(stats.completed_sessions, 1)
+        
+        today = DailyLiveStats.objects.get(day=timezone.localdate())
+        self.assertEqual(today.sessions_started, 2)
+        self.assertEqual(today.sessions_completed, 2)
+        self.assertEqual(today.participants_joined, 3)
+    
+    def test_join_updates_totals_row_without_lookup(self):
+        """Test a first join touches the totals row with one UPDATE only"""
+        self.client.force_authenticate(user=self.organizer)
+        self.client.post(f'/api/live/start/{self.webinars[0].id}/')
+        self.client.force_authenticate(user=self.students[0])
+        
+        with CaptureQueriesContext(connection) as queries:
+            self.client.get(f'/api/live/join/{self.webinars[0].id}/')
+        
+        totals_sql = [
+            q['sql'] for q in queries.captured_queries
+            if 'live_sessions_liveanalyticstotals' in q['sql']
+        ]
+        self.assertEqual(len(totals_sql), 1)
+        self.assertTrue(totals_sql[0].startswith('UPDATE'))
+        self.assertEqual(LiveAnalyticsTotals.objects.get(pk=1).total_participants, 1)
+    
+    def test_analytics_query_count_independent_of_session_volume(self):
+        """Test analytics cost does not grow with sessions or participants"""
+        self.run_session(self.webinars[0], self.students)
+        self.client.force_authenticate(user=self.organizer)
+        with CaptureQueriesContext(connection) as few:
+            self.client.get('/api/live/analytics/')
+        
+        self.run_session(self.webinars[1], self.students)
+        self.run_session(self.webinars[2], self.students)
+        self.client.force_authenticate(user=self.organizer)
+        with CaptureQueriesContext(connection) as many:
+            response = self.client.get('/api/live/analytics/')
+        
+        self.assertEqual(len(few), len(many))
+        self.assertEqual(len(response.data['sessions_per_webinar']), 3)
+    
+    def test_analytics_daily_range(self):
+        """Test from/to returns daily buckets within the range"""
+        self.run_session(self.webinars[0], self.students)
+        today = timezone.localdate()
+        DailyLiveStats.objects.create(day=today - timedelta(days=30), sessions_started=4)
+        
+        self.client.force_authenticate(user=self.organizer)
+        response = self.client.get(
+            '/api/live/analytics/',
+            {'from': (today - timedelta(days=7)).isoformat(), 'to': today.isoformat()}
+        )
+        
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(response.data['daily']), 1)
+        self.assertEqual(response.data['daily'][0]['day'], today)
+        self.assertEqual(response.data['daily'][0]['participants_joined'], 2)
+    
+    def test_analytics_invalid_range(self):
+        """Test malformed dates are rejected"""
+        self.client.force_authenticate(user=self.organizer)
+        response = self.client.get('/api/live/analytics/', {'from': 'last-week'})
+        
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+    
+    def test_rebuild_matches_incremental_rollups(self):
+        """Test the rebuild command reproduces the incremental rollups"""
+        self.run_session(self.webinars[0], self.students)
+        self.run_session(self.webinars[1], self.students[:1])
+        self.client.force_authenticate(user=self.organizer)
+        before = self.client.get('/api/live/analytics/').data
+        
+        call_command('rebuild_live_analytics', stdout=StringIO())
+        after = self.client.get('/api/live/analytics/').data
+        
+        self.assertEqual(before, after)
+    
+    def analytics_after_rebuild(self):
+        call_command('rebuild_live_analytics', stdout=StringIO())
+        return self.client.get('/api/live/analytics/').data
+    
+    @override_settings(BACKGROUND_TASKS_EAGER=True)
+    def test_deletes_are_taken_out_of_rollups(self):
+        """Test deleting participants, sessions and webinars corrects the rollups"""
+        self.run_session(self.webinars[0], self.students)
+        self.run_session(self.webinars[1], self.students)
+        self.run_session(self.webinars[2], self.students[:1])
+        self.client.force_authenticate(user=self.organizer)
+        
+        with self.captureOnCommitCallbacks(execute=True):
+            LiveSessionParticipant.objects.filter(
+                session__webinar=self.webinars[2]
+            ).delete()
+        with self.captureOnCommitCallbacks(execute=True):
+            # Cascades to the webinar's session and both participants
+            self.webinars[0].delete()
+        
+        incremental = self.client.get('/api/live/analytics/').data
+        self.assertEqual(incremental, self.analytics_after_rebuild())
+        totals = LiveAnalyticsTotals.objects.get(pk=1)
+        self.assertEqual(totals.total_webinars, 2)
+        self.assertEqual(totals.total_sessions, 2)
+        self.assertEqual(totals.total_participants, 2)
+        self.assertEqual(DailyLiveStats.objects.get(day=timezone.localdate()).participants_joined, 2)
+
+
+class LiveSessionSchedulerTests(TestCase):
+    """Tests for the timetable-driven live session scheduler"""
+
+    def setUp(self):
+        cache.clear()
+        self.organizer = User.objects.create_user(
+            username='organizer',
+            email='organizer@test.com',
+            password='testpass123',
+            is_staff=True
+        )
+        self.student = User.objects.create_user(
+            username='student',
+            email='student@test.com',
+            password='testpass123'
+        )
+        self.now = timezone.now()
+
+    def _create_webinar(self, starts_in, duration=60, **kwargs):
+        start = (self.now + starts_in).replace(microsecond=0)
+        return Event.objects.create(
+            title='Scheduled Webinar',
+            date=start.date(),
+            time=start.time(),
+            duration=duration,
+            organizer=self.organizer,
+            **kwargs
+        )
+
+    def test_event_schedule_columns_follow_date_and_time(self):
+        """Test starts_at/ends_at are derived on save"""
+        webinar = self._create_webinar(timedelta(hours=2), duration=90)
+
+        self.assertEqual(webinar.starts_at, webinar.start_datetime)
+        self.assertEqual(webinar.ends_at - webinar.starts_at, timedelta(minutes=90))
+
+        webinar.duration = 30
+        webinar.save(update_fields=['duration'])
+        webinar.refresh_from_db()
+        self.assertEqual(webinar.ends_at - webinar.starts_at, timedelta(minutes=30))
+
+    @override_settings(BACKGROUND_TASKS_EAGER=True)
+    def test_running_webinar_opens_immediately(self):
+        """Test a webinar already inside its slot is opened on load and notifies registrants"""
+        webinar = self._create_webinar(-timedelta(minutes=10))
+        Registration.objects.create(user=self.student, event=webinar)
+        scheduler = LiveSessionScheduler()
+        scheduler.load(self.now)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            applied = scheduler.run_due(self.now)
+
+        self.assertEqual(applied, 1)
+        session = LiveSession.objects.get(webinar=webinar)
+        self.assertTrue(session.is_active)
+        self.assertEqual(session.started_by, self.organizer)
+        self.assertTrue(get_live_status(webinar.id)['is_active'])
+        self.assertTrue(
+            UserNotification.objects.filter(user=self.student, notification_type='live_started').exists()
+        )
+
+    def test_upcoming_webinar_opens_and_closes_on_time(self):
+        """Test start and end transitions fire at their scheduled times"""
+        webinar = self._create_webinar(timedelta(minutes=5), duration=30)
+        scheduler = LiveSessionScheduler()
+        scheduler.load(self.now)
+
+        self.assertEqual(len(scheduler), 2)
+        self.assertEqual(scheduler.next_transition_at(), webinar.starts_at)
+        self.assertEqual(scheduler.run_due(self.now), 0)
+
+        self.assertEqual(scheduler.run_due(webinar.starts_at), 1)
+        self.assertTrue(LiveSession.objects.get(webinar=webinar).is_active)
+
+        self.assertEqual(scheduler.run_due(webinar.ends_at), 1)
+        session = LiveSession.objects.get(webinar=webinar)
+        self.assertFalse(session.is_active)
+        self.assertIsNotNone(session.end_time)
+        self.assertIsNone(scheduler.next_transition_at())
+
+    def test_edited_webinar_is_rescheduled(self):
+        """Test edits are picked up incrementally and stale transitions are dropped"""
+        webinar = self._create_webinar(timedelta(minutes=30))
+        scheduler = LiveSessionScheduler()
+        scheduler.load(self.now)
+        old_start = webinar.starts_at
+
+        moved = (self.now + timedelta(minutes=10)).replace(microsecond=0)
+        webinar.time = moved.time()
+        webinar.date = moved.date()
+        webinar.save()
+
+        self.assertEqual(scheduler.reload_changed(self.now), 1)
+        self.assertEqual(scheduler.next_transition_at(), webinar.starts_at)
+        self.assertEqual(scheduler.run_due(webinar.starts_at), 1)
+        # The entry for the old start time is stale and must not fire again
+        self.assertEqual(scheduler.run_due(old_start), 0)
+
+    def test_reload_without_changes_is_one_query(self):
+        """Test an idle reload only probes the updated_at index"""
+        self._create_webinar(timedelta(minutes=30))
+        scheduler = LiveSessionScheduler()
+        scheduler.load(self.now)
+
+        with self.assertNumQueries(1):
+            scheduler.reload_changed(self.now)
+
+    def test_horizon_slides_forward(self):
+        """Test webinars beyond the horizon are queued once it slides"""
+        webinar = self._create_webinar(timedelta(minutes=80))
+        scheduler = LiveSessionScheduler(horizon=timedelta(hours=1))
+        scheduler.load(self.now)
+        self.assertEqual(len(scheduler), 0)
+
+        self.assertFalse(scheduler.extend(self.now + timedelta(minutes=10)))
+        self.assertTrue(scheduler.extend(self.now + timedelta(minutes=30)))
+        self.assertEqual(scheduler.next_transition_at(), webinar.starts_at)
+
+    def test_completed_webinar_is_skipped(self):
+        """Test webinars marked completed are never opened"""
+        webinar = self._create_webinar(-timedelta(minutes=5), manual_status='completed')
+        scheduler = LiveSessionScheduler()
+        scheduler.load(self.now)
+
+        self.assertEqual(scheduler.run_due(self.now), 0)
+        self.assertFalse(LiveSession.objects.filter(webinar=webinar).exists())
+
+    def test_closed_slot_is_not_reopened(self):
+        """Test a session the organizer already ended is not restarted"""
+        webinar = self._create_webinar(-timedelta(minutes=20))
+        LiveSession.objects.create(
+            webinar=webinar,
+            started_by=self.organizer,
+            is_active=False,
+            end_time=timezone.now()
+        )
+        scheduler = LiveSessionScheduler()
+        scheduler.load(self.now)
+
+        self.assertEqual(scheduler.run_due(self.now), 0)
+        self.assertFalse(LiveSession.objects.get(webinar=webinar).is_active)
+
+    def test_command_once(self):
+        """Test the management command applies due transitions"""
+        webinar = self._create_webinar(-timedelta(minutes=5))
+        out = StringIO()
+
+        call_command('run_live_scheduler', '--once', stdout=out)
+
+        self.assertIn('Applied 1', out.getvalue())
+        self.assertTrue(LiveSession.objects.get(webinar=webinar).is_active)
+
+
 class LiveSessionModelTests(TestCase):
     """Test LiveSession and LiveSessionParticipant models"""
     
@@ -579,3 +1105,93 @@ class LiveSessionModelTests(TestCase):
             LiveSessionParticipant.objects.filter(session_id=session_id).count(),
             0
         )
+
+
+class AttendanceReconciliationTests(APITestCase):
+    """Tests for marking registrations attended from live participation"""
+
+    def setUp(self):
+        cache.clear()
+        self.organizer = User.objects.create_user(
+            username='organizer',
+            email='organizer@test.com',
+            password='testpass123',
+            is_staff=True
+        )
+        self.students = [
+            User.objects.create_user(
+                username=f'student{i}',
+                email=f'student{i}@test.com',
+                password='testpass123'
+            )
+            for i in range(3)
+        ]
+        self.webinar = Event.objects.create(
+            title='Attendance Webinar',
+            date='2026-03-15',
+            time='14:00:00',
+            duration=60,
+            organizer=self.organizer,
+        )
+        for student in self.students[:2]:
+            Registration.objects.create(user=student, event=self.webinar)
+
+    def ended_run(self, joined_minutes_before_end):
+        end = timezone.now()
+        session = LiveSession.objects.create(
+            webinar=self.webinar,
+            run_number=LiveSession.objects.filter(webinar=self.webinar).count() + 1,
+            is_active=False,
+            started_at=end - timedelta(hours=1),
+            end_time=end,
+        )
+        for student, minutes in joined_minutes_before_end.items():
+            participant = LiveSessionParticipant.objects.create(session=session, user=student)
+            LiveSessionParticipant.objects.filter(pk=participant.pk).update(joined_at=end - timedelta(minutes=minutes))
+        return session
+
+    @override_settings(BACKGROUND_TASKS_EAGER=True)
+    def test_ending_session_marks_registrants_who_joined(self):
+        """Test ending a run marks attendance for registered participants only"""
+        self.client.force_authenticate(user=self.organizer)
+        self.client.post(f'/api/live/start/{self.webinar.id}/')
+        for student in (self.students[0], self.students[2]):
+            self.client.force_authenticate(user=student)
+            self.client.get(f'/api/live/join/{self.webinar.id}/')
+
+        self.client.force_authenticate(user=self.organizer)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.post(f'/api/live/end/{self.webinar.id}/')
+
+        attended = Registration.objects.filter(event=self.webinar, attended=True)
+        self.assertEqual(list(attended.values_list('user_id', flat=True)), [self.students[0].id])
+        self.assertFalse(Registration.objects.filter(user=self.students[2]).exists())
+
+    def test_single_update_with_watch_time_threshold(self):
+        """Test late joiners below the threshold aren't marked, in one UPDATE"""
+        session = self.ended_run({self.students[0]: 45, self.students[1]: 5})
+
+        with self.assertNumQueries(2):
+            marked = reconcile_attendance(session.id, min_minutes=30)
+
+        self.assertEqual(marked, 1)
+        self.assertTrue(Registration.objects.get(user=self.students[0]).attended)
+        self.assertFalse(Registration.objects.get(user=self.students[1]).attended)
+
+    def test_active_session_is_skipped(self):
+        """Test runs still in progress aren't reconciled"""
+        session = LiveSession.objects.create(webinar=self.webinar, is_active=True)
+        LiveSessionParticipant.objects.create(session=session, user=self.students[0])
+
+        self.assertEqual(reconcile_attendance(session.id), 0)
+
+    def test_command(self):
+        """Test the command reconciles every ended run"""
+        self.ended_run({self.students[0]: 45})
+        self.ended_run({self.students[1]: 10})
+        out = StringIO()
+
+        call_command('reconcile_attendance', stdout=out)
+
+        self.assertIn('Reconciled 2 live session runs: 2 registrations marked attended', out.getvalue())
+        self.assertEqual(Registration.objects.filter(attended=True).count(), 2)
@@ -1,16 +1,18 @@
+import math
+
 from rest_framework import status, viewsets
 from rest_framework.decorators import action
 from rest_framework.response import Response
 from rest_framework.permissions import IsAuthenticated, AllowAny
-from django.utils import timezone
-from django.db.models import Count, Avg, F, ExpressionWrapper, DurationField, Q
-from django.contrib.auth.models import User
+from django.conf import settings
+from django.db.models import Count
+from django.utils.dateparse import parse_date
 
 from webinars.models import Event
 from registrations.models import Registration
 from accounts.permissions import IsAdmin
-from communications.services import notify_live_session_started, notify_live_session_ended
-from .models import LiveSession, LiveSessionParticipant
+from .models import LiveSession, LiveSessionParticipant, LiveAnalyticsTotals, WebinarLiveStats, DailyLiveStats
+from .services import get_active_run, start_live_session, end_live_session, wait_for_live_status
 from .serializers import (
     LiveSessionSerializer,
     LiveSessionStartSerializer,
@@ -57,35 +59,7 @@ class LiveSessionViewSet(viewsets.ModelViewSet):
                 status=status.HTTP_403_FORBIDDEN
             )
 
-        # Return existing active session if present
-        active_session = LiveSession.objects.filter(
-            webinar=webinar,
-            is_active=True
-        ).first()
-        if active_session:
-            serializer = LiveSessionStartSerializer(active_session)
-            return Response(serializer.data, status=status.HTTP_200_OK)
-
-        # Get or create live session
-        live_session, created = LiveSession.objects.get_or_create(
-            webinar=webinar,
-            defaults={'started_by': request.user}
-        )
-
-        # Activate the session
-        if not live_session.is_active:
-            live_session.is_active = True
-            live_session.started_at = timezone.now()
-            live_session.started_by = request.user
-            live_session.end_time = None
-            live_session.save()
-            
-            # Notify all registered users that the live session has started
-            registered_users = User.objects.filter(
-                event_registrations__event=webinar
-            ).distinct()
-            notify_live_session_started(webinar, registered_users)
-
+        live_session, _ = start_live_session(webinar, request.user)
         serializer = LiveSessionStartSerializer(live_session)
         return Response(serializer.data, status=status.HTTP_200_OK)
 
@@ -103,22 +77,19 @@ class LiveSessionViewSet(viewsets.ModelViewSet):
                 status=status.HTTP_404_NOT_FOUND
             )
 
-        # Get live session
-        try:
-            live_session = LiveSession.objects.get(webinar=webinar)
-        except LiveSession.DoesNotExist:
+        # Attendance is recorded against the run that is live right now
+        live_session = get_active_run(webinar)
+        if not live_session:
+            if LiveSession.objects.filter(webinar=webinar).exists():
+                return Response(
+                    {'error': 'Live session is not active'},
+                    status=status.HTTP_403_FORBIDDEN
+                )
             return Response(
                 {'error': 'Live session not found for this webinar'},
                 status=status.HTTP_404_NOT_FOUND
             )
 
-        # Check if session is active
-        if not live_session.is_active:
-            return Response(
-                {'error': 'Live session is not active'},
-                status=status.HTTP_403_FORBIDDEN
-            )
-
         # Check if user is registered for this webinar
         is_registered = Registration.objects.filter(
             user=request.user,
@@ -141,6 +112,7 @@ class LiveSessionViewSet(viewsets.ModelViewSet):
             {
                 'room_name': live_session.room_name,
                 'is_active': live_session.is_active,
+                'run_number': live_session.run_number,
                 'participant_count': participant_count,
             },
             status=status.HTTP_200_OK
@@ -167,27 +139,13 @@ class LiveSessionViewSet(viewsets.ModelViewSet):
                 status=status.HTTP_403_FORBIDDEN
             )
 
-        live_session = LiveSession.objects.filter(
-            webinar=webinar,
-            is_active=True
-        ).first()
-
+        live_session = end_live_session(webinar)
         if not live_session:
             return Response(
                 {'error': 'No active live session found for this webinar'},
                 status=status.HTTP_404_NOT_FOUND
             )
 
-        live_session.is_active = False
-        live_session.end_time = timezone.now()
-        live_session.save()
-        
-        # Notify all participants that the live session has ended
-        participant_users = User.objects.filter(
-            livesessionparticipant__session=live_session
-        ).distinct()
-        notify_live_session_ended(webinar, participant_users)
-
         return Response(
             {
                 'message': 'Live session ended successfully',
@@ -196,102 +154,224 @@ class LiveSessionViewSet(viewsets.ModelViewSet):
             status=status.HTTP_200_OK
         )
 
-    @action(detail=False, methods=['get'], url_path='status/(?P<webinar_id>[0-9]+)')
+    @action(
+        detail=False,
+        methods=['get'],
+        url_path='status/(?P<webinar_id>[0-9]+)',
+        permission_classes=[AllowAny],
+    )
     def status(self, request, webinar_id=None):
         """
         Check if a live session is active for a webinar.
         Public endpoint - no authentication required.
+
+        Served from the shared status cache. Pass ``wait=<seconds>`` to long-poll:
+        the request blocks until ``is_active`` differs from ``since`` (the
+        client's last known value, defaulting to the current one) or the wait
+        runs out, whichever comes first. Once LIVE_STATUS_MAX_WAITERS requests
+        are waiting in this process, further ones get the current state at once
+        along with ``retry_after`` (and a Retry-After header) saying when to poll again.
         """
+        wait_param = request.query_params.get('wait')
         try:
-            webinar = Event.objects.get(id=webinar_id)
-        except Event.DoesNotExist:
+            wait = float(wait_param) if wait_param else 0
+            if not math.isfinite(wait):
+                raise ValueError(wait_param)
+        except ValueError:
             return Response(
-                {'error': 'Webinar not found'},
-                status=status.HTTP_404_NOT_FOUND
+                {'error': 'wait must be a number of seconds'},
+                status=status.HTTP_400_BAD_REQUEST
             )
+        wait = min(max(wait, 0), settings.LIVE_STATUS_LONG_POLL_MAX_SECONDS)
 
-        try:
-            live_session = LiveSession.objects.get(webinar=webinar)
-            serializer = LiveSessionStatusSerializer(live_session)
-            return Response(serializer.data, status=status.HTTP_200_OK)
-        except LiveSession.DoesNotExist:
+        since_param = request.query_params.get('since')
+        since_active = None
+        if since_param is not None:
+            since_active = since_param.lower() in ['true', '1', 'yes']
+
+        payload = wait_for_live_status(webinar_id, since_active, wait)
+        if not payload['found']:
             return Response(
-                {'is_active': False, 'room_name': None},
-                status=status.HTTP_200_OK
+                {'error': 'Webinar not found'},
+                status=status.HTTP_404_NOT_FOUND
             )
 
+        data = {'is_active': payload['is_active'], 'room_name': payload['room_name']}
+        headers = None
+        if 'retry_after' in payload:
+            data['retry_after'] = payload['retry_after']
+            headers = {'Retry-After': str(payload['retry_after'])}
+        return Response(data, status=status.HTTP_200_OK, headers=headers)
+
     @action(detail=False, methods=['get'], url_path='analytics', permission_classes=[IsAdmin])
     def analytics(self, request):
         """
         Get analytics for all live sessions.
         Only accessible to admin/organizer users.
-        Returns comprehensive statistics about live sessions.
+
+        Reads the precomputed rollups maintained as sessions start, end and
+        gain participants, so the cost grows with the number of webinars only.
+        Pass ``from``/``to`` (YYYY-MM-DD) to include daily buckets for a range.
+        Pass ``webinar=<id>`` to list the runs of one webinar, or ``run=<id>``
+        for the attendance of a single run.
         """
-        # Total webinars that have had live sessions
-        total_webinars = LiveSession.objects.values('webinar').distinct().count()
-        
-        # Total live sessions
-        total_live_sessions = LiveSession.objects.count()
-        
-        # Total unique participants across all sessions
-        total_participants = LiveSessionParticipant.objects.values('user').distinct().count()
-        
-        # Active and completed sessions
-        active_sessions = LiveSession.objects.filter(is_active=True).count()
-        completed_sessions = LiveSession.objects.filter(
-            is_active=False,
-            end_time__isnull=False
-        ).count()
-        
-        # Average session duration (in minutes)
-        # Only calculate for sessions that have ended
-        sessions_with_duration = LiveSession.objects.filter(
-            end_time__isnull=False
-        ).annotate(
-            duration=ExpressionWrapper(
-                F('end_time') - F('start_time'),
-                output_field=DurationField()
+        for param, handler in (('run', self._run_analytics), ('webinar', self._webinar_runs)):
+            value = request.query_params.get(param)
+            if value is None:
+                continue
+            if not value.isdigit():
+                return Response(
+                    {'error': f'{param} must be an integer id'},
+                    status=status.HTTP_400_BAD_REQUEST
+                )
+            return handler(int(value))
+
+        date_from = request.query_params.get('from')
+        date_to = request.query_params.get('to')
+        try:
+            day_from = parse_date(date_from) if date_from else None
+            day_to = parse_date(date_to) if date_to else None
+            if (date_from and not day_from) or (date_to and not day_to):
+                raise ValueError(date_from or date_to)
+        except ValueError:
+            return Response(
+                {'error': 'from and to must be dates in YYYY-MM-DD format'},
+                status=status.HTTP_400_BAD_REQUEST
             )
-        )
-        
-        avg_duration = sessions_with_duration.aggregate(
-            avg_duration=Avg('duration')
-        )['avg_duration']
-        
-        # Convert average duration to minutes
+
+        totals = LiveAnalyticsTotals.objects.filter(pk=1).first() or LiveAnalyticsTotals()
+
+        # Average session duration (in minutes) over completed sessions
         average_session_duration_minutes = None
-        if avg_duration:
-            average_session_duration_minutes = round(avg_duration.total_seconds() / 60, 2)
-        
-        # Sessions per webinar with participant counts
-        # Use efficient query with select_related and annotate
-        sessions_per_webinar = LiveSession.objects.select_related('webinar').annotate(
-            participant_count=Count('participants', distinct=True)
-        ).values(
-            'webinar__id',
+        if totals.completed_sessions:
+            average_session_duration_minutes = round(
+                totals.total_duration_seconds / totals.completed_sessions / 60, 2
+            )
+
+        sessions_per_webinar = WebinarLiveStats.objects.filter(
+            total_sessions__gt=0
+        ).order_by('-participant_count').values(
+            'webinar_id',
             'webinar__title',
-            'participant_count'
-        ).order_by('-participant_count')
-        
-        # Format sessions_per_webinar data
+            'participant_count',
+            'total_sessions',
+            'completed_sessions',
+        )
+
         sessions_per_webinar_list = [
             {
-                'webinar_id': session['webinar__id'],
-                'title': session['webinar__title'],
-                'participant_count': session['participant_count']
+                'webinar_id': stats['webinar_id'],
+                'title': stats['webinar__title'],
+                'participant_count': stats['participant_count'],
+                'session_count': stats['total_sessions'],
+                'completed_sessions': stats['completed_sessions'],
             }
-            for session in sessions_per_webinar
+            for stats in sessions_per_webinar
         ]
-        
+
+        data = {
+            'total_webinars': totals.total_webinars,
+            'total_live_sessions': totals.total_sessions,
+            'total_participants': totals.total_participants,
+            'average_session_duration_minutes': average_session_duration_minutes,
+            'sessions_per_webinar': sessions_per_webinar_list,
+            'active_sessions': totals.active_sessions,
+            'completed_sessions': totals.completed_sessions,
+        }
+
+        if day_from or day_to:
+            buckets = DailyLiveStats.objects.all()
+            if day_from:
+                buckets = buckets.filter(day__gte=day_from)
+            if day_to:
+                buckets = buckets.filter(day__lte=day_to)
+            data['daily'] = list(buckets.values(
+                'day',
+                'sessions_started',
+                'sessions_completed',
+                'participants_joined',
+                'total_duration_seconds',
+            ))
+
+        return Response(data, status=status.HTTP_200_OK)
+
+    @staticmethod
+    def _duration_minutes(started, ended):
+        if not started or not ended:
+            return None
+        return round(max((ended - started).total_seconds(), 0) / 60, 2)
+
+    def _run_payload(self, run):
+        return {
+            'run_id': run['id'],
+            'run_number': run['run_number'],
+            'room_name': run['room_name'],
+            'is_active': run['is_active'],
+            'started_at': run['started_at'] or run['start_time'],
+            'end_time': run['end_time'],
+            'duration_minutes': self._duration_minutes(
+                run['started_at'] or run['start_time'], run['end_time']
+            ),
+            'participant_count': run['participant_count'],
+        }
+
+    def _run_queryset(self):
+        return LiveSession.objects.annotate(
+            participant_count=Count('participants')
+        ).values(
+            'id',
+            'webinar_id',
+            'webinar__title',
+            'run_number',
+            'room_name',
+            'is_active',
+            'started_at',
+            'start_time',
+            'end_time',
+            'participant_count',
+        )
+
+    def _webinar_runs(self, webinar_id):
+        """Every run of one webinar with its participant count"""
+        if not Event.objects.filter(id=webinar_id).exists():
+            return Response(
+                {'error': 'Webinar not found'},
+                status=status.HTTP_404_NOT_FOUND
+            )
+
+        runs = self._run_queryset().filter(webinar_id=webinar_id).order_by('run_number')
         return Response(
             {
-                'total_webinars': total_webinars,
-                'total_live_sessions': total_live_sessions,
-                'total_participants': total_participants,
-                'average_session_duration_minutes': average_session_duration_minutes,
-                'sessions_per_webinar': sessions_per_webinar_list,
-                'active_sessions': active_sessions,
-                'completed_sessions': completed_sessions,
+                'webinar_id': webinar_id,
+                'runs': [self._run_payload(run) for run in runs],
             },
             status=status.HTTP_200_OK
         )
+
+    def _run_analytics(self, run_id):
+        """Attendance of a single run"""
+        run = self._run_queryset().filter(id=run_id).first()
+        if run is None:
+            return Response(
+                {'error': 'Live session run not found'},
+                status=status.HTTP_404_NOT_FOUND
+            )
+
+        participants = LiveSessionParticipant.objects.filter(
+            session_id=run_id
+        ).order_by('joined_at').values('user_id', 'user__username', 'joined_at')
+
+        data = self._run_payload(run)
+        data.update({
+            'webinar_id': run['webinar_id'],
+            'title': run['webinar__title'],
+            'participants': [
+                {
+                    'user_id': participant['user_id'],
+                    'username': participant['user__username'],
+                    'joined_at': participant['joined_at'],
+                }
+                for participant in participants
+            ],
+        })
+        return Response(data, status=status.HTTP_200_OK)
@@ -1,5 +1,5 @@
 from django.contrib import admin
-from .models import Recording
+from .models import Recording, RecordingUpload
 
 
 @admin.register(Recording)
@@ -7,7 +7,7 @@ class RecordingAdmin(admin.ModelAdmin):
     list_display = ['display_title', 'event', 'uploaded_by', 'duration_minutes', 'is_public', 'uploaded_at']
     list_filter = ['is_public', 'uploaded_at', 'event']
     search_fields = ['title', 'description', 'event__title', 'uploaded_by__username']
-    readonly_fields = ['uploaded_at']
+    readonly_fields = ['uploaded_at', 'file', 'file_size', 'content_type']
     date_hierarchy = 'uploaded_at'
     
     fieldsets = (
@@ -15,7 +15,7 @@ class RecordingAdmin(admin.ModelAdmin):
             'fields': ('event', 'title', 'description')
         }),
         ('Media', {
-            'fields': ('recording_link', 'duration_minutes')
+            'fields': ('recording_link', 'file', 'file_size', 'content_type', 'duration_minutes')
         }),
         ('Access Control', {
             'fields': ('is_public',)
@@ -25,3 +25,9 @@ class RecordingAdmin(admin.ModelAdmin):
             'classes': ('collapse',)
         }),
     )
+
+
+@admin.register(RecordingUpload)
+class RecordingUploadAdmin(admin.ModelAdmin):
+    list_display = ['filename', 'recording', 'received', 'size', 'uploaded_by', 'updated_at']
+    readonly_fields = ['id', 'recording', 'filename', 'content_type', 'size', 'received', 'uploaded_by', 'created_at', 'updated_at']
@@ -5,3 +5,7 @@ class RecordingsConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'recordings'
     verbose_name = 'Webinar Recordings'
+
+    def ready(self):
+        """Import signals when the app is ready"""
+        import recordings.signals
@@ -0,0 +1,20 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from recordings.uploads import prune_stale_uploads
+
+
+class Command(BaseCommand):
+    help = "Delete recording uploads that stopped receiving chunks, with their partial files."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--max-age-hours',
+            type=int,
+            default=settings.RECORDING_UPLOAD_STALE_HOURS,
+            help='Hours since the last chunk after which an upload is abandoned',
+        )
+
+    def handle(self, *args, **options):
+        deleted = prune_stale_uploads(options['max_age_hours'])
+        self.stdout.write(self.style.SUCCESS(f"Deleted {deleted} abandoned recording uploads"))
@@ -0,0 +1,57 @@
+# Generated by Django 6.0 on 2026-10-19 01:40
+
+import django.db.models.deletion
+import recordings.storage
+import uuid
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recordings', '0001_initial'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='recording',
+            name='content_type',
+            field=models.CharField(blank=True, max_length=100),
+        ),
+        migrations.AddField(
+            model_name='recording',
+            name='file',
+            field=models.FileField(blank=True, help_text='Self-hosted recording file, uploaded in chunks', storage=recordings.storage.get_recording_storage, upload_to='recordings/'),
+        ),
+        migrations.AddField(
+            model_name='recording',
+            name='file_size',
+            field=models.PositiveBigIntegerField(blank=True, help_text='Size of the file in bytes', null=True),
+        ),
+        migrations.AlterField(
+            model_name='recording',
+            name='recording_link',
+            field=models.URLField(blank=True, help_text='Link to the recording (YouTube, Vimeo, etc.). Leave empty when uploading a file.'),
+        ),
+        migrations.CreateModel(
+            name='RecordingUpload',
+            fields=[
+                ('id', models.UUIDField(default=uuid.uuid4, editable=False, primary_key=True, serialize=False)),
+                ('filename', models.CharField(max_length=255)),
+                ('content_type', models.CharField(blank=True, max_length=100)),
+                ('size', models.PositiveBigIntegerField(help_text='Total size of the file in bytes')),
+                ('received', models.PositiveBigIntegerField(default=0, help_text='Bytes stored so far; the next chunk starts here')),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('recording', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='upload', to='recordings.recording')),
+                ('uploaded_by', models.ForeignKey(null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='recording_uploads', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'verbose_name': 'Recording Upload',
+                'verbose_name_plural': 'Recording Uploads',
+                'ordering': ['-created_at'],
+            },
+        ),
+    ]
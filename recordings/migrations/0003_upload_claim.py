@@ -0,0 +1,18 @@
+# Generated by Django 6.0 on 2026-10-19 02:27
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recordings', '0002_recording_files'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='recordingupload',
+            name='claimed_at',
+            field=models.DateTimeField(blank=True, help_text='When the chunk being written now was claimed; empty between chunks', null=True),
+        ),
+    ]
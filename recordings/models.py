@@ -1,6 +1,10 @@
+import uuid
+
 from django.conf import settings
 from django.db import models
 
+from .storage import get_recording_storage
+
 
 class Recording(models.Model):
     """Recorded webinar sessions"""
@@ -9,7 +13,18 @@ class Recording(models.Model):
         on_delete=models.CASCADE,
         related_name="recordings",
     )
-    recording_link = models.URLField(help_text="Link to the recording (YouTube, Vimeo, etc.)")
+    recording_link = models.URLField(
+        blank=True,
+        help_text="Link to the recording (YouTube, Vimeo, etc.). Leave empty when uploading a file."
+    )
+    file = models.FileField(
+        upload_to='recordings/',
+        storage=get_recording_storage,
+        blank=True,
+        help_text="Self-hosted recording file, uploaded in chunks"
+    )
+    file_size = models.PositiveBigIntegerField(null=True, blank=True, help_text="Size of the file in bytes")
+    content_type = models.CharField(max_length=100, blank=True)
     title = models.CharField(max_length=200, blank=True, help_text="Optional custom title")
     description = models.TextField(blank=True)
     duration_minutes = models.IntegerField(null=True, blank=True, help_text="Recording duration in minutes")
@@ -41,3 +56,44 @@ class Recording(models.Model):
     def display_title(self):
         """Get the display title (custom or event title)"""
         return self.title if self.title else f"Recording: {self.event.title}"
+
+
+class RecordingUpload(models.Model):
+    """A resumable chunked upload of a recording's file, in progress"""
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    recording = models.OneToOneField(
+        Recording,
+        on_delete=models.CASCADE,
+        related_name="upload",
+    )
+    filename = models.CharField(max_length=255)
+    content_type = models.CharField(max_length=100, blank=True)
+    size = models.PositiveBigIntegerField(help_text="Total size of the file in bytes")
+    received = models.PositiveBigIntegerField(default=0, help_text="Bytes stored so far; the next chunk starts here")
+    claimed_at = models.DateTimeField(
+        null=True,
+        blank=True,
+        help_text="When the chunk being written now was claimed; empty between chunks"
+    )
+    uploaded_by = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.SET_NULL,
+        null=True,
+        related_name="recording_uploads",
+    )
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        app_label = 'recordings'
+        verbose_name = 'Recording Upload'
+        verbose_name_plural = 'Recording Uploads'
+        ordering = ['-created_at']
+
+    def __str__(self) -> str:
+        return f"{self.filename} ({self.received}/{self.size} bytes)"
+
+    @property
+    def partial_name(self) -> str:
+        """Storage name of the file the chunks are appended to"""
+        return f'partial/{self.id}.part'
@@ -0,0 +1,77 @@
+"""
+Signed, expiring playback URLs for self-hosted recordings.
+
+Access is decided once, when a URL is minted for a user: admins and public
+recordings always, otherwise only users registered for the webinar. The URL
+carries everything needed to serve the file (recording id, file name, size
+and type) signed with a timestamped HMAC under SECRET_KEY, so the play view
+answers every request of a playback burst, including a player's many Range
+requests, without a database query.
+
+The URLs are bearer links: whoever holds one can play the file until it
+expires, whether or not they are signed in, since media players don't send
+the API's credentials. A URL stays valid for RECORDING_PLAYBACK_URL_TTL_SECONDS
+even if the user unregisters in the meantime; keep the lifetime short. A replaced file is
+stored under a new name, so URLs minted for the old one stop working instead
+of serving the new file with the old size.
+"""
+from datetime import timedelta
+
+from django.conf import settings
+from django.core import signing
+from django.http import Http404
+from django.urls import reverse
+from django.utils import timezone
+from django.views.decorators.http import require_safe
+
+from registrations.models import Registration
+from .models import Recording
+from .uploads import stream_file
+
+TOKEN_SALT = 'recordings.playback'
+
+
+def can_play(user, recording: Recording) -> bool:
+    """Whether a user may be given a playback URL for a recording"""
+    if recording.is_public or user.profile.is_admin:
+        return True
+    return Registration.objects.filter(user=user, event_id=recording.event_id).exists()
+
+
+def make_playback_url(request, recording: Recording) -> tuple:
+    """
+    Mint a signed playback URL; anyone holding it can play until it expires.
+
+    Returns:
+        Tuple of (absolute URL, expiry datetime)
+    """
+    token = signing.dumps(
+        {
+            'r': recording.pk,
+            'f': recording.file.name,
+            's': recording.file_size,
+            't': recording.content_type,
+        },
+        salt=TOKEN_SALT,
+        compress=True,
+    )
+    url = request.build_absolute_uri(reverse('recording-play', args=[token]))
+    expires_at = timezone.now() + timedelta(seconds=settings.RECORDING_PLAYBACK_URL_TTL_SECONDS)
+    return url, expires_at
+
+
+@require_safe
+def play_recording(request, token):
+    """Serve a recording file from a signed playback URL, without queries"""
+    try:
+        claims = signing.loads(token, salt=TOKEN_SALT, max_age=settings.RECORDING_PLAYBACK_URL_TTL_SECONDS)
+    except signing.BadSignature:
+        # Covers expired URLs too
+        raise Http404('Invalid or expired playback link.')
+    try:
+        response = stream_file(claims['f'], claims['s'], claims['t'], request.headers.get('Range'))
+    except FileNotFoundError:
+        raise Http404('This recording file is no longer available.')
+    # The URL alone grants access; shared caches must not keep it
+    response['Cache-Control'] = 'private'
+    return response
@@ -1,5 +1,6 @@
+from django.conf import settings
 from rest_framework import serializers
-from .models import Recording
+from .models import Recording, RecordingUpload
 from webinars.serializers import EventSerializer
 
 
@@ -8,15 +9,19 @@ class RecordingSerializer(serializers.ModelSerializer):
     event_details = EventSerializer(source='event', read_only=True)
     uploaded_by_username = serializers.CharField(source='uploaded_by.username', read_only=True)
     display_title = serializers.CharField(read_only=True)
+    has_file = serializers.SerializerMethodField()
     
     class Meta:
         model = Recording
         fields = [
-            'id', 'event', 'event_details', 'recording_link',
+            'id', 'event', 'event_details', 'recording_link', 'has_file', 'file_size', 'content_type',
             'title', 'display_title', 'description', 'duration_minutes',
             'uploaded_by', 'uploaded_by_username', 'uploaded_at', 'is_public'
         ]
-        read_only_fields = ['uploaded_by', 'uploaded_at']
+        read_only_fields = ['uploaded_by', 'uploaded_at', 'file_size', 'content_type']
+    
+    def get_has_file(self, obj):
+        return bool(obj.file)
 
 
 class RecordingCreateSerializer(serializers.ModelSerializer):
@@ -31,3 +36,17 @@ class RecordingCreateSerializer(serializers.ModelSerializer):
         if not value:
             raise serializers.ValidationError("Event is required.")
         return value
+
+
+class RecordingUploadSerializer(serializers.ModelSerializer):
+    """Serializer for starting and inspecting a chunked upload"""
+    size = serializers.IntegerField(min_value=1, max_value=settings.RECORDING_UPLOAD_MAX_BYTES)
+    max_chunk_size = serializers.SerializerMethodField()
+    
+    class Meta:
+        model = RecordingUpload
+        fields = ['id', 'recording', 'filename', 'content_type', 'size', 'received', 'max_chunk_size', 'created_at']
+        read_only_fields = ['id', 'recording', 'received', 'created_at']
+    
+    def get_max_chunk_size(self, obj):
+        return settings.RECORDING_UPLOAD_MAX_CHUNK_BYTES
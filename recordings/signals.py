@@ -0,0 +1,28 @@
+"""
+Signals for the recordings app.
+Remove stored and partial files once the rows pointing at them are deleted.
+"""
+from django.db import transaction
+from django.db.models.signals import post_delete
+from django.dispatch import receiver
+
+from .models import Recording, RecordingUpload
+from .storage import recording_storage
+
+
+def _delete_file_on_commit(name: str) -> None:
+    # Only once the delete is committed; a rollback keeps the row and its file
+    if name:
+        transaction.on_commit(lambda: recording_storage.delete(name))
+
+
+@receiver(post_delete, sender=Recording)
+def delete_recording_file(sender, instance, **kwargs):
+    """Remove a deleted recording's file, including through an event's cascade."""
+    _delete_file_on_commit(instance.file.name)
+
+
+@receiver(post_delete, sender=RecordingUpload)
+def delete_partial_file(sender, instance, **kwargs):
+    """Remove the partial file of an upload that was discarded, pruned or cascaded."""
+    _delete_file_on_commit(instance.partial_name)
@@ -0,0 +1,35 @@
+"""
+Local storage for self-hosted recording files.
+
+Files live under RECORDING_STORAGE_ROOT, outside MEDIA_ROOT, so they are
+never served as plain media: every download goes through the recording's
+stream endpoint and its access checks. The location is read from settings on
+each use rather than fixed at import.
+"""
+import os
+
+from django.conf import settings
+from django.core.files.storage import FileSystemStorage
+
+
+class RecordingFileStorage(FileSystemStorage):
+    """FileSystemStorage rooted at RECORDING_STORAGE_ROOT, with no public URL"""
+
+    @property
+    def base_location(self):
+        return str(settings.RECORDING_STORAGE_ROOT)
+
+    @property
+    def location(self):
+        return os.path.abspath(self.base_location)
+
+    @property
+    def base_url(self):
+        return None
+
+
+recording_storage = RecordingFileStorage()
+
+
+def get_recording_storage():
+    return recording_storage
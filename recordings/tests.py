@@ -1,3 +1,328 @@
-from django.test import TestCase
+import os
+import shutil
+import tempfile
+from datetime import timedelta
+from io import StringIO
+from unittest import mock
 
-# Create your tests here.
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.files.base import ContentFile
+from django.core.management import call_command
+from django.test import override_settings
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.test import APITestCase
+
+from registrations.models import Registration
+from webinars.models import Event
+from .models import Recording, RecordingUpload
+from .storage import recording_storage
+
+
+User = get_user_model()
+
+
+@override_settings(
+    PASSWORD_HASHERS=['django.contrib.auth.hashers.MD5PasswordHasher'],
+    RECORDING_UPLOAD_MAX_CHUNK_BYTES=1024,
+)
+class RecordingFileTests(APITestCase):
+    """Tests for chunked recording uploads and ranged streaming"""
+
+    def setUp(self):
+        self.storage_root = tempfile.mkdtemp()
+        storage_override = override_settings(RECORDING_STORAGE_ROOT=self.storage_root)
+        storage_override.enable()
+        self.addCleanup(storage_override.disable)
+        self.addCleanup(shutil.rmtree, self.storage_root, ignore_errors=True)
+
+        self.admin = User.objects.create_user(
+            username='admin1',
+            email='admin1@test.com',
+            password='testpass123',
+            is_staff=True
+        )
+        self.student = User.objects.create_user(
+            username='student1',
+            email='student1@test.com',
+            password='testpass123'
+        )
+        event = Event.objects.create(
+            title='Recorded Webinar',
+            date=timezone.now().date(),
+            time=timezone.now().time(),
+            organizer=self.admin
+        )
+        self.recording = Recording.objects.create(event=event, title='Session 1', uploaded_by=self.admin)
+        self.content = bytes(range(256)) * 10
+        self.url = f'/api/recordings/{self.recording.id}/upload/'
+
+    def start(self):
+        self.client.force_authenticate(user=self.admin)
+        return self.client.post(
+            self.url,
+            {'filename': 'session 1.mp4', 'size': len(self.content)},
+            format='json'
+        )
+
+    def send(self, start, end):
+        return self.client.put(
+            self.url,
+            self.content[start:end],
+            content_type='application/octet-stream',
+            HTTP_CONTENT_RANGE=f'bytes {start}-{end - 1}/{len(self.content)}'
+        )
+
+    def upload_all(self):
+        self.start()
+        for start in range(0, len(self.content), 1000):
+            response = self.send(start, min(start + 1000, len(self.content)))
+        return response
+
+    def test_chunked_upload_resumes_and_finishes(self):
+        """Test chunks append in order, resume from the offset and attach the file"""
+        response = self.start()
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(response.data['content_type'], 'video/mp4')
+
+        self.assertEqual(self.send(0, 1000).data['received'], 1000)
+
+        # A client that lost track starts again and is told where to resume
+        response = self.start()
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['received'], 1000)
+
+        # A repeated chunk is refused instead of being appended twice
+        response = self.send(0, 1000)
+        self.assertEqual(response.status_code, status.HTTP_409_CONFLICT)
+        self.assertEqual(response.data['received'], 1000)
+
+        self.send(1000, 2000)
+        response = self.send(2000, len(self.content))
+
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertTrue(response.data['has_file'])
+        self.assertFalse(RecordingUpload.objects.exists())
+        self.recording.refresh_from_db()
+        self.assertEqual(self.recording.file_size, len(self.content))
+        with recording_storage.open(self.recording.file.name) as stored:
+            self.assertEqual(stored.read(), self.content)
+
+    def test_replaced_file_gets_new_name(self):
+        """Test a re-upload never reuses the name of the file it replaces"""
+        self.upload_all()
+        self.recording.refresh_from_db()
+        first = self.recording.file.name
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.upload_all()
+
+        self.recording.refresh_from_db()
+        self.assertNotEqual(self.recording.file.name, first)
+        self.assertEqual(os.path.basename(self.recording.file.name), 'session_1.mp4')
+        self.assertFalse(recording_storage.exists(first))
+
+    def test_chunk_waits_for_claimed_offset(self):
+        """Test a chunk can't write while another holds the offset, until that claim lapses"""
+        self.start()
+        RecordingUpload.objects.update(claimed_at=timezone.now())
+
+        response = self.send(0, 1000)
+        self.assertEqual(response.status_code, status.HTTP_409_CONFLICT)
+        self.assertEqual(response.data['received'], 0)
+
+        lapsed = timezone.now() - timedelta(seconds=settings.RECORDING_UPLOAD_CLAIM_SECONDS + 1)
+        RecordingUpload.objects.update(claimed_at=lapsed)
+        response = self.send(0, 1000)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        upload = RecordingUpload.objects.get()
+        self.assertEqual(upload.received, 1000)
+        self.assertIsNone(upload.claimed_at)
+
+    def test_concurrent_start_resumes_winner(self):
+        """Test a start that loses the race to create the upload resumes the winner's"""
+        self.start()
+        winner = RecordingUpload.objects.get()
+        lost_race = mock.Mock(first=mock.Mock(return_value=None))
+
+        with mock.patch.object(RecordingUpload.objects, 'filter', return_value=lost_race):
+            response = self.start()
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['id'], str(winner.id))
+        self.assertEqual(recording_storage.listdir('partial')[1], [f'{winner.id}.part'])
+
+    def test_rejects_bad_chunks(self):
+        """Test oversized chunks, wrong totals and missing headers are refused"""
+        self.start()
+
+        response = self.send(0, 2000)
+        self.assertEqual(response.status_code, status.HTTP_413_REQUEST_ENTITY_TOO_LARGE)
+
+        response = self.client.put(
+            self.url, self.content[:10], content_type='application/octet-stream',
+            HTTP_CONTENT_RANGE='bytes 0-9/99'
+        )
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+        response = self.client.put(self.url, self.content[:10], content_type='application/octet-stream')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(RecordingUpload.objects.get().received, 0)
+
+    def test_upload_requires_admin(self):
+        """Test students can't upload recording files"""
+        self.client.force_authenticate(user=self.student)
+
+        response = self.client.post(self.url, {'filename': 'x.mp4', 'size': 10}, format='json')
+
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+
+    def test_stream_serves_ranges(self):
+        """Test full downloads, single ranges, suffix ranges and bad ranges"""
+        self.upload_all()
+        self.client.force_authenticate(user=None)
+        url = f'/api/recordings/{self.recording.id}/stream/'
+
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response['Accept-Ranges'], 'bytes')
+        self.assertEqual(b''.join(response.streaming_content), self.content)
+
+        response = self.client.get(url, HTTP_RANGE='bytes=100-199')
+        self.assertEqual(response.status_code, status.HTTP_206_PARTIAL_CONTENT)
+        self.assertEqual(response['Content-Range'], f'bytes 100-199/{len(self.content)}')
+        self.assertEqual(response['Content-Length'], '100')
+        self.assertEqual(b''.join(response.streaming_content), self.content[100:200])
+
+        response = self.client.get(url, HTTP_RANGE='bytes=-50')
+        self.assertEqual(b''.join(response.streaming_content), self.content[-50:])
+
+        response = self.client.get(url, HTTP_RANGE=f'bytes={len(self.content)}-')
+        self.assertEqual(response.status_code, status.HTTP_416_REQUESTED_RANGE_NOT_SATISFIABLE)
+        self.assertEqual(response['Content-Range'], f'bytes */{len(self.content)}')
+
+    def test_deleting_removes_files(self):
+        """Test deleting a recording or its event removes stored and partial files"""
+        self.upload_all()
+        self.recording.refresh_from_db()
+        stored = self.recording.file.name
+        self.start()
+        partial = RecordingUpload.objects.get().partial_name
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.recording.event.delete()
+
+        self.assertFalse(recording_storage.exists(stored))
+        self.assertFalse(recording_storage.exists(partial))
+
+    def test_prune_stale_uploads(self):
+        """Test idle uploads and orphaned partial files are pruned, active ones kept"""
+        self.start()
+        upload = RecordingUpload.objects.get()
+        RecordingUpload.objects.filter(pk=upload.pk).update(updated_at=timezone.now() - timedelta(hours=49))
+        orphan = recording_storage.save('partial/orphan.part', ContentFile(b'x'))
+        old = (timezone.now() - timedelta(hours=49)).timestamp()
+        os.utime(recording_storage.path(orphan), (old, old))
+        other = Recording.objects.create(event=self.recording.event, title='Session 2', uploaded_by=self.admin)
+        self.client.post(
+            f'/api/recordings/{other.id}/upload/', {'filename': 'b.mp4', 'size': 10}, format='json'
+        )
+        out = StringIO()
+
+        with self.captureOnCommitCallbacks(execute=True):
+            call_command('prune_recording_uploads', stdout=out)
+
+        self.assertIn('Deleted 1 abandoned recording uploads', out.getvalue())
+        self.assertFalse(recording_storage.exists(upload.partial_name))
+        self.assertFalse(recording_storage.exists(orphan))
+        self.assertTrue(recording_storage.exists(RecordingUpload.objects.get().partial_name))
+
+    def test_stream_without_file(self):
+        """Test link-only recordings have nothing to stream"""
+        response = self.client.get(f'/api/recordings/{self.recording.id}/stream/')
+
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+
+@override_settings(PASSWORD_HASHERS=['django.contrib.auth.hashers.MD5PasswordHasher'])
+class PlaybackUrlTests(APITestCase):
+    """Tests for signed, expiring playback URLs"""
+
+    def setUp(self):
+        self.storage_root = tempfile.mkdtemp()
+        storage_override = override_settings(RECORDING_STORAGE_ROOT=self.storage_root)
+        storage_override.enable()
+        self.addCleanup(storage_override.disable)
+        self.addCleanup(shutil.rmtree, self.storage_root, ignore_errors=True)
+
+        self.admin = User.objects.create_user(
+            username='admin1',
+            email='admin1@test.com',
+            password='testpass123',
+            is_staff=True
+        )
+        self.student = User.objects.create_user(
+            username='student1',
+            email='student1@test.com',
+            password='testpass123'
+        )
+        self.event = Event.objects.create(
+            title='Private Webinar',
+            date=timezone.now().date(),
+            time=timezone.now().time(),
+            organizer=self.admin
+        )
+        self.content = b'recording-bytes' * 100
+        name = recording_storage.save('recordings/private.mp4', ContentFile(self.content))
+        self.recording = Recording.objects.create(
+            event=self.event,
+            file=name,
+            file_size=len(self.content),
+            content_type='video/mp4',
+            is_public=False,
+            uploaded_by=self.admin
+        )
+
+    def playback_url(self, user):
+        self.client.force_authenticate(user=user)
+        return self.client.get(f'/api/recordings/{self.recording.id}/playback_url/')
+
+    def test_registered_user_plays_without_queries(self):
+        """Test a minted URL serves ranges with no database access"""
+        Registration.objects.create(user=self.student, event=self.event)
+        response = self.playback_url(self.student)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.client.force_authenticate(user=None)
+
+        with self.assertNumQueries(0):
+            played = self.client.get(response.data['url'], HTTP_RANGE='bytes=0-99')
+
+        self.assertEqual(played.status_code, status.HTTP_206_PARTIAL_CONTENT)
+        self.assertEqual(b''.join(played.streaming_content), self.content[:100])
+
+    def test_unregistered_user_gets_no_url(self):
+        """Test private recordings need a registration"""
+        response = self.playback_url(self.student)
+
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+
+    def test_private_file_not_streamed_directly(self):
+        """Test the plain stream endpoint refuses private files to non-admins"""
+        Registration.objects.create(user=self.student, event=self.event)
+        self.client.force_authenticate(user=self.student)
+
+        response = self.client.get(f'/api/recordings/{self.recording.id}/stream/')
+
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+
+    def test_expired_and_tampered_urls_are_refused(self):
+        """Test URLs stop working after the TTL and can't be edited"""
+        url = self.playback_url(self.admin).data['url']
+        self.client.force_authenticate(user=None)
+
+        self.assertEqual(self.client.get(url[:-3] + 'abc/').status_code, status.HTTP_404_NOT_FOUND)
+
+        later = timezone.now() + timedelta(seconds=settings.RECORDING_PLAYBACK_URL_TTL_SECONDS + 1)
+        with mock.patch('django.core.signing.time.time', return_value=later.timestamp()):
+            self.assertEqual(self.client.get(url).status_code, status.HTTP_404_NOT_FOUND)
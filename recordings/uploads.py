@@ -0,0 +1,306 @@
+"""
+Resumable chunked uploads and ranged streaming of recording files.
+
+An upload is started with the file's name and total size, which creates a
+``RecordingUpload`` tracking how many bytes have been stored. Each chunk is
+sent with ``Content-Range: bytes <start>-<end>/<total>`` and must start where
+the last stored byte ended; the chunk is copied from the request stream to the
+partial file in small pieces, so neither chunks nor files are held in memory.
+After a dropped connection the client asks for the upload's offset and
+continues from there. A chunk first claims the offset with a compare-and-set
+update, is then copied with no transaction open, however slow the client,
+and finally moves the offset on if its claim still holds, so two retries of
+the same chunk can't both append it. When the last byte arrives the partial
+file is moved into place and attached to the recording.
+Uploads that stop receiving chunks are removed by ``prune_stale_uploads``
+(the prune_recording_uploads command).
+
+Downloads honour a single ``Range`` and answer 206 with just those bytes. The
+file is opened, positioned at the range start and handed to ``FileResponse``;
+under a server with ``wsgi.file_wrapper`` sendfile support (gunicorn) the
+kernel copies the bytes straight to the socket.
+"""
+import mimetypes
+import os
+import re
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.db.models import Q
+from django.http import FileResponse, HttpResponse
+from django.utils import timezone
+from django.utils.http import content_disposition_header
+from django.utils.text import get_valid_filename
+
+from .models import Recording, RecordingUpload
+from .storage import recording_storage
+
+COPY_BLOCK_BYTES = 1024 * 1024
+
+CONTENT_RANGE_RE = re.compile(r'^bytes (\d+)-(\d+)/(\d+)$')
+RANGE_RE = re.compile(r'^bytes=(\d*)-(\d*)$')
+
+
+class UploadError(ValueError):
+    """Raised when a chunk can't be accepted"""
+
+    def __init__(self, message: str, status_code: int = 400, offset: int = None):
+        super().__init__(message)
+        self.status_code = status_code
+        self.offset = offset
+
+
+def start_upload(recording: Recording, filename: str, size: int, content_type: str, user) -> tuple:
+    """
+    Start an upload for a recording's file, or resume the matching one.
+
+    An unfinished upload of the same file name and size is resumed; any other
+    unfinished upload of the recording is discarded.
+
+    Returns:
+        Tuple of (RecordingUpload, created)
+    """
+    existing = RecordingUpload.objects.filter(recording=recording).first()
+    if existing is not None:
+        if existing.filename == filename and existing.size == size:
+            return existing, False
+        discard_upload(existing)
+
+    upload = RecordingUpload(
+        recording=recording,
+        filename=filename,
+        size=size,
+        content_type=content_type or mimetypes.guess_type(filename)[0] or 'application/octet-stream',
+        uploaded_by=user,
+    )
+    # Chunks are written into an existing file, so create it before the row
+    # can be seen
+    path = recording_storage.path(upload.partial_name)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    open(path, 'wb').close()
+    try:
+        with transaction.atomic():
+            upload.save(force_insert=True)
+    except IntegrityError:
+        # A concurrent start won the recording's one upload slot
+        os.unlink(path)
+        winner = RecordingUpload.objects.get(recording=recording)
+        if winner.filename == filename and winner.size == size:
+            return winner, False
+        raise UploadError('Another upload of this recording was started at the same time.', 409)
+    return upload, True
+
+
+def discard_upload(upload: RecordingUpload) -> None:
+    """Delete an unfinished upload; its partial file goes once that commits"""
+    upload.delete()
+
+
+def prune_stale_uploads(max_age_hours: int = None) -> int:
+    """
+    Delete uploads that received no chunk for ``max_age_hours``.
+
+    Partial files left without an upload row (say, by a crash between
+    creating the row and the file) are removed once they are as old.
+
+    Returns:
+        Number of uploads deleted
+    """
+    if max_age_hours is None:
+        max_age_hours = settings.RECORDING_UPLOAD_STALE_HOURS
+    cutoff = timezone.now() - timedelta(hours=max_age_hours)
+    deleted = 0
+    for upload in RecordingUpload.objects.filter(updated_at__lt=cutoff):
+        discard_upload(upload)
+        deleted += 1
+
+    if recording_storage.exists('partial'):
+        live = {upload.partial_name for upload in RecordingUpload.objects.only('id')}
+        for filename in recording_storage.listdir('partial')[1]:
+            name = f'partial/{filename}'
+            if name not in live and recording_storage.get_modified_time(name) < cutoff:
+                recording_storage.delete(name)
+    return deleted
+
+
+def parse_content_range(header: str) -> tuple:
+    """
+    Parse a chunk's ``Content-Range: bytes <start>-<end>/<total>``.
+
+    Returns:
+        Tuple of (start, length, total)
+    """
+    match = CONTENT_RANGE_RE.match((header or '').strip())
+    if match is None:
+        raise UploadError('Content-Range must be "bytes <start>-<end>/<total>".')
+    start, end, total = (int(value) for value in match.groups())
+    if end < start:
+        raise UploadError('Content-Range end is before its start.')
+    return start, end - start + 1, total
+
+
+def write_chunk(upload_id, stream, start: int, length: int, total: int) -> RecordingUpload:
+    """
+    Append one chunk read from ``stream`` to an upload.
+
+    Finishes the upload when the chunk completes the file.
+
+    Returns:
+        The updated upload; its ``received`` equals ``size`` once finished
+    """
+    if length > settings.RECORDING_UPLOAD_MAX_CHUNK_BYTES:
+        raise UploadError(f'Chunks may be at most {settings.RECORDING_UPLOAD_MAX_CHUNK_BYTES} bytes.', 413)
+
+    upload = RecordingUpload.objects.select_related('recording').get(pk=upload_id)
+    if total != upload.size:
+        raise UploadError(f'Content-Range total must be {upload.size}.')
+    if start != upload.received:
+        raise UploadError('Chunk does not start at the current offset.', 409, offset=upload.received)
+    if start + length > upload.size:
+        raise UploadError('Chunk runs past the end of the file.')
+
+    claimed_at = timezone.now()
+    lapsed = claimed_at - timedelta(seconds=settings.RECORDING_UPLOAD_CLAIM_SECONDS)
+    claimed = RecordingUpload.objects.filter(
+        Q(claimed_at__isnull=True) | Q(claimed_at__lt=lapsed),
+        pk=upload.pk,
+        received=start,
+    ).update(claimed_at=claimed_at)
+    if not claimed:
+        raise UploadError('Another request is writing to this upload.', 409, offset=start)
+    mine = RecordingUpload.objects.filter(pk=upload.pk, received=start, claimed_at=claimed_at)
+
+    try:
+        written = 0
+        with open(recording_storage.path(upload.partial_name), 'r+b') as partial:
+            # Drop anything a request that died mid-chunk left behind
+            partial.truncate(start)
+            partial.seek(start)
+            while written < length:
+                block = stream.read(min(COPY_BLOCK_BYTES, length - written))
+                if not block:
+                    break
+                partial.write(block)
+                written += len(block)
+            if written != length:
+                partial.truncate(start)
+                raise UploadError(f'Expected {length} bytes in the chunk, got {written}.')
+    except BaseException:
+        mine.update(claimed_at=None)
+        raise
+
+    upload.received = start + length
+    upload.claimed_at = None
+    upload.updated_at = timezone.now()
+    with transaction.atomic():
+        # Fails if the claim lapsed and another request took the offset over
+        if not mine.update(received=upload.received, claimed_at=None, updated_at=upload.updated_at):
+            if not RecordingUpload.objects.filter(pk=upload.pk).exists():
+                raise RecordingUpload.DoesNotExist
+            raise UploadError('This chunk took too long and was superseded; resume from the offset.', 409)
+        if upload.received == upload.size:
+            _finish(upload)
+    return upload
+
+
+def _finish(upload: RecordingUpload) -> None:
+    recording = upload.recording
+    # The upload's id keeps names unique, so a name freed by a replaced file is
+    # never handed to a later one that old playback URLs would then serve
+    name = f'recordings/{recording.pk}/{upload.id}/{get_valid_filename(upload.filename)}'
+    os.makedirs(os.path.dirname(recording_storage.path(name)), exist_ok=True)
+    os.replace(recording_storage.path(upload.partial_name), recording_storage.path(name))
+
+    previous = recording.file.name
+    recording.file.name = name
+    recording.file_size = upload.size
+    recording.content_type = upload.content_type
+    recording.save(update_fields=['file', 'file_size', 'content_type'])
+    upload.delete()
+    if previous:
+        transaction.on_commit(lambda: recording_storage.delete(previous))
+
+
+class _RangeFile:
+    """
+    File object limited to ``length`` bytes from ``start``.
+
+    Keeps ``fileno`` so servers can still sendfile from the positioned
+    descriptor, while plain iteration stops at the end of the range.
+    """
+
+    def __init__(self, file, start: int, length: int):
+        file.seek(start)
+        self._file = file
+        self._remaining = length
+
+    def read(self, size: int = -1) -> bytes:
+        if self._remaining <= 0:
+            return b''
+        if size < 0 or size > self._remaining:
+            size = self._remaining
+        data = self._file.read(size)
+        self._remaining -= len(data)
+        return data
+
+    def fileno(self) -> int:
+        return self._file.fileno()
+
+    def close(self) -> None:
+        self._file.close()
+
+
+def parse_range(header: str, size: int):
+    """
+    Parse a single-range ``Range`` header against a file size.
+
+    Returns:
+        Tuple of (start, length), None to serve the whole file (no header, or
+        a form this doesn't handle such as multiple ranges), or False if the
+        range can't be satisfied
+    """
+    match = RANGE_RE.match((header or '').strip())
+    if match is None:
+        return None
+    first, last = match.groups()
+    if not first and not last:
+        return None
+    if not first:
+        # Suffix range: the last N bytes
+        length = min(int(last), size)
+        return (size - length, length) if length else False
+    start = int(first)
+    end = min(int(last), size - 1) if last else size - 1
+    if start >= size or end < start:
+        return False
+    return start, end - start + 1
+
+
+def stream_file(name: str, size: int, content_type: str, range_header: str = None):
+    """Response serving a stored recording file, or the requested range of it"""
+    byte_range = parse_range(range_header, size)
+    if byte_range is False:
+        response = HttpResponse(status=416)
+        response['Content-Range'] = f'bytes */{size}'
+        return response
+
+    file = open(recording_storage.path(name), 'rb')
+    start, length = byte_range or (0, size)
+    response = FileResponse(
+        _RangeFile(file, start, length),
+        status=206 if byte_range else 200,
+        content_type=content_type or 'application/octet-stream',
+    )
+    response['Content-Length'] = str(length)
+    if byte_range:
+        response['Content-Range'] = f'bytes {start}-{start + length - 1}/{size}'
+    response['Accept-Ranges'] = 'bytes'
+    response['Content-Disposition'] = content_disposition_header(False, os.path.basename(name))
+    return response
+
+
+def stream_recording(recording: Recording, range_header: str = None):
+    """Response serving a recording's file, or the requested range of it"""
+    size = recording.file_size if recording.file_size is not None else recording.file.size
+    return stream_file(recording.file.name, size, recording.content_type, range_header)
@@ -1,11 +1,13 @@
 from django.urls import path, include
 from rest_framework.routers import SimpleRouter
 
+from .playback import play_recording
 from .views import RecordingViewSet
 
 router = SimpleRouter()
 router.register(r'', RecordingViewSet, basename='recording')
 
 urlpatterns = [
+    path('play/<str:token>/', play_recording, name='recording-play'),
     path('', include(router.urls)),
 ]
@@ -3,9 +3,14 @@ from rest_framework.decorators import action
 from rest_framework.response import Response
 from rest_framework.permissions import IsAuthenticated, AllowAny
 
-from .models import Recording
-from .serializers import RecordingSerializer, RecordingCreateSerializer
+from django.http import Http404
+
+from .models import Recording, RecordingUpload
+from .playback import can_play, make_playback_url
+from .serializers import RecordingSerializer, RecordingCreateSerializer, RecordingUploadSerializer
+from .uploads import UploadError, discard_upload, parse_content_range, start_upload, stream_recording, write_chunk
 from accounts.permissions import IsAdmin
+from webinar_system.idempotency import idempotent
 
 
 class RecordingViewSet(viewsets.ModelViewSet):
@@ -28,9 +33,9 @@ class RecordingViewSet(viewsets.ModelViewSet):
         return queryset
 
     def get_permissions(self):
-        if self.action in ['list', 'retrieve']:
+        if self.action in ['list', 'retrieve', 'stream']:
             return [AllowAny()]
-        elif self.action in ['create', 'update', 'partial_update', 'destroy']:
+        elif self.action in ['create', 'update', 'partial_update', 'destroy', 'upload']:
             return [IsAdmin()]
         return super().get_permissions()
 
@@ -39,6 +44,10 @@ class RecordingViewSet(viewsets.ModelViewSet):
             return RecordingCreateSerializer
         return RecordingSerializer
 
+    @idempotent
+    def create(self, request, *args, **kwargs):
+        return super().create(request, *args, **kwargs)
+
     def perform_create(self, serializer):
         serializer.save(uploaded_by=self.request.user)
 
@@ -56,3 +65,93 @@ class RecordingViewSet(viewsets.ModelViewSet):
         recordings = self.get_queryset().filter(event_id__in=user_events)
         serializer = self.get_serializer(recordings, many=True)
         return Response(serializer.data)
+
+    @action(detail=True, methods=['get', 'post', 'put', 'delete'])
+    def upload(self, request, pk=None):
+        """Upload the recording's file in resumable chunks (admin only)
+
+        - POST {"filename", "size", "content_type"} starts an upload, or
+          resumes the unfinished one for the same file
+        - GET returns the upload, whose "received" is the next chunk's start
+        - PUT sends one chunk as the raw body with
+          ``Content-Range: bytes <start>-<end>/<size>``
+        - DELETE abandons the upload
+        """
+        recording = self.get_object()
+        
+        if request.method == 'POST':
+            serializer = RecordingUploadSerializer(data=request.data)
+            serializer.is_valid(raise_exception=True)
+            upload, created = start_upload(
+                recording,
+                serializer.validated_data['filename'],
+                serializer.validated_data['size'],
+                serializer.validated_data.get('content_type', ''),
+                request.user,
+            )
+            return Response(
+                RecordingUploadSerializer(upload).data,
+                status=status.HTTP_201_CREATED if created else status.HTTP_200_OK
+            )
+        
+        upload = RecordingUpload.objects.filter(recording=recording).first()
+        if upload is None:
+            return Response({'error': 'No upload in progress for this recording'}, status=status.HTTP_404_NOT_FOUND)
+        
+        if request.method == 'GET':
+            return Response(RecordingUploadSerializer(upload).data)
+        if request.method == 'DELETE':
+            discard_upload(upload)
+            return Response(status=status.HTTP_204_NO_CONTENT)
+        
+        # The body is read straight from the request stream, never parsed
+        try:
+            start, length, total = parse_content_range(request.headers.get('Content-Range'))
+            upload = write_chunk(upload.pk, request.stream, start, length, total)
+        except UploadError as exc:
+            body = {'error': str(exc)}
+            if exc.offset is not None:
+                body['received'] = exc.offset
+            return Response(body, status=exc.status_code)
+        except RecordingUpload.DoesNotExist:
+            # Finished or abandoned by a concurrent request
+            return Response({'error': 'No upload in progress for this recording'}, status=status.HTTP_404_NOT_FOUND)
+        
+        if upload.received < upload.size:
+            return Response(RecordingUploadSerializer(upload).data)
+        recording.refresh_from_db()
+        return Response(RecordingSerializer(recording).data, status=status.HTTP_201_CREATED)
+
+    @action(detail=True, methods=['get'])
+    def stream(self, request, pk=None):
+        """Stream a public (or, for admins, any) self-hosted file, honouring a single Range
+
+        Private recordings are played through playback_url instead.
+        """
+        recording = self.get_object()
+        if not recording.file:
+            raise Http404('This recording has no uploaded file.')
+        if not recording.is_public and not IsAdmin().has_permission(request, self):
+            return Response(
+                {'error': 'Request a playback URL for this recording'},
+                status=status.HTTP_403_FORBIDDEN
+            )
+        return stream_recording(recording, request.headers.get('Range'))
+
+    @action(detail=True, methods=['get'], permission_classes=[IsAuthenticated])
+    def playback_url(self, request, pk=None):
+        """Get a signed, expiring URL to play the self-hosted file
+
+        Private recordings are only available to users registered for the webinar.
+        The URL is a bearer link: it plays for whoever holds it until it expires.
+        """
+        recording = self.get_object()
+        if not recording.file:
+            raise Http404('This recording has no uploaded file.')
+        if not can_play(request.user, recording):
+            return Response(
+                {'error': 'Register for this webinar to watch its recording'},
+                status=status.HTTP_403_FORBIDDEN
+            )
+        url, expires_at = make_playback_url(request, recording)
+        return Response({'url': url, 'expires_at': expires_at})
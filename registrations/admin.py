@@ -1,5 +1,6 @@
 from django.contrib import admin
-from .models import Registration
+from .models import Registration, WaitlistEntry
+from .services import release_registrations
 
 
 @admin.register(Registration)
@@ -19,3 +20,17 @@ class RegistrationAdmin(admin.ModelAdmin):
             'classes': ('collapse',)
         }),
     )
+
+    def delete_model(self, request, obj):
+        release_registrations([obj.pk])
+
+    def delete_queryset(self, request, queryset):
+        release_registrations(list(queryset.values_list('pk', flat=True)))
+
+
+@admin.register(WaitlistEntry)
+class WaitlistEntryAdmin(admin.ModelAdmin):
+    list_display = ['user', 'event', 'position', 'created_at']
+    list_filter = ['event']
+    search_fields = ['user__username', 'user__email', 'event__title']
+    readonly_fields = ['position', 'created_at']
@@ -0,0 +1,40 @@
+from django.core.management.base import BaseCommand
+
+from registrations.exports import EXPORT_FORMATS, export_rows, iter_export
+
+
+class Command(BaseCommand):
+    help = "Stream registrations (optionally for some events) as CSV or NDJSON."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--event',
+            type=int,
+            action='append',
+            dest='events',
+            help='Only this event; repeat for several (default all events)',
+        )
+        parser.add_argument('--format', dest='export_format', choices=list(EXPORT_FORMATS), default='csv')
+        parser.add_argument(
+            '--attended',
+            choices=['yes', 'no'],
+            help='Only attendees (yes) or no-shows (no)',
+        )
+        parser.add_argument('--chunk-size', type=int, help='Rows fetched per database round trip')
+        parser.add_argument('--output', '-o', help='File to write (default stdout)')
+
+    def handle(self, *args, **options):
+        attended = None if options['attended'] is None else options['attended'] == 'yes'
+        rows = export_rows(
+            event_ids=options['events'],
+            attended=attended,
+            chunk_size=options['chunk_size'],
+        )
+
+        blocks = iter_export(options['export_format'], rows)
+        if options['output']:
+            with open(options['output'], 'w', encoding='utf-8', newline='') as stream:
+                stream.writelines(blocks)
+        else:
+            for block in blocks:
+                self.stdout.write(block, ending='')
@@ -35,3 +35,41 @@ class Registration(models.Model):
 
     def __str__(self) -> str:
         return f"{self.user.username} -> {self.event.title}"
+
+
+class WaitlistEntry(models.Model):
+    """A user's place in line for a full webinar"""
+    user = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.CASCADE,
+        related_name="waitlist_entries",
+    )
+    event = models.ForeignKey(
+        'webinars.Event',
+        on_delete=models.CASCADE,
+        related_name="waitlist_entries",
+    )
+    position = models.PositiveBigIntegerField(
+        help_text="Place in line; lower goes first. Not renumbered when others leave."
+    )
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        app_label = 'registrations'
+        verbose_name = 'Waitlist Entry'
+        verbose_name_plural = 'Waitlist Entries'
+        ordering = ['event', 'position']
+        constraints = [
+            # Also the (event, position) index promotion reads the head of the line from
+            models.UniqueConstraint(
+                fields=["event", "position"],
+                name="unique_waitlist_position",
+            ),
+            models.UniqueConstraint(
+                fields=["event", "user"],
+                name="unique_waitlist_per_user_event",
+            ),
+        ]
+
+    def __str__(self) -> str:
+        return f"{self.user.username} waiting for {self.event.title} (#{self.position})"
@@ -1,5 +1,9 @@
+from django.conf import settings
+from django.db import transaction
 from rest_framework import serializers
-from .models import Registration
+from .models import Registration, WaitlistEntry
+from .services import conflicting_registrations, seats_left
+from webinars.models import Event
 from webinars.serializers import EventSerializer
 
 
@@ -18,12 +22,64 @@ class RegistrationSerializer(serializers.ModelSerializer):
         read_only_fields = ['user', 'registered_on']
 
 
+class ScheduleEventSerializer(serializers.ModelSerializer):
+    """
+    Event fields for a user's own registrations.
+
+    Reads the stored starts_at/ends_at columns and the ``now`` passed in the
+    context instead of recomputing datetimes per row, and skips the
+    is_registered lookup, which is always true here.
+    """
+    organizer_name = serializers.CharField(source='organizer.username', read_only=True)
+    status = serializers.SerializerMethodField()
+    is_free = serializers.BooleanField(read_only=True)
+    is_registered = serializers.SerializerMethodField()
+    start_time = serializers.DateTimeField(source='starts_at', read_only=True)
+    end_time = serializers.DateTimeField(source='ends_at', read_only=True)
+    
+    class Meta:
+        model = Event
+        fields = [
+            'id', 'title', 'description', 'date', 'time', 'duration',
+            'price', 'is_free', 'thumbnail', 'capacity', 'organizer', 'organizer_name',
+            'status', 'is_registered', 'start_time', 'end_time', 'created_at', 'updated_at'
+        ]
+        read_only_fields = fields
+    
+    def get_status(self, obj):
+        return obj.status_at(self.context['now'])
+    
+    def get_is_registered(self, obj):
+        return True
+
+
+class MyRegistrationSerializer(serializers.ModelSerializer):
+    """Serializer for the current user's registrations ("my schedule")"""
+    event_details = ScheduleEventSerializer(source='event', read_only=True)
+    user_username = serializers.CharField(source='user.username', read_only=True)
+    user_email = serializers.EmailField(source='user.email', read_only=True)
+    
+    class Meta:
+        model = Registration
+        fields = [
+            'id', 'user', 'user_username', 'user_email',
+            'event', 'event_details', 'registered_on', 'attended'
+        ]
+        read_only_fields = fields
+
+
 class RegistrationCreateSerializer(serializers.ModelSerializer):
     """Serializer for creating registrations"""
+    check_conflicts = serializers.BooleanField(
+        write_only=True,
+        required=False,
+        default=False,
+        help_text="Refuse the registration if it overlaps another of the user's webinars"
+    )
     
     class Meta:
         model = Registration
-        fields = ['event']
+        fields = ['event', 'check_conflicts']
     
     def validate_event(self, value):
         """Check if user is already registered"""
@@ -31,3 +87,60 @@ class RegistrationCreateSerializer(serializers.ModelSerializer):
         if Registration.objects.filter(user=user, event=value).exists():
             raise serializers.ValidationError("You are already registered for this webinar.")
         return value
+
+    def validate(self, attrs):
+        if attrs.pop('check_conflicts', False):
+            user = self.context['request'].user
+            conflicts = list(
+                conflicting_registrations(user, attrs['event']).values_list('event_id', flat=True)
+            )
+            if conflicts:
+                raise serializers.ValidationError({
+                    'event': ["This webinar overlaps another webinar you are registered for."],
+                    'conflicts': conflicts,
+                })
+        return attrs
+
+    def create(self, validated_data):
+        """Create the registration while holding the event, so capacity can't be exceeded"""
+        with transaction.atomic():
+            event = Event.objects.select_for_update().get(pk=validated_data['event'].pk)
+            if seats_left(event, event.registrations.count()) == 0:
+                raise serializers.ValidationError({'event': ["This webinar is full. Join the waitlist instead."]})
+            registration = super().create(validated_data)
+            WaitlistEntry.objects.filter(event=event, user=registration.user).delete()
+            return registration
+
+
+class BulkEnrollSerializer(serializers.Serializer):
+    """Serializer for enrolling many users into one event"""
+    event = serializers.PrimaryKeyRelatedField(queryset=Event.objects.all())
+    users = serializers.ListField(
+        child=serializers.IntegerField(min_value=1),
+        allow_empty=False,
+        max_length=settings.BULK_REGISTRATION_MAX_ITEMS,
+    )
+
+
+class RegisterEventsSerializer(serializers.Serializer):
+    """Serializer for registering one user for many events"""
+    events = serializers.ListField(
+        child=serializers.IntegerField(min_value=1),
+        allow_empty=False,
+        max_length=settings.BULK_REGISTRATION_MAX_ITEMS,
+    )
+    user = serializers.IntegerField(
+        min_value=1,
+        required=False,
+        help_text="User to register (admins only; defaults to the current user)"
+    )
+
+
+class WaitlistEntrySerializer(serializers.ModelSerializer):
+    """Serializer for waitlist entries"""
+    event_title = serializers.CharField(source='event.title', read_only=True)
+    
+    class Meta:
+        model = WaitlistEntry
+        fields = ['id', 'event', 'event_title', 'position', 'created_at']
+        read_only_fields = ['position', 'created_at']
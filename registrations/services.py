@@ -0,0 +1,258 @@
+"""
+Registration services.
+
+Bulk enrollment works on sets: existing registrations and per-event counts
+are read with one query each, capacity is applied in memory, and the new
+rows are written with ``bulk_create(ignore_conflicts=True)`` so a row that
+appeared concurrently is skipped by ``unique_registration_per_user_event``
+instead of failing the batch. Events are locked while their seats are
+counted, so concurrent enrollments can't overfill them.
+
+Full events keep a waitlist. A seat freed by deleting a registration is
+handed to the head of the line in the same transaction, so it is never
+visibly free. The head is read through the (event, position) index with
+``SELECT ... FOR UPDATE SKIP LOCKED``, so promotion costs the same however
+long the line is and doesn't wait on entries other transactions hold.
+
+Schedule conflicts are found in the database: two webinars overlap when each
+starts before the other ends, which is a range condition on the stored
+starts_at/ends_at columns and is answered from the (starts_at, ends_at) index
+rather than by walking the user's registrations.
+"""
+from collections import Counter
+
+from django.contrib.auth.models import User
+from django.db import connection, transaction
+from django.db.models import Count, Exists, Max, OuterRef
+
+from communications.services import notify_registrations_approved
+from webinars.models import Event
+from .models import Registration, WaitlistEntry
+
+BULK_CREATE_BATCH_SIZE = 500
+
+# Per-item result statuses
+REGISTERED = 'registered'
+ALREADY_REGISTERED = 'already_registered'
+EVENT_FULL = 'event_full'
+NOT_FOUND = 'not_found'
+WAITLISTED = 'waitlisted'
+SEATS_AVAILABLE = 'seats_available'
+
+
+def seats_left(event: Event, registered: int):
+    """Remaining seats of an event, or None if it is unlimited"""
+    if event.capacity is None:
+        return None
+    return max(event.capacity - registered, 0)
+
+
+def _summarize(results: list) -> dict:
+    summary = {status: 0 for status in (REGISTERED, ALREADY_REGISTERED, EVENT_FULL, NOT_FOUND)}
+    for result in results:
+        summary[result['status']] += 1
+    return {**summary, 'results': results}
+
+
+def conflicting_registrations(user: User, event: Event):
+    """
+    A user's registrations for other webinars whose ``[start, end)`` overlaps
+    an event's, soonest first.
+
+    Webinars marked completed don't conflict with anything.
+    """
+    if event.starts_at is None or event.ends_at is None:
+        return Registration.objects.none()
+    return (
+        Registration.objects
+        .filter(
+            user=user,
+            event__starts_at__lt=event.ends_at,
+            event__ends_at__gt=event.starts_at,
+            event__manual_status='',
+        )
+        .exclude(event=event)
+        .order_by('event__starts_at')
+    )
+
+
+def enroll_users(event: Event, user_ids: list) -> dict:
+    """
+    Register many users for one event.
+
+    Users beyond the event's remaining capacity are not registered; seats
+    go to users in the order given.
+
+    Args:
+        event: Event to enroll into
+        user_ids: User ids; duplicates are ignored
+
+    Returns:
+        Counts per status and a ``results`` list of ``{'user', 'status'}``
+    """
+    user_ids = list(dict.fromkeys(user_ids))
+    with transaction.atomic():
+        event = Event.objects.select_for_update().get(pk=event.pk)
+        known = set(User.objects.filter(pk__in=user_ids).values_list('pk', flat=True))
+        registered = set(
+            Registration.objects.filter(event=event, user_id__in=user_ids).order_by().values_list('user_id', flat=True)
+        )
+        remaining = seats_left(event, event.registrations.count())
+
+        results = []
+        new = []
+        for user_id in user_ids:
+            if user_id not in known:
+                status = NOT_FOUND
+            elif user_id in registered:
+                status = ALREADY_REGISTERED
+            elif remaining is not None and len(new) >= remaining:
+                status = EVENT_FULL
+            else:
+                status = REGISTERED
+                new.append(Registration(user_id=user_id, event=event))
+            results.append({'user': user_id, 'status': status})
+
+        Registration.objects.bulk_create(new, batch_size=BULK_CREATE_BATCH_SIZE, ignore_conflicts=True)
+        WaitlistEntry.objects.filter(event=event, user_id__in=[r.user_id for r in new]).delete()
+    return _summarize(results)
+
+
+def register_for_events(user: User, event_ids: list) -> dict:
+    """
+    Register one user for many events.
+
+    Args:
+        user: User to register
+        event_ids: Event ids; duplicates are ignored
+
+    Returns:
+        Counts per status and a ``results`` list of ``{'event', 'status'}``
+    """
+    event_ids = list(dict.fromkeys(event_ids))
+    with transaction.atomic():
+        # Lock in primary key order so concurrent multi-event requests can't deadlock
+        events = {
+            event.pk: event
+            for event in Event.objects.select_for_update().filter(pk__in=event_ids).order_by('pk')
+        }
+        registered = set(
+            Registration.objects.filter(user=user, event_id__in=events).order_by().values_list('event_id', flat=True)
+        )
+        limited = [pk for pk, event in events.items() if event.capacity is not None]
+        counts = dict(
+            Registration.objects.filter(event_id__in=limited).order_by()
+            .values('event_id').annotate(total=Count('id')).values_list('event_id', 'total')
+        )
+
+        results = []
+        new = []
+        for event_id in event_ids:
+            event = events.get(event_id)
+            if event is None:
+                status = NOT_FOUND
+            elif event_id in registered:
+                status = ALREADY_REGISTERED
+            elif seats_left(event, counts.get(event_id, 0)) == 0:
+                status = EVENT_FULL
+            else:
+                status = REGISTERED
+                new.append(Registration(user=user, event=event))
+            results.append({'event': event_id, 'status': status})
+
+        Registration.objects.bulk_create(new, batch_size=BULK_CREATE_BATCH_SIZE, ignore_conflicts=True)
+        WaitlistEntry.objects.filter(user=user, event_id__in=[r.event_id for r in new]).delete()
+    return _summarize(results)
+
+
+def join_waitlist(user: User, event: Event) -> tuple:
+    """
+    Put a user at the end of a full event's waitlist.
+
+    Returns:
+        Tuple of (WaitlistEntry or None, status): WAITLISTED (also when the
+        user was already waiting), ALREADY_REGISTERED or SEATS_AVAILABLE
+    """
+    with transaction.atomic():
+        event = Event.objects.select_for_update().get(pk=event.pk)
+        if Registration.objects.filter(user=user, event=event).exists():
+            return None, ALREADY_REGISTERED
+        if seats_left(event, event.registrations.count()) != 0:
+            return None, SEATS_AVAILABLE
+        entry = WaitlistEntry.objects.filter(user=user, event=event).first()
+        if entry is None:
+            # MAX reads the last (event, position) index entry; the event lock orders concurrent joins
+            last = event.waitlist_entries.aggregate(last=Max('position'))['last'] or 0
+            entry = WaitlistEntry.objects.create(user=user, event=event, position=last + 1)
+    return entry, WAITLISTED
+
+
+def promote_from_waitlist(event: Event, seats: int) -> list:
+    """
+    Register the first ``seats`` users waiting for an event and notify them.
+
+    Call inside the transaction that freed the seats, with the event locked.
+
+    Returns:
+        Ids of the promoted users
+    """
+    if seats <= 0:
+        return []
+    # Users who got a seat some other way (e.g. added in the admin) would take
+    # a freed seat without filling it; their entries are stale
+    registered = Exists(Registration.objects.filter(event=event, user_id=OuterRef('user_id')))
+    WaitlistEntry.objects.filter(registered, event=event).delete()
+    waiting = WaitlistEntry.objects.filter(~registered, event=event).order_by('position')
+    if connection.features.has_select_for_update_skip_locked:
+        # Entries being removed by their users are skipped, not waited for
+        waiting = waiting.select_for_update(skip_locked=True)
+    entries = list(waiting.values_list('pk', 'user_id')[:seats])
+    if not entries:
+        return []
+
+    user_ids = [user_id for _, user_id in entries]
+    Registration.objects.bulk_create(
+        [Registration(user_id=user_id, event=event) for user_id in user_ids],
+        ignore_conflicts=True,
+    )
+    WaitlistEntry.objects.filter(pk__in=[pk for pk, _ in entries]).delete()
+    notify_registrations_approved(event, User.objects.filter(pk__in=user_ids))
+    return user_ids
+
+
+def release_registrations(registration_ids: list) -> int:
+    """
+    Delete registrations and give each freed seat to the event's waitlist.
+
+    Returns:
+        Number of registrations deleted
+    """
+    with transaction.atomic():
+        freed = Counter(
+            Registration.objects.filter(pk__in=registration_ids).values_list('event_id', flat=True)
+        )
+        if not freed:
+            return 0
+        events = list(Event.objects.select_for_update().filter(pk__in=freed).order_by('pk'))
+        deleted, _ = Registration.objects.filter(pk__in=registration_ids).delete()
+        for event in events:
+            # Only seats under capacity are handed on, in case capacity was lowered
+            seats = seats_left(event, event.registrations.count())
+            promote_from_waitlist(event, freed[event.pk] if seats is None else min(freed[event.pk], seats))
+    return deleted
+
+
+def fill_from_waitlist(event: Event) -> list:
+    """
+    Promote as many waiting users as an event now has room for, e.g. after
+    its capacity was raised or removed.
+
+    Returns:
+        Ids of the promoted users
+    """
+    with transaction.atomic():
+        event = Event.objects.select_for_update().get(pk=event.pk)
+        seats = seats_left(event, event.registrations.count())
+        if seats is None:
+            seats = event.waitlist_entries.count()
+        return promote_from_waitlist(event, seats)
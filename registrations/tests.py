@@ -1,3 +1,583 @@
-from django.test import TestCase
+import json
+from datetime import timedelta
+from io import StringIO
 
-# Create your tests here.
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.test import override_settings
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.test import APITestCase
+
+from communications.models import UserNotification
+from webinars.models import Event
+from .checkin import flush_check_ins
+from .models import Registration, WaitlistEntry
+
+
+User = get_user_model()
+
+
+@override_settings(PASSWORD_HASHERS=['django.contrib.auth.hashers.MD5PasswordHasher'])
+class BulkRegistrationTests(APITestCase):
+    """Tests for bulk enrollment and multi-event registration"""
+
+    def setUp(self):
+        self.admin = User.objects.create_user(
+            username='admin1',
+            email='admin1@test.com',
+            password='testpass123',
+            is_staff=True
+        )
+        self.students = [
+            User.objects.create_user(
+                username=f'student{i}',
+                email=f'student{i}@test.com',
+                password='testpass123'
+            )
+            for i in range(4)
+        ]
+        self.webinar = Event.objects.create(
+            title='Cohort Webinar',
+            date='2026-03-15',
+            time='14:00:00',
+            organizer=self.admin,
+            capacity=3,
+        )
+
+    def test_bulk_enroll_applies_capacity_in_order(self):
+        """Test enrollment reports each user and stops at capacity"""
+        Registration.objects.create(user=self.students[0], event=self.webinar)
+        self.client.force_authenticate(user=self.admin)
+        user_ids = [student.id for student in self.students] + [self.students[1].id, 999999]
+
+        with self.assertNumQueries(9):
+            response = self.client.post(
+                '/api/registrations/bulk_enroll/',
+                {'event': self.webinar.id, 'users': user_ids},
+                format='json'
+            )
+
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        statuses = {result['user']: result['status'] for result in response.data['results']}
+        self.assertEqual(statuses, {
+            self.students[0].id: 'already_registered',
+            self.students[1].id: 'registered',
+            self.students[2].id: 'registered',
+            self.students[3].id: 'event_full',
+            999999: 'not_found',
+        })
+        self.assertEqual(response.data['registered'], 2)
+        self.assertEqual(self.webinar.registrations.count(), 3)
+
+    def test_bulk_enroll_requires_admin(self):
+        """Test students can't enroll other users"""
+        self.client.force_authenticate(user=self.students[0])
+
+        response = self.client.post(
+            '/api/registrations/bulk_enroll/',
+            {'event': self.webinar.id, 'users': [self.students[1].id]},
+            format='json'
+        )
+
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+
+    def test_register_events(self):
+        """Test a student registers for a series in one request"""
+        full = Event.objects.create(
+            title='Full Webinar', date='2026-03-16', time='14:00:00', organizer=self.admin, capacity=1
+        )
+        Registration.objects.create(user=self.students[1], event=full)
+        open_event = Event.objects.create(
+            title='Open Webinar', date='2026-03-17', time='14:00:00', organizer=self.admin
+        )
+        self.client.force_authenticate(user=self.students[0])
+
+        response = self.client.post(
+            '/api/registrations/register_events/',
+            {'events': [self.webinar.id, full.id, open_event.id, 999999]},
+            format='json'
+        )
+
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        statuses = {result['event']: result['status'] for result in response.data['results']}
+        self.assertEqual(statuses, {
+            self.webinar.id: 'registered',
+            full.id: 'event_full',
+            open_event.id: 'registered',
+            999999: 'not_found',
+        })
+        self.assertEqual(
+            set(Registration.objects.filter(user=self.students[0]).values_list('event_id', flat=True)),
+            {self.webinar.id, open_event.id}
+        )
+
+    def test_register_events_for_someone_else_requires_admin(self):
+        """Test only admins can register another user"""
+        self.client.force_authenticate(user=self.students[0])
+
+        response = self.client.post(
+            '/api/registrations/register_events/',
+            {'events': [self.webinar.id], 'user': self.students[1].id},
+            format='json'
+        )
+
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+
+    def test_single_register_respects_capacity(self):
+        """Test the one-event endpoint refuses full webinars"""
+        for student in self.students[1:]:
+            Registration.objects.create(user=student, event=self.webinar)
+        self.client.force_authenticate(user=self.students[0])
+
+        response = self.client.post('/api/registrations/register/', {'event': self.webinar.id}, format='json')
+
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn('event', response.data)
+
+
+@override_settings(PASSWORD_HASHERS=['django.contrib.auth.hashers.MD5PasswordHasher'])
+class RegistrationExportTests(APITestCase):
+    """Tests for streaming registration exports"""
+
+    def setUp(self):
+        self.admin = User.objects.create_user(
+            username='admin1',
+            email='admin1@test.com',
+            password='testpass123',
+            is_staff=True
+        )
+        self.webinars = [
+            Event.objects.create(
+                title=f'Webinar {i}',
+                date='2026-03-15',
+                time='14:00:00',
+                organizer=self.admin,
+            )
+            for i in range(2)
+        ]
+        self.students = [
+            User.objects.create_user(
+                username=f'student{i}',
+                email=f'student{i}@test.com',
+                password='testpass123',
+                first_name='=cmd' if i == 0 else ''
+            )
+            for i in range(3)
+        ]
+        for student in self.students:
+            Registration.objects.create(user=student, event=self.webinars[0], attended=student is self.students[0])
+        Registration.objects.create(user=self.students[0], event=self.webinars[1])
+        self.client.force_authenticate(user=self.admin)
+
+    def test_csv_export_for_one_event_streams(self):
+        """Test the CSV export streams a header and one line per registration"""
+        response = self.client.get(f'/api/registrations/export/?event={self.webinars[0].id}')
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertTrue(response.streaming)
+        self.assertIn(f'registrations-event-{self.webinars[0].id}.csv', response['Content-Disposition'])
+        lines = b''.join(response.streaming_content).decode().splitlines()
+        self.assertTrue(lines[0].startswith('registration_id,event_id,event_title'))
+        self.assertEqual(len(lines), 4)
+        self.assertIn("'=cmd", lines[1])
+
+    def test_ndjson_export_across_events_with_filter(self):
+        """Test NDJSON output and the attended filter"""
+        response = self.client.get('/api/registrations/export/?output=ndjson&attended=true')
+
+        rows = [json.loads(line) for line in b''.join(response.streaming_content).decode().splitlines()]
+        self.assertEqual(len(rows), 1)
+        self.assertEqual(rows[0]['username'], 'student0')
+        self.assertTrue(rows[0]['attended'])
+
+    def test_export_requires_admin(self):
+        """Test students can't export registrant lists"""
+        self.client.force_authenticate(user=self.students[0])
+
+        response = self.client.get('/api/registrations/export/')
+
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+
+    def test_export_command(self):
+        """Test the command writes every registration across events"""
+        out = StringIO()
+
+        call_command('export_registrations', '--format', 'ndjson', stdout=out)
+
+        rows = [json.loads(line) for line in out.getvalue().splitlines()]
+        self.assertEqual(len(rows), 4)
+        self.assertEqual(rows[-1]['event_id'], self.webinars[1].id)
+
+
+@override_settings(PASSWORD_HASHERS=['django.contrib.auth.hashers.MD5PasswordHasher'])
+class MyRegistrationsTests(APITestCase):
+    """Tests for the current user's schedule"""
+
+    def setUp(self):
+        self.admin = User.objects.create_user(
+            username='admin1',
+            email='admin1@test.com',
+            password='testpass123',
+            is_staff=True
+        )
+        self.student = User.objects.create_user(
+            username='student1',
+            email='student1@test.com',
+            password='testpass123'
+        )
+        other = User.objects.create_user(username='student2', email='student2@test.com', password='testpass123')
+        now = timezone.localtime()
+        self.webinars = {}
+        for name, start in [
+            ('past', now - timedelta(days=2)),
+            ('live', now - timedelta(minutes=10)),
+            ('soon', now + timedelta(days=1)),
+            ('later', now + timedelta(days=5)),
+        ]:
+            self.webinars[name] = Event.objects.create(
+                title=name, date=start.date(), time=start.time(), duration=60, organizer=self.admin
+            )
+            Registration.objects.create(user=self.student, event=self.webinars[name])
+        Registration.objects.create(user=other, event=self.webinars['soon'])
+        self.client.force_authenticate(user=self.student)
+
+    def titles(self, when=''):
+        response = self.client.get(f'/api/registrations/my_registrations/?when={when}')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return [row['event_details']['title'] for row in response.data]
+
+    def test_single_query_with_event_fields(self):
+        """Test the schedule joins events in one query and reports status"""
+        with self.assertNumQueries(1):
+            response = self.client.get('/api/registrations/my_registrations/')
+
+        self.assertEqual(len(response.data), 4)
+        details = {row['event_details']['title']: row['event_details'] for row in response.data}
+        self.assertEqual(details['live']['status'], 'live')
+        self.assertEqual(details['past']['status'], 'completed')
+        self.assertTrue(details['soon']['is_registered'])
+        self.assertIsNotNone(details['soon']['start_time'])
+        self.assertEqual(response.data[0]['user'], self.student.id)
+        self.assertEqual(response.data[0]['user_username'], self.student.username)
+        self.assertEqual(response.data[0]['user_email'], self.student.email)
+
+    def test_when_filters(self):
+        """Test upcoming, live and past filters and their ordering"""
+        self.assertEqual(self.titles('upcoming'), ['soon', 'later'])
+        self.assertEqual(self.titles('live'), ['live'])
+        self.assertEqual(self.titles('past'), ['past'])
+
+        Event.objects.filter(pk=self.webinars['later'].pk).update(manual_status='completed')
+
+        self.assertEqual(self.titles('upcoming'), ['soon'])
+        self.assertEqual(self.titles('past'), ['later', 'past'])
+
+    def test_invalid_when(self):
+        """Test unknown filters are rejected"""
+        response = self.client.get('/api/registrations/my_registrations/?when=tomorrow')
+
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+
+@override_settings(PASSWORD_HASHERS=['django.contrib.auth.hashers.MD5PasswordHasher'])
+class WaitlistTests(APITestCase):
+    """Tests for waitlists and promotion when seats free up"""
+
+    def setUp(self):
+        self.admin = User.objects.create_user(
+            username='admin1',
+            email='admin1@test.com',
+            password='testpass123',
+            is_staff=True
+        )
+        self.students = [
+            User.objects.create_user(
+                username=f'student{i}',
+                email=f'student{i}@test.com',
+                password='testpass123'
+            )
+            for i in range(4)
+        ]
+        self.webinar = Event.objects.create(
+            title='Popular Webinar',
+            date='2026-03-15',
+            time='14:00:00',
+            organizer=self.admin,
+            capacity=1,
+        )
+        self.registration = Registration.objects.create(user=self.students[0], event=self.webinar)
+
+    def join(self, user):
+        self.client.force_authenticate(user=user)
+        return self.client.post('/api/registrations/waitlist/', {'event': self.webinar.id}, format='json')
+
+    def test_join_waitlist_in_order(self):
+        """Test users queue up behind each other and can't queue twice"""
+        first = self.join(self.students[1])
+        second = self.join(self.students[2])
+        again = self.join(self.students[1])
+
+        self.assertEqual(first.status_code, status.HTTP_201_CREATED)
+        self.assertLess(first.data['position'], second.data['position'])
+        self.assertEqual(again.data['id'], first.data['id'])
+        self.assertEqual(self.join(self.students[0]).status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_join_refused_when_seats_available(self):
+        """Test the waitlist is only for full webinars"""
+        self.registration.delete()
+
+        response = self.join(self.students[1])
+
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_unregister_promotes_head_and_notifies(self):
+        """Test a freed seat goes to the first waiting user, who is notified"""
+        for student in self.students[1:]:
+            self.join(student)
+        self.client.force_authenticate(user=self.students[0])
+
+        response = self.client.delete(f'/api/registrations/{self.registration.id}/unregister/')
+
+        self.assertEqual(response.status_code, status.HTTP_204_NO_CONTENT)
+        self.assertEqual(
+            list(self.webinar.registrations.values_list('user_id', flat=True)),
+            [self.students[1].id]
+        )
+        self.assertEqual(
+            list(WaitlistEntry.objects.values_list('user_id', flat=True)),
+            [self.students[2].id, self.students[3].id]
+        )
+        notification = UserNotification.objects.get(notification_type='registration_approved')
+        self.assertEqual(notification.user, self.students[1])
+
+    def test_promotion_skips_users_already_registered(self):
+        """Test a waiting user registered some other way doesn't swallow the freed seat"""
+        for student in self.students[1:3]:
+            self.join(student)
+        # Added directly, e.g. through the admin, while still on the waitlist
+        Event.objects.filter(pk=self.webinar.pk).update(capacity=2)
+        Registration.objects.create(user=self.students[1], event=self.webinar)
+        self.client.force_authenticate(user=self.students[0])
+
+        self.client.delete(f'/api/registrations/{self.registration.id}/unregister/')
+
+        self.assertEqual(
+            set(self.webinar.registrations.values_list('user_id', flat=True)),
+            {self.students[1].id, self.students[2].id}
+        )
+        self.assertFalse(WaitlistEntry.objects.exists())
+        self.assertEqual(
+            list(UserNotification.objects.filter(notification_type='registration_approved').values_list('user_id', flat=True)),
+            [self.students[2].id]
+        )
+
+    def test_admin_delete_promotes(self):
+        """Test deleting a registration through the API also promotes"""
+        self.join(self.students[1])
+        self.client.force_authenticate(user=self.admin)
+
+        response = self.client.delete(f'/api/registrations/{self.registration.id}/')
+
+        self.assertEqual(response.status_code, status.HTTP_204_NO_CONTENT)
+        self.assertTrue(Registration.objects.filter(user=self.students[1], event=self.webinar).exists())
+        self.assertFalse(WaitlistEntry.objects.exists())
+
+    def test_raising_capacity_fills_from_waitlist(self):
+        """Test added seats are offered to the waitlist first"""
+        for student in self.students[1:]:
+            self.join(student)
+        self.client.force_authenticate(user=self.admin)
+
+        response = self.client.patch(f'/api/webinars/{self.webinar.id}/', {'capacity': 3}, format='json')
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(self.webinar.registrations.count(), 3)
+        self.assertEqual(list(WaitlistEntry.objects.values_list('user_id', flat=True)), [self.students[3].id])
+
+    def test_leave_waitlist(self):
+        """Test users can leave the line"""
+        self.join(self.students[1])
+
+        response = self.client.delete(f'/api/registrations/waitlist/?event={self.webinar.id}')
+
+        self.assertEqual(response.status_code, status.HTTP_204_NO_CONTENT)
+        self.assertFalse(WaitlistEntry.objects.exists())
+
+
+@override_settings(PASSWORD_HASHERS=['django.contrib.auth.hashers.MD5PasswordHasher'])
+class ScheduleConflictTests(APITestCase):
+    """Tests for overlapping registration detection"""
+
+    def setUp(self):
+        self.admin = User.objects.create_user(
+            username='admin1',
+            email='admin1@test.com',
+            password='testpass123',
+            is_staff=True
+        )
+        self.student = User.objects.create_user(
+            username='student1',
+            email='student1@test.com',
+            password='testpass123'
+        )
+        start = timezone.localtime().replace(hour=10, minute=0, second=0, microsecond=0) + timedelta(days=3)
+        self.webinars = {}
+        for name, offset, duration in [
+            ('morning', 0, 60),
+            ('overlapping', 30, 60),
+            ('back_to_back', 60, 30),
+            ('evening', 480, 60),
+        ]:
+            begins = start + timedelta(minutes=offset)
+            self.webinars[name] = Event.objects.create(
+                title=name, date=begins.date(), time=begins.time(), duration=duration, organizer=self.admin
+            )
+        for name in ('morning', 'back_to_back', 'evening'):
+            Registration.objects.create(user=self.student, event=self.webinars[name])
+        self.client.force_authenticate(user=self.student)
+
+    def test_conflicts_lists_overlapping_registrations(self):
+        """Test only intervals that intersect are reported; touching ends don't"""
+        with self.assertNumQueries(2):
+            response = self.client.get(
+                f"/api/registrations/conflicts/?event={self.webinars['overlapping'].pk}"
+            )
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(
+            [row['event_details']['title'] for row in response.data['conflicts']],
+            ['morning', 'back_to_back']
+        )
+
+        response = self.client.get(f"/api/registrations/conflicts/?event={self.webinars['morning'].pk}")
+        self.assertEqual(response.data['conflicts'], [])
+
+    def test_completed_webinars_do_not_conflict(self):
+        """Test webinars marked completed are ignored"""
+        Event.objects.filter(pk=self.webinars['morning'].pk).update(manual_status='completed')
+
+        response = self.client.get(f"/api/registrations/conflicts/?event={self.webinars['overlapping'].pk}")
+
+        self.assertEqual(
+            [row['event_details']['title'] for row in response.data['conflicts']],
+            ['back_to_back']
+        )
+
+    def test_unknown_event(self):
+        """Test checking a missing webinar is rejected"""
+        response = self.client.get('/api/registrations/conflicts/?event=9999')
+
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_register_with_conflict_check(self):
+        """Test the opt-in check refuses overlapping registrations"""
+        overlapping = self.webinars['overlapping']
+
+        response = self.client.post(
+            '/api/registrations/register/',
+            {'event': overlapping.pk, 'check_conflicts': True},
+            format='json'
+        )
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(
+            sorted(int(pk) for pk in response.data['conflicts']),
+            sorted([self.webinars['morning'].pk, self.webinars['back_to_back'].pk])
+        )
+        self.assertFalse(Registration.objects.filter(user=self.student, event=overlapping).exists())
+
+        response = self.client.post('/api/registrations/register/', {'event': overlapping.pk}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+
+
+@override_settings(
+    PASSWORD_HASHERS=['django.contrib.auth.hashers.MD5PasswordHasher'],
+    BACKGROUND_TASKS_EAGER=True,
+    CHECKIN_BATCH_SIZE=3,
+    CHECKIN_FLUSH_SECONDS=3600,
+)
+class CheckInTests(APITestCase):
+    """Tests for signed check-in tokens and batched attendance"""
+
+    def setUp(self):
+        self.admin = User.objects.create_user(
+            username='admin1',
+            email='admin1@test.com',
+            password='testpass123',
+            is_staff=True
+        )
+        self.webinar = Event.objects.create(
+            title='Hybrid Webinar',
+            date=timezone.now().date(),
+            time=timezone.now().time(),
+            organizer=self.admin
+        )
+        self.students = [
+            User.objects.create_user(
+                username=f'student{i}',
+                email=f'student{i}@test.com',
+                password='testpass123'
+            )
+            for i in range(3)
+        ]
+        self.registrations = [
+            Registration.objects.create(user=student, event=self.webinar) for student in self.students
+        ]
+
+    def tearDown(self):
+        flush_check_ins()
+
+    def token_for(self, registration):
+        self.client.force_authenticate(user=registration.user)
+        response = self.client.get(f'/api/registrations/{registration.id}/check_in_token/')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return response.data['token']
+
+    def scan(self, token, **extra):
+        self.client.force_authenticate(user=self.admin)
+        return self.client.post('/api/registrations/check_in/', {'token': token, **extra}, format='json')
+
+    def test_scans_are_verified_in_memory_and_written_per_batch(self):
+        """Test scans don't touch registrations until the batch fills"""
+        tokens = [self.token_for(registration) for registration in self.registrations]
+        self.scan(tokens[0])  # warm the admin's profile cache
+
+        with self.assertNumQueries(0):
+            response = self.scan(tokens[1], event=self.webinar.id)
+        self.assertEqual(response.status_code, status.HTTP_202_ACCEPTED)
+        self.assertFalse(Registration.objects.filter(attended=True).exists())
+
+        with self.assertNumQueries(1):
+            with self.captureOnCommitCallbacks(execute=True):
+                self.scan(tokens[2])
+        self.assertEqual(Registration.objects.filter(attended=True).count(), 3)
+
+    def test_flush_writes_pending_scans(self):
+        """Test pending check-ins can be written before the batch fills"""
+        self.scan(self.token_for(self.registrations[0]))
+
+        with self.captureOnCommitCallbacks(execute=True):
+            flush_check_ins()
+
+        self.registrations[0].refresh_from_db()
+        self.assertTrue(self.registrations[0].attended)
+
+    def test_rejects_tampered_and_foreign_tokens(self):
+        """Test forged tokens and tickets for other webinars are refused"""
+        token = self.token_for(self.registrations[0])
+        other = Event.objects.create(
+            title='Other', date=timezone.now().date(), time=timezone.now().time(), organizer=self.admin
+        )
+        forged = token.replace(f'{self.registrations[0].id}.', f'{self.registrations[1].id}.', 1)
+
+        self.assertEqual(self.scan(forged).status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(self.scan('garbage').status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(self.scan(token, event=other.id).status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_check_in_requires_admin(self):
+        """Test students can't check tickets in"""
+        token = self.token_for(self.registrations[0])
+
+        response = self.client.post('/api/registrations/check_in/', {'token': token}, format='json')
+
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
@@ -1,11 +1,37 @@
+from django.contrib.auth.models import User
+from django.db.models import Q
+from django.http import StreamingHttpResponse
+from django.utils import timezone
 from rest_framework import viewsets, status
 from rest_framework.decorators import action
 from rest_framework.response import Response
 from rest_framework.permissions import IsAuthenticated
 
 from .models import Registration
-from .serializers import RegistrationSerializer, RegistrationCreateSerializer
+from .serializers import (
+    BulkEnrollSerializer,
+    MyRegistrationSerializer,
+    RegisterEventsSerializer,
+    RegistrationCreateSerializer,
+    RegistrationSerializer,
+    WaitlistEntrySerializer,
+)
+from .checkin import make_check_in_token, read_check_in_token, record_check_in
+from .exports import EXPORT_FORMATS, export_rows, iter_export
+from .models import WaitlistEntry
+from .services import (
+    ALREADY_REGISTERED,
+    REGISTERED,
+    SEATS_AVAILABLE,
+    conflicting_registrations,
+    enroll_users,
+    join_waitlist,
+    register_for_events,
+    release_registrations,
+)
+from webinars.models import Event
 from accounts.permissions import IsAdmin
+from webinar_system.idempotency import idempotent
 
 
 class RegistrationViewSet(viewsets.ModelViewSet):
@@ -35,14 +61,62 @@ class RegistrationViewSet(viewsets.ModelViewSet):
     def perform_create(self, serializer):
         serializer.save(user=self.request.user)
 
+    def perform_destroy(self, instance):
+        # Hands the freed seat to the waitlist
+        release_registrations([instance.pk])
+
     @action(detail=False, methods=['get'])
     def my_registrations(self, request):
-        """Get current user's registrations"""
-        registrations = self.get_queryset().filter(user=request.user)
-        serializer = self.get_serializer(registrations, many=True)
+        """Get current user's registrations with their webinars, in one query
+
+        Query params:
+        - when: upcoming (soonest first), live, or past (most recent first);
+          default is all, newest registration first
+        """
+        now = timezone.now()
+        registrations = Registration.objects.filter(user=request.user).select_related('user', 'event__organizer')
+        
+        when = request.query_params.get('when')
+        not_completed = Q(event__manual_status='')
+        if when == 'upcoming':
+            registrations = registrations.filter(not_completed, event__starts_at__gt=now).order_by('event__starts_at')
+        elif when == 'live':
+            registrations = registrations.filter(
+                not_completed, event__starts_at__lte=now, event__ends_at__gte=now
+            ).order_by('event__starts_at')
+        elif when == 'past':
+            registrations = registrations.filter(
+                Q(event__ends_at__lt=now) | ~not_completed
+            ).order_by('-event__starts_at')
+        elif when:
+            return Response(
+                {'error': 'when must be one of: upcoming, live, past'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        
+        serializer = MyRegistrationSerializer(registrations, many=True, context={'request': request, 'now': now})
         return Response(serializer.data)
 
+    @action(detail=False, methods=['get'])
+    def conflicts(self, request):
+        """List the current user's registrations that overlap a webinar
+
+        Query params:
+        - event: id of the webinar to check
+        """
+        try:
+            event = Event.objects.get(pk=request.query_params.get('event'))
+        except (Event.DoesNotExist, ValueError, TypeError):
+            return Response({'event': ['Webinar not found.']}, status=status.HTTP_400_BAD_REQUEST)
+        
+        registrations = conflicting_registrations(request.user, event).select_related('user', 'event__organizer')
+        serializer = MyRegistrationSerializer(
+            registrations, many=True, context={'request': request, 'now': timezone.now()}
+        )
+        return Response({'event': event.pk, 'conflicts': serializer.data})
+
     @action(detail=False, methods=['post'])
+    @idempotent
     def register(self, request):
         """Register for a webinar"""
         serializer = RegistrationCreateSerializer(
@@ -57,6 +131,117 @@ class RegistrationViewSet(viewsets.ModelViewSet):
             )
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
+    @action(detail=False, methods=['post'], permission_classes=[IsAdmin])
+    def bulk_enroll(self, request):
+        """Register many users for one event (admin only)
+
+        Body: {"event": id, "users": [id, ...]}
+        """
+        serializer = BulkEnrollSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        summary = enroll_users(serializer.validated_data['event'], serializer.validated_data['users'])
+        return Response(
+            {'event': serializer.validated_data['event'].pk, **summary},
+            status=status.HTTP_201_CREATED if summary[REGISTERED] else status.HTTP_200_OK
+        )
+
+    @action(detail=False, methods=['post'])
+    def register_events(self, request):
+        """Register for many webinars at once
+
+        Body: {"events": [id, ...]}; admins may add "user" to register someone else.
+        """
+        serializer = RegisterEventsSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        
+        user = request.user
+        user_id = serializer.validated_data.get('user')
+        if user_id is not None and user_id != request.user.id:
+            if not IsAdmin().has_permission(request, self):
+                return Response(
+                    {'error': 'You can only register yourself'},
+                    status=status.HTTP_403_FORBIDDEN
+                )
+            user = User.objects.filter(pk=user_id).first()
+            if user is None:
+                return Response({'user': ['User not found.']}, status=status.HTTP_400_BAD_REQUEST)
+        
+        summary = register_for_events(user, serializer.validated_data['events'])
+        return Response(
+            {'user': user.pk, **summary},
+            status=status.HTTP_201_CREATED if summary[REGISTERED] else status.HTTP_200_OK
+        )
+
+    @action(detail=False, methods=['get'], permission_classes=[IsAdmin])
+    def export(self, request):
+        """Stream registrations as CSV or NDJSON (admin only)
+
+        Query params:
+        - output: csv (default) or ndjson
+        - event: event id, or comma-separated ids (default all events)
+        - attended: true/false to export only attendees or no-shows
+        """
+        export_format = request.query_params.get('output', 'csv')
+        if export_format not in EXPORT_FORMATS:
+            return Response(
+                {'error': f"output must be one of: {', '.join(EXPORT_FORMATS)}"},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        
+        event_ids = [value for value in request.query_params.get('event', '').split(',') if value.strip()]
+        if not all(value.strip().isdigit() for value in event_ids):
+            return Response({'error': 'event must be a comma-separated list of ids'}, status=status.HTTP_400_BAD_REQUEST)
+        
+        attended = request.query_params.get('attended')
+        if attended is not None:
+            attended = attended.lower() in ('1', 'true', 'yes')
+        
+        rows = export_rows(event_ids=[int(value) for value in event_ids], attended=attended)
+        response = StreamingHttpResponse(
+            iter_export(export_format, rows),
+            content_type=EXPORT_FORMATS[export_format]
+        )
+        name = f"registrations-event-{event_ids[0].strip()}" if len(event_ids) == 1 else 'registrations'
+        response['Content-Disposition'] = f'attachment; filename="{name}.{export_format}"'
+        response['Cache-Control'] = 'no-store'
+        return response
+
+    @action(detail=True, methods=['get'])
+    def check_in_token(self, request, pk=None):
+        """Get the signed token to show as a check-in QR code"""
+        registration = self.get_object()
+        return Response({
+            'registration': registration.pk,
+            'event': registration.event_id,
+            'token': make_check_in_token(registration),
+        })
+
+    @action(detail=False, methods=['post'], permission_classes=[IsAdmin])
+    def check_in(self, request):
+        """Check in a scanned token (admin only)
+
+        Body: {"token": "...", "event": id}; "event" is the webinar being
+        scanned for and is optional. Verified without a database read;
+        attendance is written in batches.
+        """
+        payload = read_check_in_token(str(request.data.get('token', '')))
+        if payload is None:
+            return Response({'token': ['Invalid check-in token.']}, status=status.HTTP_400_BAD_REQUEST)
+        
+        registration_id, event_id = payload
+        expected_event = request.data.get('event')
+        if expected_event not in (None, '') and str(expected_event) != str(event_id):
+            return Response(
+                {'token': ['This ticket is for a different webinar.'], 'event': event_id},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        
+        record_check_in(registration_id)
+        return Response(
+            {'registration': registration_id, 'event': event_id, 'checked_in': True},
+            status=status.HTTP_202_ACCEPTED
+        )
+
     @action(detail=True, methods=['delete'])
     def unregister(self, request, pk=None):
         """Unregister from a webinar"""
@@ -69,8 +254,36 @@ class RegistrationViewSet(viewsets.ModelViewSet):
                 status=status.HTTP_403_FORBIDDEN
             )
         
-        registration.delete()
+        release_registrations([registration.pk])
         return Response(
             {'message': 'Successfully unregistered'},
             status=status.HTTP_204_NO_CONTENT
         )
+
+    @action(detail=False, methods=['post', 'delete'])
+    def waitlist(self, request):
+        """Join (POST {"event": id}) or leave (DELETE ?event=id) a full webinar's waitlist"""
+        event_id = request.data.get('event') if request.method == 'POST' else request.query_params.get('event')
+        try:
+            event = Event.objects.get(pk=event_id)
+        except (Event.DoesNotExist, ValueError, TypeError):
+            return Response({'event': ['Webinar not found.']}, status=status.HTTP_400_BAD_REQUEST)
+        
+        if request.method == 'DELETE':
+            deleted, _ = WaitlistEntry.objects.filter(event=event, user=request.user).delete()
+            if not deleted:
+                return Response({'error': 'You are not on this waitlist'}, status=status.HTTP_404_NOT_FOUND)
+            return Response(status=status.HTTP_204_NO_CONTENT)
+        
+        entry, outcome = join_waitlist(request.user, event)
+        if outcome == ALREADY_REGISTERED:
+            return Response(
+                {'event': ['You are already registered for this webinar.']},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        if outcome == SEATS_AVAILABLE:
+            return Response(
+                {'event': ['This webinar has seats available. Register instead.']},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        return Response(WaitlistEntrySerializer(entry).data, status=status.HTTP_201_CREATED)
@@ -15,4 +15,4 @@ else
 fi
 
 echo "Launching gunicorn..."
-exec gunicorn webinar_system.wsgi:application --bind 0.0.0.0:$PORT
+exec gunicorn webinar_system.wsgi:application --bind 0.0.0.0:$PORT --worker-class gthread --threads 8
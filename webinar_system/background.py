@@ -0,0 +1,57 @@
+"""
+Minimal in-process background execution.
+
+Work is handed to a small thread pool once the surrounding transaction
+commits, so request handlers can return without waiting for it. Jobs should
+take plain ids rather than model instances and reload what they need.
+"""
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.db import connections, transaction
+
+logger = logging.getLogger(__name__)
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def _get_executor() -> ThreadPoolExecutor:
+    global _executor
+    if _executor is None:
+        with _executor_lock:
+            if _executor is None:
+                _executor = ThreadPoolExecutor(
+                    max_workers=settings.BACKGROUND_TASK_WORKERS,
+                    thread_name_prefix='background',
+                )
+    return _executor
+
+
+def _run_job(func, args, kwargs) -> None:
+    try:
+        func(*args, **kwargs)
+    except Exception:
+        logger.exception(f"Background job {func.__name__} failed")
+    finally:
+        # Each pool thread owns its own connections; don't leave them open
+        connections.close_all()
+
+
+def run_in_background(func, *args, **kwargs) -> None:
+    """
+    Run ``func(*args, **kwargs)`` off the request path.
+
+    The job is submitted after the current transaction commits, so it sees
+    the rows the caller just wrote. With ``BACKGROUND_TASKS_EAGER`` enabled
+    it runs inline instead.
+    """
+    def submit():
+        if settings.BACKGROUND_TASKS_EAGER:
+            func(*args, **kwargs)
+        else:
+            _get_executor().submit(_run_job, func, args, kwargs)
+
+    transaction.on_commit(submit)
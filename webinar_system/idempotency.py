@@ -0,0 +1,160 @@
+"""
+``Idempotency-Key`` support for create-style endpoints.
+
+A client that may retry a POST sends a unique key with it. The first request
+with a key inserts an ``IdempotencyRecord`` before running; the unique
+(user, endpoint, key) constraint makes that insert the lock, so a concurrent
+duplicate finds the row and gets 409 instead of running again. When the
+request finishes its status and body are stored, and retries with the same
+key and payload get that response back without touching any business table.
+The same key with a different payload is rejected with 422.
+
+Server errors are not stored, so a request that failed with a 5xx can be
+retried with the same key. A request that died mid-flight releases its key
+after IDEMPOTENCY_LOCK_SECONDS; responses are kept for
+IDEMPOTENCY_KEY_TTL_SECONDS.
+
+Keys are only honoured for authenticated requests.
+"""
+import hashlib
+import json
+from datetime import timedelta
+from functools import wraps
+
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import IntegrityError, transaction
+from django.db.models import Q
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.response import Response
+
+from accounts.models import IdempotencyRecord
+
+HEADER = 'Idempotency-Key'
+REPLAYED_HEADER = 'Idempotent-Replayed'
+MAX_KEY_LENGTH = 255
+
+
+def _fingerprint(request) -> str:
+    """Hash of the method, path and parsed payload of a request"""
+    data = request.data
+    if hasattr(data, 'lists'):
+        # Form or multipart: uploaded files count by name and size
+        payload = sorted(
+            (field, [f'{value.name}:{value.size}' if hasattr(value, 'size') else str(value) for value in values])
+            for field, values in data.lists()
+        )
+    else:
+        payload = data
+    body = json.dumps(payload, sort_keys=True, cls=DjangoJSONEncoder, default=str)
+    return hashlib.sha256(f'{request.method} {request.path}\n{body}'.encode()).hexdigest()
+
+
+def _in_progress() -> Response:
+    return Response(
+        {'detail': 'A request with this Idempotency-Key is still being processed.'},
+        status=status.HTTP_409_CONFLICT,
+        headers={'Retry-After': '1'},
+    )
+
+
+def _claim(user, scope: str, key: str, request_hash: str) -> tuple:
+    """
+    Take the key for a new request, or find what to answer a duplicate with.
+
+    Returns:
+        Tuple of (IdempotencyRecord to complete, None) when this request
+        should run, or (None, Response) when it should not
+    """
+    now = timezone.now()
+    fields = {
+        'request_hash': request_hash,
+        'response_status': None,
+        'response_body': None,
+        'locked_until': now + timedelta(seconds=settings.IDEMPOTENCY_LOCK_SECONDS),
+        'expires_at': now + timedelta(seconds=settings.IDEMPOTENCY_KEY_TTL_SECONDS),
+    }
+    existing = IdempotencyRecord.objects.filter(user=user, scope=scope, key=key)
+    # Most requests carry a fresh key, but replays should cost only this read
+    record = existing.first()
+    if record is None:
+        try:
+            with transaction.atomic():
+                return IdempotencyRecord.objects.create(user=user, scope=scope, key=key, **fields), None
+        except IntegrityError:
+            # A concurrent duplicate inserted first
+            record = existing.first()
+            if record is None:
+                return None, _in_progress()
+
+    if record.expires_at <= now or (record.response_status is None and record.locked_until <= now):
+        # Expired, or its request died: take the key over unless another retry just did
+        taken = IdempotencyRecord.objects.filter(
+            Q(expires_at__lte=now) | Q(response_status__isnull=True, locked_until__lte=now),
+            pk=record.pk,
+        ).update(**fields)
+        if not taken:
+            return None, _in_progress()
+        for field, value in fields.items():
+            setattr(record, field, value)
+        return record, None
+
+    if record.response_status is None:
+        return None, _in_progress()
+    if record.request_hash != request_hash:
+        return None, Response(
+            {'detail': 'This Idempotency-Key was already used for a different request.'},
+            status=status.HTTP_422_UNPROCESSABLE_ENTITY,
+        )
+    return None, Response(
+        record.response_body,
+        status=record.response_status,
+        headers={REPLAYED_HEADER: 'true'},
+    )
+
+
+def idempotent(view_method):
+    """
+    Make a DRF view method honour the ``Idempotency-Key`` header.
+
+    Usable on viewset actions (below ``@action``) and on ``create``.
+    """
+    @wraps(view_method)
+    def wrapper(self, request, *args, **kwargs):
+        key = request.headers.get(HEADER)
+        if key is None or not request.user.is_authenticated:
+            return view_method(self, request, *args, **kwargs)
+        if not key or len(key) > MAX_KEY_LENGTH:
+            return Response(
+                {'detail': f'{HEADER} must be 1 to {MAX_KEY_LENGTH} characters.'},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+
+        scope = f'{type(self).__name__}.{view_method.__name__}'
+        record, response = _claim(request.user, scope, key, _fingerprint(request))
+        if response is not None:
+            return response
+
+        try:
+            response = view_method(self, request, *args, **kwargs)
+        except Exception:
+            record.delete()
+            raise
+
+        if response.status_code >= 500:
+            record.delete()
+        else:
+            IdempotencyRecord.objects.filter(pk=record.pk).update(
+                response_status=response.status_code,
+                response_body=getattr(response, 'data', None),
+            )
+        return response
+
+    return wrapper
+
+
+def prune_idempotency_records() -> int:
+    """Delete records whose keys have expired"""
+    deleted, _ = IdempotencyRecord.objects.filter(expires_at__lte=timezone.now()).delete()
+    return deleted
@@ -111,6 +111,28 @@ else:
     }
 
 
+# Cache
+# Defaults to per-process memory. Point CACHE_BACKEND/CACHE_LOCATION at Redis or
+# Memcached in multi-worker deployments so every worker sees the same entries
+# (live status, and the role-change markers claims-based auth relies on).
+CACHES = {
+    'default': {
+        'BACKEND': config('CACHE_BACKEND', default='django.core.cache.backends.locmem.LocMemCache'),
+        'LOCATION': config('CACHE_LOCATION', default='webinar-system'),
+    }
+}
+
+# Claims-based auth (accounts.authentication) trusts per-user change markers in
+# the cache. With a per-process cache a role change or deactivation handled by
+# one worker would go unseen by the others, so it defaults to on only with a
+# shared backend, and enabling it over a per-process cache fails the system checks.
+CLAIMS_AUTH_ENABLED = config(
+    'CLAIMS_AUTH_ENABLED',
+    default=not CACHES['default']['BACKEND'].endswith(('.LocMemCache', '.DummyCache')),
+    cast=bool,
+)
+
+
 # Password validation
 # https://docs.djangoproject.com/en/6.0/ref/settings/#auth-password-validators
 
@@ -155,11 +177,28 @@ LOGIN_URL = '/admin/login/'
 # REST Framework Configuration
 REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': (
-        'rest_framework_simplejwt.authentication.JWTAuthentication',
+        # Read-only requests are authenticated from verified token claims
+        'accounts.authentication.ClaimsJWTAuthentication',
     ),
     'DEFAULT_PERMISSION_CLASSES': (
         'rest_framework.permissions.IsAuthenticatedOrReadOnly',
     ),
+    # Sliding-window limits for views that set throttle_scope (see
+    # webinar_system/throttling.py), per client IP and per targeted account
+    'DEFAULT_THROTTLE_RATES': {
+        'login_ip': config('THROTTLE_LOGIN_IP', default='30/min'),
+        'login_account': config('THROTTLE_LOGIN_ACCOUNT', default='10/min'),
+        'register_ip': config('THROTTLE_REGISTER_IP', default='20/hour'),
+        'verify_email_ip': config('THROTTLE_VERIFY_EMAIL_IP', default='30/min'),
+        'verify_email_account': config('THROTTLE_VERIFY_EMAIL_ACCOUNT', default='10/min'),
+        'resend_otp_ip': config('THROTTLE_RESEND_OTP_IP', default='10/min'),
+        'resend_otp_account': config('THROTTLE_RESEND_OTP_ACCOUNT', default='3/min'),
+        'send_message_account': config('THROTTLE_SEND_MESSAGE_ACCOUNT', default='30/min'),
+    },
+    # Proxies in front of the app (Render's load balancer); the client address
+    # is taken from that many entries from the end of X-Forwarded-For, so a
+    # client can't pick its own throttle key. Use 0 when serving directly.
+    'NUM_PROXIES': config('NUM_PROXIES', default=1, cast=int),
 }
 
 # CORS Configuration for React Frontend
@@ -199,6 +238,7 @@ CORS_ALLOW_HEADERS = [
     'accept',
     'origin',
     'x-csrftoken',
+    'idempotency-key',
 ]
 
 CORS_ALLOW_METHODS = [
@@ -210,6 +250,13 @@ CORS_ALLOW_METHODS = [
     'PUT',
 ]
 
+# Let the frontend read how long a rate-limited client should back off, and
+# whether a response was replayed for a repeated Idempotency-Key
+CORS_EXPOSE_HEADERS = [
+    'retry-after',
+    'idempotent-replayed',
+]
+
 # Needed when using JWT APIs from trusted frontends (especially in cross-origin deployments)
 CSRF_TRUSTED_ORIGINS = list(set(CORS_ALLOWED_ORIGINS + [
     'https://*.vercel.app',
@@ -239,6 +286,21 @@ else:
 
 DEFAULT_FROM_EMAIL = config('DEFAULT_FROM_EMAIL', default='noreply@webinar-system.com')
 
+# Outgoing mail is queued in accounts.EmailOutbox. The web process drains it in
+# the background once the request commits (EMAIL_OUTBOX_SEND_ON_COMMIT) and
+# wakes itself up for retries; the optional send_queued_email worker also
+# delivers them as they fall due. Failed sends back off from the base delay,
+# doubling up to the cap, and are marked dead after the maximum number of
+# attempts. A drain leases its batch for EMAIL_OUTBOX_CLAIM_SECONDS, after
+# which rows of a drain that died are picked up again.
+EMAIL_OUTBOX_SEND_ON_COMMIT = config('EMAIL_OUTBOX_SEND_ON_COMMIT', default=True, cast=bool)
+EMAIL_OUTBOX_BATCH_SIZE = config('EMAIL_OUTBOX_BATCH_SIZE', default=50, cast=int)
+EMAIL_OUTBOX_POLL_SECONDS = config('EMAIL_OUTBOX_POLL_SECONDS', default=2, cast=float)
+EMAIL_OUTBOX_MAX_ATTEMPTS = config('EMAIL_OUTBOX_MAX_ATTEMPTS', default=6, cast=int)
+EMAIL_OUTBOX_RETRY_BASE_SECONDS = config('EMAIL_OUTBOX_RETRY_BASE_SECONDS', default=30, cast=int)
+EMAIL_OUTBOX_RETRY_MAX_SECONDS = config('EMAIL_OUTBOX_RETRY_MAX_SECONDS', default=3600, cast=int)
+EMAIL_OUTBOX_CLAIM_SECONDS = config('EMAIL_OUTBOX_CLAIM_SECONDS', default=300, cast=int)
+
 # JWT Configuration
 from datetime import timedelta
 
@@ -246,7 +308,8 @@ SIMPLE_JWT = {
     'ACCESS_TOKEN_LIFETIME': timedelta(minutes=60),
     'REFRESH_TOKEN_LIFETIME': timedelta(days=7),
     'ROTATE_REFRESH_TOKENS': True,
-    'BLACKLIST_AFTER_ROTATION': False,
+    # Rotated refresh tokens are revoked (accounts.revocation)
+    'BLACKLIST_AFTER_ROTATION': True,
     'UPDATE_LAST_LOGIN': True,
     'ALGORITHM': 'HS256',
     'SIGNING_KEY': SECRET_KEY,
@@ -256,8 +319,106 @@ SIMPLE_JWT = {
     'USER_ID_CLAIM': 'user_id',
     'AUTH_TOKEN_CLASSES': ('rest_framework_simplejwt.tokens.AccessToken',),
     'TOKEN_TYPE_CLAIM': 'token_type',
+    # Re-read role/identity claims from the database on every refresh
+    'TOKEN_REFRESH_SERIALIZER': 'accounts.serializers.ClaimsTokenRefreshSerializer',
 }
 
+# Token revocation
+# Each process checks revoked token ids through a Bloom filter, pulls new
+# revocations this often, and rebuilds the filter (pruning expired rows) this often.
+TOKEN_REVOCATION_REFRESH_SECONDS = config('TOKEN_REVOCATION_REFRESH_SECONDS', default=5, cast=float)
+TOKEN_REVOCATION_REBUILD_SECONDS = config('TOKEN_REVOCATION_REBUILD_SECONDS', default=3600, cast=float)
+TOKEN_REVOCATION_BLOOM_CAPACITY = config('TOKEN_REVOCATION_BLOOM_CAPACITY', default=100000, cast=int)
+TOKEN_REVOCATION_BLOOM_ERROR_RATE = 0.001
+
+# Background Tasks
+# Jobs queued through webinar_system.background run on a small thread pool after
+# the request's transaction commits. BACKGROUND_TASKS_EAGER=True runs them inline.
+BACKGROUND_TASK_WORKERS = config('BACKGROUND_TASK_WORKERS', default=4, cast=int)
+BACKGROUND_TASKS_EAGER = config('BACKGROUND_TASKS_EAGER', default=False, cast=bool)
+
+# Idempotency keys (webinar_system.idempotency)
+# Responses are replayed for repeated keys for IDEMPOTENCY_KEY_TTL_SECONDS; a
+# request still running after IDEMPOTENCY_LOCK_SECONDS is presumed dead and
+# its key can be reused.
+IDEMPOTENCY_KEY_TTL_SECONDS = config('IDEMPOTENCY_KEY_TTL_SECONDS', default=24 * 60 * 60, cast=int)
+IDEMPOTENCY_LOCK_SECONDS = config('IDEMPOTENCY_LOCK_SECONDS', default=60, cast=int)
+
+# Bulk user import
+# The import_users command hashes passwords in this many processes; accounts
+# are written in batches of BULK_IMPORT_BATCH_SIZE. The admin endpoint hashes
+# in the request's own thread at roughly half a second per password, so it
+# accepts at most BULK_IMPORT_MAX_ROWS rows to answer well within proxy
+# timeouts; larger files go through the command.
+BULK_IMPORT_HASH_WORKERS = config('BULK_IMPORT_HASH_WORKERS', default=os.cpu_count() or 1, cast=int)
+BULK_IMPORT_BATCH_SIZE = config('BULK_IMPORT_BATCH_SIZE', default=500, cast=int)
+BULK_IMPORT_MAX_ROWS = config('BULK_IMPORT_MAX_ROWS', default=50, cast=int)
+
+# Account cleanup (cleanup_unverified_accounts)
+# Accounts that never verify their email are deleted after this many days;
+# deletes run in transactions of ACCOUNT_CLEANUP_CHUNK_SIZE rows.
+UNVERIFIED_ACCOUNT_RETENTION_DAYS = config('UNVERIFIED_ACCOUNT_RETENTION_DAYS', default=7, cast=int)
+ACCOUNT_CLEANUP_CHUNK_SIZE = config('ACCOUNT_CLEANUP_CHUNK_SIZE', default=1000, cast=int)
+
+# Bulk registration
+# Most users (or events) accepted by one bulk_enroll / register_events request.
+BULK_REGISTRATION_MAX_ITEMS = config('BULK_REGISTRATION_MAX_ITEMS', default=5000, cast=int)
+
+# Check-in scans (registrations.checkin) are written as one UPDATE per this
+# many scans, or this many seconds after the first unwritten scan.
+CHECKIN_BATCH_SIZE = config('CHECKIN_BATCH_SIZE', default=200, cast=int)
+CHECKIN_FLUSH_SECONDS = config('CHECKIN_FLUSH_SECONDS', default=2.0, cast=float)
+
+# Registration exports stream rows fetched this many at a time
+REGISTRATION_EXPORT_CHUNK_SIZE = config('REGISTRATION_EXPORT_CHUNK_SIZE', default=2000, cast=int)
+
+# Profile pictures
+# Uploads are resized in the background into square variants of these pixel
+# sizes, chosen per request with ?picture_size=sm|md|lg.
+PROFILE_PICTURE_SIZES = {'sm': 64, 'md': 128, 'lg': 256}
+PROFILE_PICTURE_MAX_UPLOAD_BYTES = config('PROFILE_PICTURE_MAX_UPLOAD_BYTES', default=10 * 1024 * 1024, cast=int)
+PROFILE_PICTURE_MAX_PIXELS = config('PROFILE_PICTURE_MAX_PIXELS', default=40_000_000, cast=int)
+
+# Recording files
+# Self-hosted recordings are kept outside MEDIA_ROOT and only served through the
+# recording stream endpoint. Uploads arrive in chunks of at most
+# RECORDING_UPLOAD_MAX_CHUNK_BYTES and can be resumed from the last stored byte.
+# The root must be on persistent storage: on Render, instance disks are wiped
+# on every deploy, so point it at a mounted disk (paid plans) or keep recordings
+# as links.
+RECORDING_STORAGE_ROOT = config('RECORDING_STORAGE_ROOT', default=str(BASE_DIR / 'recording_files'))
+RECORDING_UPLOAD_MAX_BYTES = config('RECORDING_UPLOAD_MAX_BYTES', default=20 * 1024 ** 3, cast=int)
+RECORDING_UPLOAD_MAX_CHUNK_BYTES = config('RECORDING_UPLOAD_MAX_CHUNK_BYTES', default=16 * 1024 * 1024, cast=int)
+# A chunk's claim on the upload offset lapses after this many seconds, so a
+# retry can take over from a request that died mid-chunk
+RECORDING_UPLOAD_CLAIM_SECONDS = config('RECORDING_UPLOAD_CLAIM_SECONDS', default=120, cast=int)
+# Unfinished uploads idle this long are deleted by prune_recording_uploads
+RECORDING_UPLOAD_STALE_HOURS = config('RECORDING_UPLOAD_STALE_HOURS', default=48, cast=int)
+# Signed playback URLs (recordings.playback) stop working after this many seconds
+RECORDING_PLAYBACK_URL_TTL_SECONDS = config('RECORDING_PLAYBACK_URL_TTL_SECONDS', default=4 * 3600, cast=int)
+
+# Live Sessions
+# Seconds a cached status entry lives; start/end invalidate it immediately.
+LIVE_STATUS_CACHE_TIMEOUT = config('LIVE_STATUS_CACHE_TIMEOUT', default=5, cast=int)
+# Upper bound for ?wait= long-polling on the status endpoint, and how often
+# a waiting request re-checks the cache.
+LIVE_STATUS_LONG_POLL_MAX_SECONDS = config('LIVE_STATUS_LONG_POLL_MAX_SECONDS', default=25, cast=int)
+LIVE_STATUS_POLL_INTERVAL = config('LIVE_STATUS_POLL_INTERVAL', default=0.5, cast=float)
+# Long-polls allowed to wait at once per process. Each holds a worker thread, so
+# keep this below gunicorn's threads (see Procfile); the rest answer immediately
+# with Retry-After set to LIVE_STATUS_BUSY_RETRY_SECONDS so they don't re-poll
+# in a tight loop.
+LIVE_STATUS_MAX_WAITERS = config('LIVE_STATUS_MAX_WAITERS', default=4, cast=int)
+LIVE_STATUS_BUSY_RETRY_SECONDS = config('LIVE_STATUS_BUSY_RETRY_SECONDS', default=5, cast=int)
+# run_live_scheduler keeps this many minutes of transitions in memory and checks
+# for edited webinars at least this often.
+LIVE_SCHEDULER_HORIZON_MINUTES = config('LIVE_SCHEDULER_HORIZON_MINUTES', default=60, cast=int)
+LIVE_SCHEDULER_RELOAD_SECONDS = config('LIVE_SCHEDULER_RELOAD_SECONDS', default=30, cast=float)
+# Registrants count as attended when they joined a run at least this many
+# minutes before it ended (leaving isn't tracked, so this is time available
+# to watch). 0 counts every participant.
+LIVE_ATTENDANCE_MIN_MINUTES = config('LIVE_ATTENDANCE_MIN_MINUTES', default=0, cast=int)
+
 # Logging Configuration
 LOGGING = {
     'version': 1,
@@ -0,0 +1,187 @@
+"""
+Sliding-window rate limiting for DRF views.
+
+Each key keeps one counter per fixed window in the configured cache. The
+request rate is estimated from the current window's count plus the previous
+window's count, weighted by how much of the previous window still overlaps
+the sliding window. This approximates a true sliding log without storing
+timestamps.
+
+Cost per allowed request is one atomic ``incr``. The previous window's count
+no longer changes, so each process remembers it after reading it once.
+Rejected requests are decremented again so they don't prolong a block.
+
+Views opt in with ``throttle_classes`` and a ``throttle_scope``. Rates are
+looked up in ``REST_FRAMEWORK['DEFAULT_THROTTLE_RATES']`` as
+``<scope>_ip`` and ``<scope>_account``. A scope without a rate is not
+limited.
+"""
+import hashlib
+import math
+import threading
+from collections import OrderedDict
+
+from django.core.cache import cache as default_cache
+from rest_framework.settings import api_settings
+from rest_framework.throttling import SimpleRateThrottle
+
+
+class _SettledCounts:
+    """Small process-local LRU of counts from windows that have ended"""
+
+    def __init__(self, max_size: int = 10000):
+        self.max_size = max_size
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            value = self._data.get(key)
+            if value is not None:
+                self._data.move_to_end(key)
+            return value
+
+    def set(self, key, value) -> None:
+        with self._lock:
+            self._data[key] = value
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_size:
+                self._data.popitem(last=False)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._data.clear()
+
+
+_settled_counts = _SettledCounts()
+
+
+class SlidingWindowRateThrottle(SimpleRateThrottle):
+    """
+    Base class for sliding-window throttles scoped by ``view.throttle_scope``.
+
+    Subclasses set ``key_kind`` and implement ``get_key_ident``.
+    """
+    cache = default_cache
+    cache_format = 'throttle:%(scope)s:%(ident)s'
+    key_kind = None
+
+    def __init__(self):
+        # Rates depend on the view, so they are resolved in allow_request()
+        pass
+
+    def get_key_ident(self, request, view):
+        raise NotImplementedError('.get_key_ident() must be overridden')
+
+    def get_rate(self):
+        # Read on each call so settings overrides apply
+        return api_settings.DEFAULT_THROTTLE_RATES.get(self.scope)
+
+    def get_cache_key(self, request, view):
+        ident = self.get_key_ident(request, view)
+        if ident is None:
+            return None
+        return self.cache_format % {'scope': self.scope, 'ident': ident}
+
+    def allow_request(self, request, view):
+        base_scope = getattr(view, 'throttle_scope', None)
+        if not base_scope:
+            return True
+
+        self.scope = f'{base_scope}_{self.key_kind}'
+        self.rate = self.get_rate()
+        if self.rate is None:
+            return True
+        self.num_requests, self.duration = self.parse_rate(self.rate)
+
+        self.key = self.get_cache_key(request, view)
+        if self.key is None:
+            return True
+
+        self.now = self.timer()
+        window = int(self.now // self.duration)
+        current_key = f'{self.key}:{window}'
+        previous_key = f'{self.key}:{window - 1}'
+
+        count = self._increment(current_key)
+        previous = self._settled_count(previous_key)
+        self.elapsed = self.now - window * self.duration
+        weight = 1 - self.elapsed / self.duration
+
+        if previous * weight + count <= self.num_requests:
+            return True
+
+        # Don't count rejected requests against the caller
+        try:
+            self.cache.decr(current_key)
+        except ValueError:
+            pass
+        self.current_count = count - 1
+        self.previous_count = previous
+        return False
+
+    def _increment(self, key) -> int:
+        try:
+            return self.cache.incr(key)
+        except ValueError:
+            # First request of the window; add() keeps concurrent creators atomic
+            self.cache.add(key, 0, timeout=2 * self.duration)
+            return self.cache.incr(key)
+
+    def _settled_count(self, key) -> int:
+        count = _settled_counts.get(key)
+        if count is None:
+            count = self.cache.get(key, 0)
+            _settled_counts.set(key, count)
+        return count
+
+    def wait(self):
+        """Seconds until the next request would be allowed"""
+        remaining = self.duration - self.elapsed
+        if self.current_count + 1 > self.num_requests or not self.previous_count:
+            # This window is full; the next one still sees part of it
+            next_previous = self.current_count
+            if next_previous + 1 <= self.num_requests:
+                return math.ceil(remaining)
+            fraction = 1 - (self.num_requests - 1) / next_previous
+            return math.ceil(remaining + fraction * self.duration)
+
+        # Wait for enough of the previous window to slide out
+        fraction = 1 - (self.num_requests - self.current_count - 1) / self.previous_count
+        return max(1, math.ceil(fraction * self.duration - self.elapsed))
+
+
+class IPRateThrottle(SlidingWindowRateThrottle):
+    """Limits requests per client address (``<scope>_ip`` rate)"""
+    key_kind = 'ip'
+
+    def get_key_ident(self, request, view):
+        return self.get_ident(request)
+
+
+class AccountRateThrottle(SlidingWindowRateThrottle):
+    """
+    Limits requests per account (``<scope>_account`` rate).
+
+    Authenticated requests are keyed by user id. Anonymous requests, such as
+    login or OTP verification, are keyed by the username or email they
+    target, so guesses against one account are limited however many client
+    addresses they come from.
+    """
+    key_kind = 'account'
+    identifier_fields = ('email', 'username')
+
+    def get_key_ident(self, request, view):
+        if request.user and request.user.is_authenticated:
+            return f'user:{request.user.pk}'
+        for field in self.identifier_fields:
+            value = request.data.get(field) if hasattr(request.data, 'get') else None
+            if isinstance(value, str) and value.strip():
+                # Hashed so arbitrary client input is a safe cache key
+                return hashlib.sha256(value.strip().lower().encode()).hexdigest()[:32]
+        return None
+
+
+def reset_settled_counts() -> None:
+    """Forget remembered window counts (for tests that clear the cache)"""
+    _settled_counts.clear()
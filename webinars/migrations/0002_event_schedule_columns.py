@@ -0,0 +1,55 @@
+# Generated by Django 6.0 on 2026-10-19 00:17
+
+from datetime import datetime, timedelta
+
+from django.conf import settings
+from django.db import migrations, models
+from django.utils import timezone
+
+
+def backfill_schedule_columns(apps, schema_editor):
+    Event = apps.get_model('webinars', 'Event')
+    batch = []
+    for event in Event.objects.only('id', 'date', 'time', 'duration').iterator(chunk_size=500):
+        event.starts_at = timezone.make_aware(datetime.combine(event.date, event.time))
+        event.ends_at = event.starts_at + timedelta(minutes=event.duration or 0)
+        batch.append(event)
+        if len(batch) >= 500:
+            Event.objects.bulk_update(batch, ['starts_at', 'ends_at'])
+            batch = []
+    if batch:
+        Event.objects.bulk_update(batch, ['starts_at', 'ends_at'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('webinars', '0001_initial'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='event',
+            name='ends_at',
+            field=models.DateTimeField(blank=True, editable=False, help_text='End datetime derived from start and duration (kept in sync on save)', null=True),
+        ),
+        migrations.AddField(
+            model_name='event',
+            name='starts_at',
+            field=models.DateTimeField(blank=True, editable=False, help_text='Start datetime derived from date and time (kept in sync on save)', null=True),
+        ),
+        migrations.AddIndex(
+            model_name='event',
+            index=models.Index(fields=['starts_at'], name='webinars_ev_starts__69de64_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='event',
+            index=models.Index(fields=['ends_at'], name='webinars_ev_ends_at_34d2b6_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='event',
+            index=models.Index(fields=['updated_at'], name='webinars_ev_updated_9985b7_idx'),
+        ),
+        migrations.RunPython(backfill_schedule_columns, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 6.0 on 2026-10-19 01:14
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('webinars', '0002_event_schedule_columns'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='event',
+            name='capacity',
+            field=models.PositiveIntegerField(blank=True, help_text='Maximum number of registrations. Leave empty for unlimited.', null=True),
+        ),
+    ]
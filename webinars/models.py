@@ -42,6 +42,23 @@ class Event(models.Model):
         on_delete=models.CASCADE,
         related_name="organized_events",
     )
+    capacity = models.PositiveIntegerField(
+        null=True,
+        blank=True,
+        help_text="Maximum number of registrations. Leave empty for unlimited."
+    )
+    starts_at = models.DateTimeField(
+        null=True,
+        blank=True,
+        editable=False,
+        help_text="Start datetime derived from date and time (kept in sync on save)"
+    )
+    ends_at = models.DateTimeField(
+        null=True,
+        blank=True,
+        editable=False,
+        help_text="End datetime derived from start and duration (kept in sync on save)"
+    )
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
@@ -53,11 +70,29 @@ class Event(models.Model):
         indexes = [
             models.Index(fields=['date', 'time']),
             models.Index(fields=['organizer']),
+            models.Index(fields=['ends_at']),
+            # Leading starts_at column also covers starts_at-only lookups
+            models.Index(fields=['starts_at', 'ends_at'], name='webinars_event_interval_idx'),
+            models.Index(fields=['updated_at']),
         ]
 
     def __str__(self) -> str:
         return self.title
 
+    def save(self, *args, **kwargs):
+        """Keep the denormalized starts_at/ends_at columns in sync"""
+        date = self._meta.get_field('date').to_python(self.date)
+        time = self._meta.get_field('time').to_python(self.time)
+        if date and time:
+            self.starts_at = timezone.make_aware(datetime.combine(date, time))
+            self.ends_at = self.starts_at + timedelta(minutes=int(self.duration or 0))
+
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None and {'date', 'time', 'duration'} & set(update_fields):
+            kwargs['update_fields'] = set(update_fields) | {'starts_at', 'ends_at'}
+
+        super().save(*args, **kwargs)
+
     def get_status(self):
         """Calculate webinar status based on current time"""
         # Manual override takes precedence
@@ -76,6 +111,18 @@ class Event(models.Model):
         else:
             return 'completed'
 
+    def status_at(self, now) -> str:
+        """Status at ``now`` from the stored schedule columns, so a list can share one clock"""
+        if self.manual_status:
+            return self.manual_status
+        if self.starts_at is None or self.ends_at is None:
+            return self.get_status()
+        if now < self.starts_at:
+            return 'upcoming'
+        elif now <= self.ends_at:
+            return 'live'
+        return 'completed'
+
     @property
     def is_free(self) -> bool:
         """Check if webinar is free"""
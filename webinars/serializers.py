@@ -17,7 +17,7 @@ class EventSerializer(serializers.ModelSerializer):
         model = Event
         fields = [
             'id', 'title', 'description', 'date', 'time', 'duration',
-            'price', 'is_free', 'thumbnail', 'organizer', 'organizer_name',
+            'price', 'is_free', 'thumbnail', 'capacity', 'organizer', 'organizer_name',
             'status', 'is_registered', 'start_time', 'end_time', 'created_at', 'updated_at'
         ]
         read_only_fields = ['organizer', 'created_at', 'updated_at']
@@ -68,7 +68,7 @@ class EventDetailSerializer(serializers.ModelSerializer):
         model = Event
         fields = [
             'id', 'title', 'description', 'date', 'time', 'duration',
-            'price', 'is_free', 'thumbnail', 'live_stream_url', 'manual_status',
+            'price', 'is_free', 'thumbnail', 'capacity', 'live_stream_url', 'manual_status',
             'organizer', 'organizer_name', 'organizer_email',
             'status', 'is_registered', 'registration_count', 'start_time', 'end_time', 'created_at', 'updated_at'
         ]
@@ -7,6 +7,7 @@ from django.utils import timezone
 from .models import Event
 from .serializers import EventSerializer, EventDetailSerializer
 from accounts.permissions import IsAdmin
+from registrations.services import fill_from_waitlist
 
 
 class EventViewSet(viewsets.ModelViewSet):
@@ -61,6 +62,13 @@ class EventViewSet(viewsets.ModelViewSet):
     def perform_create(self, serializer):
         serializer.save(organizer=self.request.user)
 
+    def perform_update(self, serializer):
+        previous_capacity = serializer.instance.capacity
+        event = serializer.save()
+        # Seats added by raising (or removing) the capacity go to the waitlist first
+        if event.capacity != previous_capacity:
+            fill_from_waitlist(event)
+
     @action(detail=False, methods=['get'])
     def upcoming(self, request):
         """Get all upcoming webinars"""